@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+import sys
+from datetime import datetime, timedelta, timezone
+
+# noteの投稿日時は日本時間で表示されるため、日本時間のdatetimeとして保持する
+JST = timezone(timedelta(hours=9))
+
+_DIGITS_PATTERN = re.compile(r"\d+")
+
+# 出力する記録のフィールド（この順序でJSONとCSVに書き出す）
+RECORD_FIELDS = (
+    "url",
+    "title",
+    "author",
+    "published_date",
+    "likes",
+    "tags",
+    "content_preview",
+    "matched_keywords",
+    "keyword_matches",
+    "relevance",
+    "queries",
+)
+
+# 検索結果ページから取得した一時的なフィールド（出力には含めず、チェックポイントと作業キューにだけ保存する）
+SEARCH_FIELDS = ("title_from_search", "snippet_from_search", "tags_from_search")
+
+
+def parse_likes(value):
+    """いいね数を整数に変換する（"1,234" や "♡ 12" のような表記にも対応し、数字がなければNone）"""
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    digits = _DIGITS_PATTERN.findall(str(value))
+    return int("".join(digits)) if digits else None
+
+
+def parse_datetime(value):
+    """ISO 8601形式の日時を日本時間のdatetimeに変換する（タイムゾーンがない場合は日本時間とみなす）"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        parsed = value
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=JST)
+    return parsed.astimezone(JST)
+
+
+def _intern(value):
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _strings(values):
+    """文字列のリストを、同じ文字列を共有するタプルにする"""
+    return tuple(sys.intern(str(value)) for value in values or ())
+
+
+def _likes(value):
+    return parse_likes(value) or 0
+
+
+def _published_date(value):
+    # 解釈できない表記の場合は、元の文字列のまま保持する
+    return parse_datetime(value) or (value or None)
+
+
+def _keyword_matches(matches):
+    """{"keyword", "field", "start"} の辞書のリストを、(キーワード, フィールド, 開始位置) のタプルにする"""
+    converted = []
+    for match in matches or ():
+        if isinstance(match, dict):
+            match = (match.get("keyword"), match.get("field"), match.get("start"))
+        keyword, field, start = match
+        converted.append((_intern(keyword), _intern(field), start))
+    return tuple(converted)
+
+
+def _relevance(value):
+    return int(value) if value not in (None, "") else None
+
+
+# 代入するときに型を変換するフィールド
+_CONVERTERS = {
+    "author": _intern,
+    "published_date": _published_date,
+    "likes": _likes,
+    "tags": _strings,
+    "matched_keywords": _strings,
+    "keyword_matches": _keyword_matches,
+    "relevance": _relevance,
+    "queries": _strings,
+    "tags_from_search": _strings,
+}
+
+_SLOTS = RECORD_FIELDS + SEARCH_FIELDS
+_SLOT_SET = frozenset(_SLOTS)
+
+
+class ArticleRecord:
+    """
+    1件の記事の記録（辞書と同じように読み書きできる、__slots__ を使った省メモリの型）
+
+    いいね数は整数、投稿日は日本時間のdatetime、著者・タグ・キーワードは sys.intern した文字列のタプルで保持する。
+    大量の記事をクロールしても、記事ごとに辞書や同じ文字列を持たないため、1件あたりのメモリが小さい。
+    代入した値はフィールドごとに変換し、to_dict() でJSON・CSVに書き出せる辞書に戻す。
+    未設定のフィールドは辞書にないキーと同じ扱いになる。RECORD_FIELDS と SEARCH_FIELDS 以外のキーは
+    別の辞書に保持する。
+    """
+
+    __slots__ = _SLOTS + ("_extra",)
+
+    def __init__(self, url=None, **fields):
+        self._extra = None
+        if url is not None:
+            self.url = url
+        self.update(fields)
+
+    @classmethod
+    def from_dict(cls, data):
+        """辞書（JSONから読み込んだ記録など）から記録を作る。ArticleRecordの場合はそのまま返す"""
+        if isinstance(data, cls):
+            return data
+        record = cls()
+        record.update(data)
+        return record
+
+    def __getitem__(self, key):
+        if key in _SLOT_SET:
+            try:
+                value = getattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+            if key == "keyword_matches":
+                return [{"keyword": keyword, "field": field, "start": start} for keyword, field, start in value]
+            return value
+        if self._extra is None or key not in self._extra:
+            raise KeyError(key)
+        return self._extra[key]
+
+    def __setitem__(self, key, value):
+        if key in _SLOT_SET:
+            converter = _CONVERTERS.get(key)
+            setattr(self, key, converter(value) if converter else value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _SLOT_SET:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is not None and key in self._extra:
+            del self._extra[key]
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        if key in _SLOT_SET:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def __len__(self):
+        return len(self.keys())
+
+    def __eq__(self, other):
+        if isinstance(other, ArticleRecord):
+            return self.to_dict(search=True) == other.to_dict(search=True)
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f"ArticleRecord({self.to_dict(search=True)!r})"
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        keys = [key for key in _SLOTS if hasattr(self, key)]
+        if self._extra:
+            keys.extend(self._extra)
+        return keys
+
+    def items(self):
+        return [(key, self[key]) for key in self.keys()]
+
+    def update(self, other=(), **fields):
+        """辞書と同じく、別の記録・辞書・(キー, 値) の組の値を代入する"""
+        if isinstance(other, ArticleRecord):
+            other = other.items()
+        elif hasattr(other, "items"):
+            other = other.items()
+        for key, value in other:
+            self[key] = value
+        for key, value in fields.items():
+            self[key] = value
+
+    def to_dict(self, search=False):
+        """
+        JSON・CSVに書き出せる辞書を返す（投稿日はISO 8601形式の文字列、タプルはリストにする）
+
+        Args:
+            search (bool): 検索結果ページから取得した一時的なフィールドも含めるか（チェックポイント・作業キュー用）
+        """
+        data = {}
+        for key in (("url",) + SEARCH_FIELDS + RECORD_FIELDS[1:]) if search else RECORD_FIELDS:
+            try:
+                value = getattr(self, key)
+            except AttributeError:
+                continue
+            if isinstance(value, tuple):
+                if key == "keyword_matches":
+                    value = [{"keyword": keyword, "field": field, "start": start} for keyword, field, start in value]
+                else:
+                    value = list(value)
+            elif isinstance(value, datetime):
+                value = value.isoformat(timespec="milliseconds")
+            data[key] = value
+        if self._extra:
+            data.update(self._extra)
+        return data
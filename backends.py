@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from urllib.parse import quote
+
+from article_record import ArticleRecord
+from note_urls import extract_note_id
+from structured_data import note_fields
+
+
+class HtmlBackend:
+    """検索ページと記事ページのHTMLを取得して解析するバックエンド"""
+
+    name = "html"
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    def iter_search(self, keyword, max_pages, start_page=1):
+        """
+        検索ページを順に取得し、未取得の記事をページの解析が終わるたびに返す
+
+        ページの記事をすべて返し終えるたびに crawler.search_page_done(page) を呼び出す。
+        start_page を指定すると、そのページから取得を始める（中断したクロールの再開用）。
+        """
+        return self._iter_pages(
+            self.crawler.search_url, lambda page: {"q": keyword, "page": page}, max_pages, start_page
+        )
+
+    def iter_hashtag(self, hashtag, max_pages, order="new", start_page=1):
+        """ハッシュタグの記事一覧ページ（order="new" で新着順）を順に取得し、未取得の記事を返す"""
+        return self._iter_pages(
+            f"{self.crawler.base_url}/hashtag/{quote(hashtag.lstrip('#'))}",
+            lambda page: {"f": order, "paid_only": "false", "page": page},
+            max_pages,
+            start_page,
+        )
+
+    def _iter_pages(self, url, params_for_page, max_pages, start_page=1):
+        """
+        記事一覧のページ（検索結果、ハッシュタグ）を順に取得し、未取得の記事を返す
+
+        Args:
+            url (str): 一覧ページのURL
+            params_for_page (callable): ページ番号（1始まり）からクエリパラメータを作る関数
+            max_pages (int): 取得する最大ページ数
+            start_page (int): 取得を始めるページ番号（中断したクロールの再開用）
+        """
+        from bs4 import BeautifulSoup
+
+        crawler = self.crawler
+        for page in crawler.progress_bar(range(start_page, max_pages + 1), desc="ページ"):
+            try:
+                # サーバーに負荷をかけないよう、検索ページのレート制限に従って取得する
+                response = crawler.http.get(
+                    url,
+                    params=params_for_page(page),
+                    cache_ttl_hours=crawler.SEARCH_CACHE_TTL_HOURS,
+                    endpoint="search",
+                )
+                response.raise_for_status()
+
+                with crawler.metrics.span("search_page_parse"):
+                    soup = BeautifulSoup(response.text, "lxml")
+
+                    # 現在のnoteのWebサイト構造に合わせて記事リンクを取得
+                    article_links = soup.find_all("a", class_=["a-link", "m-largeNoteWrapper__link", "fn"])
+
+                    if not article_links:
+                        # クラス名での検索がうまくいかない場合は、パスで検索
+                        article_links = [link for link in soup.find_all("a", href=True) if "/n/" in link.get("href")]
+
+                if not article_links:
+                    print(f"ページ {page} に記事が見つかりませんでした。終了します。")
+                    crawler.search_page_done(page)
+                    break
+
+                for link in article_links:
+                    # 記事以外のリンクと取得済みの記事は除外
+                    article_url = crawler.claim_article_url(link.get("href"))
+                    if not article_url:
+                        continue
+
+                    yield self._card_info(link, article_url)
+
+                # ハッシュタグの一覧で前回取得した記事に到達した場合は、次のページを取得しない
+                if crawler.search_page_done(page):
+                    break
+
+            except Exception as e:
+                print(f"ページ {page} の取得中にエラーが発生しました: {e}")
+                crawler._count("search_page_error")
+                if crawler.raise_errors:
+                    raise
+                # 取得できなかったページは取得済みとして記録せず、再開したときに取得し直す
+                if crawler.search_page_done(page, failed=True):
+                    break
+
+    def _card_info(self, link, article_url):
+        """検索結果のカードから、記事のタイトル、抜粋、ハッシュタグを取得する"""
+        card = link.find_parent(["section", "article"]) or link.parent
+
+        # 検索結果ページから記事のタイトルを取得
+        title_elem = link.find("h3") or link.find("div", class_=lambda c: c and "title" in c.lower())
+        title = title_elem.text.strip() if title_elem else link.get("title") or link.get("aria-label") or ""
+        if not title and card is not None and card.find("h3"):
+            title = card.find("h3").text.strip()
+
+        snippet = ""
+        tags = []
+        if card is not None:
+            snippet_elem = card.find(class_=lambda c: c and "description" in c.lower())
+            snippet = snippet_elem.text.strip() if snippet_elem else ""
+            tags = [a.text.strip() for a in card.select("a[href^='/hashtag/']") if a.text.strip()]
+
+        return ArticleRecord(
+            url=article_url,
+            title_from_search=title.strip(),
+            snippet_from_search=snippet,
+            tags_from_search=tags,
+        )
+
+    def detail_url(self, article):
+        """記事の詳細を取得するURLを返す"""
+        return article["url"]
+
+    def parse_detail(self, response, article):
+        """記事ページのレスポンスから各要素を取得する"""
+        return self.crawler._parse_article(response.content, article, encoding=response.encoding)
+
+
+class ApiBackend:
+    """noteのJSON APIから検索結果、ハッシュタグの記事一覧、記事の詳細を取得するバックエンド"""
+
+    name = "api"
+
+    # 1ページあたりの取得件数
+    PAGE_SIZE = 20
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+        self.api_url = f"{crawler.base_url}/api"
+
+    def _iter_pages(self, url, params_for_page, max_pages, extract, start_page=1):
+        """
+        一覧APIをページ送りしながら、未取得の記事を返す
+
+        Args:
+            url (str): 一覧APIのURL
+            params_for_page (callable): ページ番号（1始まり）からクエリパラメータを作る関数
+            max_pages (int): 取得する最大ページ数
+            extract (callable): レスポンスのdataから (記事のリスト, 最終ページかどうか) を取り出す関数
+            start_page (int): 取得を始めるページ番号（中断したクロールの再開用）
+        """
+        crawler = self.crawler
+        for page in crawler.progress_bar(range(start_page, max_pages + 1), desc="ページ"):
+            try:
+                response = crawler.http.get(
+                    url,
+                    params=params_for_page(page),
+                    cache_ttl_hours=crawler.SEARCH_CACHE_TTL_HOURS,
+                    endpoint="search",
+                )
+                response.raise_for_status()
+
+                notes, is_last_page = extract(response.json().get("data") or {})
+                if not notes:
+                    print(f"ページ {page} に記事が見つかりませんでした。終了します。")
+                    crawler.search_page_done(page)
+                    break
+
+                for note in notes:
+                    article_url = crawler.claim_article_url(self._note_url(note))
+                    if article_url:
+                        card = note_fields(note)
+                        yield ArticleRecord(
+                            url=article_url,
+                            title_from_search=note.get("name") or "",
+                            snippet_from_search=note.get("description") or card.get("content_preview", ""),
+                            tags_from_search=card.get("tags", []),
+                        )
+
+                if crawler.search_page_done(page) or is_last_page:
+                    break
+
+            except Exception as e:
+                print(f"ページ {page} の取得中にエラーが発生しました: {e}")
+                crawler._count("search_page_error")
+                if crawler.raise_errors:
+                    raise
+                # 取得できなかったページは取得済みとして記録せず、再開したときに取得し直す
+                if crawler.search_page_done(page, failed=True):
+                    break
+
+    def _note_url(self, note):
+        url = note.get("noteUrl") or note.get("note_url")
+        if url:
+            return url
+        user = note.get("user") or {}
+        return f"/{user.get('urlname', '')}/n/{note.get('key', '')}"
+
+    def iter_search(self, keyword, max_pages, start_page=1):
+        """検索APIから、未取得の記事をページごとに返す"""
+
+        def extract(data):
+            notes = data.get("notes") or {}
+            return notes.get("contents") or [], _is_last_page(notes)
+
+        return self._iter_pages(
+            f"{self.api_url}/v3/searches",
+            lambda page: {"context": "note", "q": keyword, "size": self.PAGE_SIZE, "start": (page - 1) * self.PAGE_SIZE},
+            max_pages,
+            extract,
+            start_page,
+        )
+
+    def iter_hashtag(self, hashtag, max_pages, order="new", start_page=1):
+        """ハッシュタグの記事一覧APIから、未取得の記事をページごとに返す"""
+
+        def extract(data):
+            notes = data.get("notes")
+            if isinstance(notes, dict):
+                return notes.get("contents") or [], _is_last_page(notes)
+            return notes or [], _is_last_page(data)
+
+        return self._iter_pages(
+            f"{self.api_url}/v3/hashtags/{quote(hashtag.lstrip('#'))}/notes",
+            lambda page: {"order": order, "page": page, "paid_only": "false"},
+            max_pages,
+            extract,
+            start_page,
+        )
+
+    def detail_url(self, article):
+        """記事の詳細を取得するAPIのURLを返す（記事URLでなければNone）"""
+        note_id = extract_note_id(article["url"])
+        return f"{self.api_url}/v3/notes/{note_id}" if note_id else None
+
+    def parse_detail(self, response, article):
+        """記事詳細APIのレスポンスから、HTMLバックエンドと同じ形の辞書を作る"""
+        fields = note_fields(response.json().get("data") or {})
+        return {
+            "title": fields.get("title") or article.get("title_from_search") or "タイトル不明",
+            "author": fields.get("author") or "著者不明",
+            "published_date": fields.get("published_date"),
+            "likes": fields.get("likes", "0"),
+            "tags": fields.get("tags", []),
+            "content_preview": fields.get("content_preview", ""),
+        }
+
+
+def _is_last_page(data):
+    return bool(data.get("is_last_page", data.get("isLastPage", False)))
+
+
+BACKENDS = {HtmlBackend.name: HtmlBackend, ApiBackend.name: ApiBackend}
+
+
+def create_backend(name, crawler):
+    """名前からバックエンドを作成する"""
+    if name not in BACKENDS:
+        raise ValueError(f"不明なバックエンドです: {name}（{', '.join(BACKENDS)} のいずれかを指定してください）")
+    return BACKENDS[name](crawler)
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+sys.path.insert(0, REPO_DIR)
+sys.path.insert(0, BENCHMARK_DIR)
+
+from note_ai_crawler import NoteAICrawler  # noqa: E402
+from standin_server import StandinServer  # noqa: E402
+
+# 解析時間を計測する要素ごとの取得メソッド（記事の情報を引数に取るか）
+EXTRACTORS = [
+    ("_get_title", True),
+    ("_get_author", True),
+    ("_get_published_date", False),
+    ("_get_likes", False),
+    ("_get_tags", False),
+    ("_get_content_preview", False),
+]
+
+# 比較するときに表示する指標（名前, 結果の中のパス, 大きいほど良いか）
+COMPARED_METRICS = [
+    ("記事/秒", ("end_to_end", "articles_per_sec"), True),
+    ("最大メモリ（MiB）", ("memory", "peak_mib"), False),
+    ("構造化データ・DOMで解析（ms）", ("extractors", "parse_page_structured_ms"), False),
+    ("構造化データ・埋め込みJSONのみ（ms）", ("extractors", "parse_page_structured_embedded_ms"), False),
+    ("soupの作成（ms）", ("extractors", "soup_build_ms"), False),
+] + [(f"{name}（ms）", ("extractors", f"{name}_ms"), False) for name, _ in EXTRACTORS]
+
+
+def run_crawl(base_url, args):
+    """代替サーバーに対してクロールを1回実行し、(経過秒数, 詳細を取得した記事数, 解析の種類ごとの記事数) を返す"""
+    with tempfile.TemporaryDirectory() as output_dir:
+        crawler = NoteAICrawler(
+            search_keyword="AI",
+            max_pages=args.pages,
+            output_dir=output_dir,
+            min_wait=0,
+            max_wait=0,
+            concurrency=args.concurrency,
+            requests_per_second=0,
+            max_retries=args.max_retries,
+            use_store=False,
+            use_cache=False,
+            parser=args.parser,
+            stream=args.stream,
+            backend=args.backend,
+            base_url=base_url,
+            output_formats=("json",),
+            progress=False,
+            checkpoint=False,
+        )
+        # クローラーの進捗表示は計測結果の表示の邪魔になるため捨てる
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            crawler.run()
+            elapsed = time.perf_counter() - start
+        parsed = {kind: crawler.stats[f"parsed_{kind}"] for kind in ("structured", "dom")}
+        return elapsed, crawler.candidate_count, parsed
+
+
+def bench_end_to_end(base_url, args):
+    """クロール全体を repeat 回実行し、1秒あたりに処理した記事数の中央値を計測する"""
+    timings = []
+    articles = 0
+    parsed = {}
+    for _ in range(args.repeat):
+        elapsed, articles, parsed = run_crawl(base_url, args)
+        timings.append(elapsed)
+    median = statistics.median(timings)
+    return {
+        "articles": articles,
+        "seconds": round(median, 3),
+        "articles_per_sec": round(articles / median, 2) if median else None,
+        "runs": [round(t, 3) for t in timings],
+        "parsed": parsed,
+    }
+
+
+def bench_memory(base_url, args):
+    """tracemallocでクロール1回の最大メモリ使用量を計測する（計測中は遅くなるため、速度の計測とは分ける）"""
+    tracemalloc.start()
+    try:
+        run_crawl(base_url, args)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"peak_mib": round(peak / 2**20, 2), "retained_mib": round(current / 2**20, 2)}
+
+
+def _per_call_ms(func, number):
+    start = time.perf_counter()
+    for _ in range(number):
+        func()
+    return round((time.perf_counter() - start) * 1000 / number, 4)
+
+
+def bench_extractors(server, number):
+    """
+    記事ページのフィクスチャで、解析方法ごとと要素の取得メソッドごとの1回あたりの時間（ミリ秒）を計測する
+
+    "structured" は、埋め込みJSONのない記事ページ（DOMで解析する経路）と、記事データのJSONを埋め込んだ記事ページ
+    （HTMLの木を作らない経路）の両方で計測する。
+    """
+    from bs4 import BeautifulSoup
+
+    html = server.article_page("benchmark_user", "n0123456789ab", embedded=False)
+    embedded_html = server.article_page("benchmark_user", "n0123456789ab", embedded=True)
+    article = {"url": f"{server.base_url}/benchmark_user/n/n0123456789ab", "title_from_search": ""}
+    results = {
+        "page_bytes": len(html),
+        "embedded_page_bytes": len(embedded_html),
+        # それぞれのページで実際に通った経路（"dom" と "structured" になるはず）
+        "structured_kind": NoteAICrawler.parse_page(html, article, "structured", "utf-8")[1],
+        "structured_embedded_kind": NoteAICrawler.parse_page(embedded_html, article, "structured", "utf-8")[1],
+    }
+
+    for parser in ("structured", "compiled", "soup"):
+        results[f"parse_page_{parser}_ms"] = _per_call_ms(
+            lambda: NoteAICrawler.parse_page(html, article, parser, "utf-8"), number
+        )
+    results["parse_page_structured_embedded_ms"] = _per_call_ms(
+        lambda: NoteAICrawler.parse_page(embedded_html, article, "structured", "utf-8"), number
+    )
+
+    results["soup_build_ms"] = _per_call_ms(lambda: BeautifulSoup(html, "lxml", from_encoding="utf-8"), number)
+    soup = BeautifulSoup(html, "lxml", from_encoding="utf-8")
+    for name, takes_article in EXTRACTORS:
+        method = getattr(NoteAICrawler, name)
+        call = (lambda m=method: m(soup, article)) if takes_article else (lambda m=method: m(soup))
+        results[f"{name}_ms"] = _per_call_ms(call, number)
+    return results
+
+
+def _lookup(results, path):
+    for key in path:
+        results = (results or {}).get(key)
+    return results
+
+
+def compare(previous, current):
+    """前回の結果と比べた変化を表示する"""
+    print(f"\n{previous.get('timestamp', '前回')} との比較:")
+    for label, path, higher_is_better in COMPARED_METRICS:
+        before, after = _lookup(previous, path), _lookup(current, path)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        better = change > 0 if higher_is_better else change < 0
+        mark = "改善" if better and abs(change) >= 0.05 else "悪化" if abs(change) >= 0.05 else "同程度"
+        print(f"  {label}: {before} → {after}（{change:+.1%}、{mark}）")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="代替サーバーに対してクロールを実行し、速度・解析時間・メモリを計測する")
+    parser.add_argument("--pages", type=int, default=3, help="クロールする検索ページ数（既定: 3）")
+    parser.add_argument("--concurrency", type=int, default=4, help="詳細取得の並行数（既定: 4）")
+    parser.add_argument("--backend", choices=["html", "api"], default="html", help="取得方法（既定: html）")
+    parser.add_argument("--parser", choices=["structured", "compiled", "soup"], default="structured", help="解析方法")
+    parser.add_argument("--stream", action="store_true", help="記事ページを読み込みながら解析し、要素が揃ったら受信をやめる")
+    parser.add_argument("--max-retries", type=int, default=3, help="429/5xx時の最大リトライ回数（既定: 3）")
+    parser.add_argument("--repeat", type=int, default=3, help="クロール全体を実行する回数（既定: 3）")
+    parser.add_argument("--number", type=int, default=200, help="解析時間の計測で各処理を繰り返す回数（既定: 200）")
+    parser.add_argument("--latency", type=float, default=0.05, help="代替サーバーの平均の遅延（秒、既定: 0.05）")
+    parser.add_argument("--jitter", type=float, default=0.02, help="代替サーバーの遅延の標準偏差（秒、既定: 0.02）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="代替サーバーがエラーを返す割合（既定: 0）")
+    parser.add_argument("--error-status", type=int, default=503, help="代替サーバーが返すエラーのステータスコード")
+    parser.add_argument(
+        "--embedded-rate", type=float, default=0.0, help="記事データのJSONを埋め込んだ記事ページの割合（0〜1、既定: 0）"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="遅延とエラーの乱数のシード（既定: 0）")
+    parser.add_argument("--output", default=None, help="結果のJSONの保存先（既定: benchmarks/results/crawl_<日時>.json）")
+    parser.add_argument("--compare", default=None, help="比較する前回の結果のJSON")
+    args = parser.parse_args()
+
+    server = StandinServer(
+        search_pages=args.pages,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        embedded_rate=args.embedded_rate,
+        seed=args.seed,
+    )
+    with server:
+        end_to_end = bench_end_to_end(server.base_url, args)
+        memory = bench_memory(server.base_url, args)
+        extractors = bench_extractors(server, args.number)
+        requests_served = dict(sorted(server.counts.items()))
+
+    now = datetime.now()
+    results = {
+        "timestamp": now.isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "end_to_end": end_to_end,
+        "memory": memory,
+        "extractors": extractors,
+        "server": requests_served,
+    }
+
+    output = args.output or os.path.join(RESULTS_DIR, f"crawl_{now.strftime('%Y%m%d_%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+        f.write("\n")
+
+    print(
+        f"記事 {end_to_end['articles']} 件を {end_to_end['seconds']} 秒で処理"
+        f"（{end_to_end['articles_per_sec']} 記事/秒）、最大メモリ {memory['peak_mib']} MiB"
+    )
+    if args.parser == "structured":
+        parsed = end_to_end["parsed"]
+        print(f"クロール中の解析: 埋め込みJSONのみ {parsed['structured']} 件、DOMで解析 {parsed['dom']} 件")
+    print(
+        f"記事ページ1件の解析（{extractors['page_bytes']} バイト、"
+        f"埋め込みJSONあり {extractors['embedded_page_bytes']} バイト）:"
+    )
+    for key, value in extractors.items():
+        if key.endswith("_ms"):
+            print(f"  {key[:-3]}: {value} ms")
+    print(f"代替サーバーへのリクエスト: {requests_served}")
+    print(f"結果を保存しました: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), results)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
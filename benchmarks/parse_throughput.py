@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_DIR)
+
+from note_ai_crawler import NoteAICrawler  # noqa: E402
+from parse_pool import ParsePool  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+
+def load_pages(cache_dir, limit):
+    """レスポンスキャッシュから記事ページを読み込む"""
+    cache = ResponseCache(cache_dir)
+    try:
+        pages = []
+        for url in cache.urls(contains="/n/")[:limit]:
+            response = cache.get(url, allow_expired=True)
+            if response is not None:
+                pages.append(({"url": url, "title_from_search": ""}, response.content, response.encoding))
+        return pages
+    finally:
+        cache.close()
+
+
+def measure(pages, parser, workers, repeat):
+    """ページをすべて解析する時間を計り、1秒あたりの解析ページ数を返す（workers=0は同じプロセスで解析）"""
+    if workers == 0:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for article, html, encoding in pages:
+                NoteAICrawler.parse_page(html, article, parser, encoding)
+        return len(pages) * repeat / (time.perf_counter() - start)
+
+    pool = ParsePool(workers, parser)
+    try:
+        # ワーカーの起動時間を含めないよう、先に全ワーカーを起動しておく
+        with ThreadPoolExecutor(max_workers=workers) as threads:
+            list(threads.map(lambda page: pool.parse(page[1], page[0], page[2]), pages[: workers * 2]))
+
+            start = time.perf_counter()
+            for _ in range(repeat):
+                list(threads.map(lambda page: pool.parse(page[1], page[0], page[2]), pages))
+            return len(pages) * repeat / (time.perf_counter() - start)
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="キャッシュ済みの記事ページで、解析のワーカー数ごとのスループットを計測する")
+    parser.add_argument("--cache-dir", default=os.path.join("output", "http_cache"), help="レスポンスキャッシュのディレクトリ")
+    parser.add_argument("--parser", choices=["structured", "compiled", "soup"], default="soup", help="解析方法")
+    parser.add_argument("--workers", default=f"0,1,2,{os.cpu_count() or 1}", help="計測するワーカー数（カンマ区切り）")
+    parser.add_argument("--limit", type=int, default=500, help="使用するページ数の上限")
+    parser.add_argument("--repeat", type=int, default=3, help="全ページを解析する回数")
+    parser.add_argument("--json", action="store_true", help="計測結果をJSONで出力する")
+    args = parser.parse_args()
+
+    pages = load_pages(args.cache_dir, args.limit)
+    if not pages:
+        print(f"{args.cache_dir} に記事ページがありません。先にクロールしてキャッシュを作成してください。", file=sys.stderr)
+        return 1
+
+    worker_counts = sorted({int(w) for w in args.workers.split(",")})
+    results = {workers: round(measure(pages, args.parser, workers, args.repeat), 1) for workers in worker_counts}
+
+    if args.json:
+        print(json.dumps({"parser": args.parser, "pages": len(pages), "pages_per_sec": results}, indent=2))
+    else:
+        print(f"{len(pages)} ページ（{args.parser}）を {args.repeat} 回解析:")
+        for workers, rate in results.items():
+            label = "同じプロセス" if workers == 0 else f"ワーカー {workers}"
+            print(f"  {label}: {rate:.1f} ページ/秒")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
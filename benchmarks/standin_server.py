@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import copy
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_DIR = os.path.dirname(BENCHMARK_DIR)
+SEARCH_FIXTURE = os.path.join(REPO_DIR, "soup.html")
+ARTICLE_FIXTURE = os.path.join(BENCHMARK_DIR, "fixtures", "article.html")
+EMBEDDED_ARTICLE_FIXTURE = os.path.join(BENCHMARK_DIR, "fixtures", "article_embedded.html")
+API_SEARCH_FIXTURE = os.path.join(BENCHMARK_DIR, "fixtures", "api_search.json")
+API_NOTE_FIXTURE = os.path.join(BENCHMARK_DIR, "fixtures", "api_note.json")
+
+# 記事ページのURL（/<ユーザー名>/n/<記事ID>）
+_ARTICLE_PATH = re.compile(r"^/([^/]+)/n/(n[0-9a-z]+)$")
+# JSON APIのURL（--backend api）
+_API_HASHTAG_PATH = re.compile(r"^/api/v3/hashtags/([^/]+)/notes$")
+_API_NOTE_PATH = re.compile(r"^/api/v3/notes/(n[0-9a-z]+)$")
+_NOTE_ID_IN_LINK = re.compile(rb"/n/n([0-9a-f]{12})")
+_EMPTY_PAGE = b"<!DOCTYPE html><html><head><title>note</title></head><body></body></html>"
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # 記事ページの読み込みを途中でやめたクライアントが接続を閉じた場合は表示しない
+        if isinstance(sys.exc_info()[1], ConnectionError):
+            return
+        super().handle_error(request, client_address)
+
+
+class StandinServer:
+    def __init__(
+        self,
+        search_pages=5,
+        overlap=0.5,
+        latency=0.0,
+        jitter=0.0,
+        error_rate=0.0,
+        error_status=503,
+        embedded_rate=0.0,
+        seed=0,
+        host="127.0.0.1",
+        port=0,
+        search_fixture=SEARCH_FIXTURE,
+        article_fixture=ARTICLE_FIXTURE,
+        embedded_article_fixture=EMBEDDED_ARTICLE_FIXTURE,
+        api_search_fixture=API_SEARCH_FIXTURE,
+        api_note_fixture=API_NOTE_FIXTURE,
+    ):
+        """
+        記録したページを返すnote.comの代替サーバー（ベンチマーク用）
+
+        検索ページ（/search）とハッシュタグのページ（/hashtag/<タグ>）は search_fixture を返す。
+        2ページ目以降は記事IDを書き換えて別の記事の一覧にし、search_pages より後のページは記事のない一覧を返す。
+        検索キーワード・ハッシュタグごとにも記事IDを書き換え、overlap の割合の記事だけが他のクエリと共通になるようにする。
+        記事ページ（/<ユーザー名>/n/<記事ID>）は article_fixture のテンプレートに記事ごとの値を埋め込んで返す。
+        embedded_rate の割合の記事は、記事データのJSONとJSON-LDを含む embedded_article_fixture のテンプレートで返す。
+        JSON API（検索 /api/v3/searches、ハッシュタグ /api/v3/hashtags/<タグ>/notes、記事 /api/v3/notes/<記事ID>）は
+        記録したレスポンス（api_search_fixture, api_note_fixture）を同じ規則で書き換えて返すため、
+        HTMLとAPIのどちらのバックエンドでも同じ記事を同じ値で取得できる。
+
+        Args:
+            search_pages (int): 記事のある検索ページの数
+            overlap (float): 異なるクエリの同じページで共通になる記事の割合（0〜1）
+            latency (float): 応答までの平均の遅延（秒）
+            jitter (float): 遅延の標準偏差（秒）
+            error_rate (float): error_status を返す割合（0〜1）
+            error_status (int): エラーとして返すステータスコード
+            embedded_rate (float): 記事データのJSONを埋め込んだ記事ページを返す割合（0〜1。記事IDから決める）
+            seed (int): 遅延とエラーの乱数のシード（同じ値なら同じ順序でエラーを返す）
+            host (str): 待ち受けるアドレス
+            port (int): 待ち受けるポート（0の場合は空いているポート）
+            search_fixture (str): 検索ページのHTMLファイル
+            article_fixture (str): 記事ページのテンプレートのファイル
+            embedded_article_fixture (str): 記事データのJSONを埋め込んだ記事ページのテンプレートのファイル
+            api_search_fixture (str): 検索APIのレスポンスを記録したJSONファイル
+            api_note_fixture (str): 記事詳細APIのレスポンスを記録したJSONファイル
+        """
+        self.search_pages = search_pages
+        self.overlap = overlap
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.embedded_rate = embedded_rate
+        self.counts = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        with open(search_fixture, "rb") as f:
+            self._search_html = f.read()
+        with open(article_fixture, encoding="utf-8") as f:
+            self._article_template = f.read()
+        with open(embedded_article_fixture, encoding="utf-8") as f:
+            self._embedded_template = f.read()
+        with open(api_search_fixture, encoding="utf-8") as f:
+            self._api_notes = json.load(f)["data"]["notes"]["contents"]
+        with open(api_note_fixture, encoding="utf-8") as f:
+            self._api_note = json.load(f)["data"]
+        self._pages = {}
+        # 検索APIで返した記事のユーザー名（記事詳細APIのURLには記事IDしか含まれないため）
+        self._note_users = {}
+        self._server = _Server((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """別スレッドで待ち受けを開始し、ベースURLを返す"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        """このスレッドで待ち受ける（Ctrl-Cで停止する）"""
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._server.server_close()
+
+    def stop(self):
+        """待ち受けを停止する"""
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def search_page(self, page, query=""):
+        """検索ページのHTMLを返す（ページとクエリごとに記事IDを書き換える）"""
+        if page < 1 or page > self.search_pages:
+            return _EMPTY_PAGE
+        with self._lock:
+            if (page, query) not in self._pages:
+                self._pages[(page, query)] = _NOTE_ID_IN_LINK.sub(
+                    lambda match: b"/n/n" + self._rewrite_note_id(match.group(1), page, query),
+                    self._search_html,
+                )
+            return self._pages[(page, query)]
+
+    def _rewrite_note_id(self, note_id, page, query):
+        """記録した記事ID（先頭の n を除く16進数のバイト列）を、ページとクエリごとの記事IDに書き換える"""
+        suffix = b"" if page == 1 else str(page).encode()
+        # 記事IDから決まる割合の記事は、クエリによらず同じ記事IDにする
+        if int(hashlib.sha1(note_id).hexdigest()[:4], 16) >= self.overlap * 0x10000:
+            suffix += query.encode("utf-8")
+        if not suffix:
+            return note_id
+        return hashlib.sha1(note_id + suffix).hexdigest()[:12].encode()
+
+    def api_search_page(self, page, query=""):
+        """検索・ハッシュタグの記事一覧APIのJSONを返す（検索ページのHTMLと同じ規則で記事IDを書き換える）"""
+        with self._lock:
+            key = ("api", page, query)
+            if key not in self._pages:
+                contents = []
+                if 1 <= page <= self.search_pages:
+                    for recorded in self._api_notes:
+                        note = copy.deepcopy(recorded)
+                        user = note["user"]["urlname"]
+                        note_id = "n" + self._rewrite_note_id(note["key"][1:].encode(), page, query).decode()
+                        note["key"] = note_id
+                        note["noteUrl"] = f"{self.base_url}/{user}/n/{note_id}"
+                        self._note_users[note_id] = user
+                        contents.append(note)
+                data = {"notes": {"contents": contents, "isLastPage": page >= self.search_pages}}
+                self._pages[key] = json.dumps({"data": data}, ensure_ascii=False).encode("utf-8")
+            return self._pages[key]
+
+    def _article_values(self, user, note_id):
+        """記事ごとの値（いいね数・投稿日などは記事IDから決める）"""
+        number = int(hashlib.sha1(note_id.encode()).hexdigest()[:8], 16)
+        published = datetime(2025, 1, 1, 9, 0) + timedelta(days=number % 365, minutes=number % 1440)
+        return {
+            "NOTE_ID": note_id,
+            "TITLE": f"生成AIを仕事に取り入れる方法 {note_id}",
+            "AUTHOR": user,
+            "URL": f"{self.base_url}/{user}/n/{note_id}",
+            "PUBLISHED": published.strftime("%Y-%m-%dT%H:%M:%S.000+09:00"),
+            "LIKES": str(number % 500),
+            "TAG": ("機械学習", "LLM", "プロンプト", "仕事術")[number % 4],
+        }
+
+    def article_page(self, user, note_id, embedded=None):
+        """
+        記事ページのHTMLを返す
+
+        Args:
+            user (str): ユーザー名
+            note_id (str): 記事ID
+            embedded (bool): 記事データのJSONを埋め込むか。未指定の場合は embedded_rate に従って記事IDから決める
+        """
+        if embedded is None:
+            embedded = int(hashlib.sha1(note_id.encode()).hexdigest()[8:12], 16) < self.embedded_rate * 0x10000
+        html = self._embedded_template if embedded else self._article_template
+        for name, value in self._article_values(user, note_id).items():
+            html = html.replace("{{" + name + "}}", value)
+        return html.encode("utf-8")
+
+    def api_note(self, note_id):
+        """記事詳細APIのJSONを返す（記事ページのHTMLと同じ値を埋め込む）"""
+        with self._lock:
+            user = self._note_users.get(note_id, self._api_note["user"]["urlname"])
+        values = self._article_values(user, note_id)
+        note = copy.deepcopy(self._api_note)
+        note.update(
+            key=note_id,
+            name=values["TITLE"],
+            publishAt=values["PUBLISHED"],
+            likeCount=int(values["LIKES"]),
+            noteUrl=values["URL"],
+        )
+        note["user"].update(name=user, urlname=user, nickname=user)
+        note["hashtags"][-1] = {"hashtag": {"name": "#" + values["TAG"]}}
+        return json.dumps({"data": note}, ensure_ascii=False).encode("utf-8")
+
+    def _delay_and_error(self):
+        with self._lock:
+            delay = max(0.0, self._random.gauss(self.latency, self.jitter)) if self.latency or self.jitter else 0.0
+            error = self.error_rate > 0 and self._random.random() < self.error_rate
+        return delay, error
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                delay, error = server._delay_and_error()
+                if delay:
+                    time.sleep(delay)
+
+                params = parse_qs(url.query)
+                content_type = "text/html; charset=utf-8"
+                if url.path.startswith("/api/"):
+                    content_type = "application/json; charset=utf-8"
+                    hashtag = _API_HASHTAG_PATH.match(url.path)
+                    note = _API_NOTE_PATH.match(url.path)
+                    if url.path == "/api/v3/searches":
+                        kind = "search"
+                        size = int(params.get("size", ["20"])[0] or 20)
+                        page = int(params.get("start", ["0"])[0] or 0) // size + 1
+                        body = server.api_search_page(page, params.get("q", [""])[0])
+                    elif hashtag:
+                        kind = "search"
+                        page = int(params.get("page", ["1"])[0] or 1)
+                        body = server.api_search_page(page, "/hashtag/" + unquote(hashtag.group(1)))
+                    else:
+                        kind = "article"
+                        body = server.api_note(note.group(1)) if note else None
+                elif url.path in ("/search", "/search/notes") or url.path.startswith("/hashtag/"):
+                    kind = "search"
+                    page = int(params.get("page", ["1"])[0] or 1)
+                    query = params["q"][0] if "q" in params else unquote(url.path)
+                    body = server.search_page(page, query)
+                else:
+                    kind = "article"
+                    match = _ARTICLE_PATH.match(url.path)
+                    body = server.article_page(*match.groups()) if match else None
+
+                if error:
+                    status, body = server.error_status, b"Service Unavailable"
+                elif body is None:
+                    status, body = 404, b"Not Found"
+                else:
+                    status = 200
+                if status != 200:
+                    content_type = "text/plain; charset=utf-8"
+                with server._lock:
+                    server.counts[f"{kind}_{status}"] += 1
+
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="記録したページを返すnote.comの代替サーバーを起動する")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けるアドレス（既定: 127.0.0.1）")
+    parser.add_argument("--port", type=int, default=8080, help="待ち受けるポート（既定: 8080）")
+    parser.add_argument("--search-pages", type=int, default=5, help="記事のある検索ページの数（既定: 5）")
+    parser.add_argument(
+        "--overlap", type=float, default=0.5, help="異なるクエリで共通になる記事の割合（0〜1、既定: 0.5）"
+    )
+    parser.add_argument("--latency", type=float, default=0.05, help="応答までの平均の遅延（秒、既定: 0.05）")
+    parser.add_argument("--jitter", type=float, default=0.02, help="遅延の標準偏差（秒、既定: 0.02）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="エラーを返す割合（0〜1、既定: 0）")
+    parser.add_argument("--error-status", type=int, default=503, help="エラーとして返すステータスコード（既定: 503）")
+    parser.add_argument(
+        "--embedded-rate", type=float, default=0.0, help="記事データのJSONを埋め込んだ記事ページの割合（0〜1、既定: 0）"
+    )
+    args = parser.parse_args()
+
+    server = StandinServer(
+        search_pages=args.search_pages,
+        overlap=args.overlap,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        embedded_rate=args.embedded_rate,
+        host=args.host,
+        port=args.port,
+    )
+    print(f"代替サーバーを {server.base_url} で起動しました（例: python cli.py crawl --base-url {server.base_url}）")
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# 計測するコマンド（名前, Pythonに渡す引数）
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TARGETS = [
+    ("cli_help", ["cli.py", "--help"]),
+    ("crawl_help", ["cli.py", "crawl", "--help"]),
+    ("import_crawler", ["-c", "import note_ai_crawler"]),
+]
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_baseline.json")
+
+
+def measure(args, repeat):
+    """コマンドを repeat 回実行し、起動から終了までの時間（ミリ秒）の中央値を返す"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, *args], cwd=REPO_DIR, stdout=subprocess.DEVNULL, check=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def slowest_imports(module, limit=10):
+    """-X importtime の出力から、読み込みに時間のかかったモジュール（累積時間の長い順）を返す"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_DIR,
+        stderr=subprocess.PIPE,
+        stdout=subprocess.DEVNULL,
+        text=True,
+        check=True,
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            imports.append((parts[2].strip(), int(parts[1]) / 1000))
+    return sorted(imports, key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CLIの起動時間を計測し、基準値より遅くなっていないか確認する")
+    parser.add_argument("--repeat", type=int, default=7, help="各コマンドの実行回数（既定: 7）")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="基準値に対して許容する増加率（既定: 0.25）")
+    parser.add_argument("--update", action="store_true", help="計測結果を基準値として保存する")
+    parser.add_argument("--json", action="store_true", help="計測結果をJSONで出力する")
+    args = parser.parse_args()
+
+    results = {name: round(measure(target, args.repeat), 1) for name, target in TARGETS}
+
+    baseline = {}
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressions = [
+        name for name, ms in results.items() if name in baseline and ms > baseline[name] * (1 + args.tolerance)
+    ]
+
+    if args.json:
+        print(json.dumps({"results_ms": results, "baseline_ms": baseline, "regressions": regressions}, indent=2))
+    else:
+        for name, ms in results.items():
+            reference = f"（基準値 {baseline[name]:.1f} ms）" if name in baseline else ""
+            print(f"{name}: {ms:.1f} ms{reference}")
+        print("import note_ai_crawler で時間のかかったモジュール:")
+        for module, ms in slowest_imports("note_ai_crawler"):
+            print(f"  {ms:8.1f} ms  {module}")
+
+    if args.update:
+        with open(BASELINE_PATH, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        return 0
+
+    if regressions:
+        print(f"起動時間が基準値より {args.tolerance:.0%} 以上遅くなりました: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,9 +3,10 @@
 
 import json
 
-import requests
 from bs4 import BeautifulSoup
 
+from http_client import HttpClient
+
 
 def check_note_structure():
     """noteのWebサイト構造を確認する"""
@@ -22,7 +23,7 @@ def check_note_structure():
 
     try:
         # 検索ページを取得
-        response = requests.get(search_url, params=params, headers=headers)
+        response = HttpClient(headers=headers).get(search_url, params=params)
         response.raise_for_status()
 
         # BeautifulSoupでHTMLを解析
@@ -1,9 +1,10 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import requests
 from bs4 import BeautifulSoup
 
+from http_client import HttpClient
+
 
 def check_title():
     """特定の記事ページのHTMLを解析して、タイトル要素を確認する"""
@@ -14,7 +15,7 @@ def check_title():
     }
 
     try:
-        response = requests.get(url, headers=headers)
+        response = HttpClient(headers=headers).get(url)
         response.raise_for_status()
 
         soup = BeautifulSoup(response.text, "lxml")
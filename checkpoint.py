@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from article_record import ArticleRecord
+
+
+def _dumps(article):
+    # 再開したときに関連度ゲートとタイトルの代わりに使えるよう、検索結果ページのフィールドも保存する
+    return json.dumps(ArticleRecord.from_dict(article).to_dict(search=True), ensure_ascii=False)
+
+
+class Checkpoint:
+    def __init__(self, path, commit_interval=2.0):
+        """
+        クロールの途中経過を保存し、中断したところから再開するためのSQLiteのチェックポイント
+
+        取得し終えた検索ページ、検索結果から見つかった記事（詳細取得待ち・取得済み・ゲートで除外）、
+        取得済みの記事の記録を保存する。書き込みは commit_interval 秒ごとと検索ページを取得し終えるたびに確定する。
+
+        Args:
+            path (str): SQLiteファイルのパス
+            commit_interval (float): 書き込みを確定する間隔（秒）
+        """
+        self.path = path
+        self.commit_interval = commit_interval
+        self._lock = threading.Lock()
+        self._last_commit = time.monotonic()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS candidates (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                key TEXT NOT NULL UNIQUE,
+                decision TEXT NOT NULL,
+                status TEXT NOT NULL,
+                article TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, name, default=None):
+        """保存した値を返す"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM meta WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def set(self, name, value):
+        """値を保存する（次の確定のタイミングで書き込まれる）"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO meta (name, value) VALUES (?, ?)", (name, json.dumps(value, ensure_ascii=False))
+            )
+            self._commit_if_due()
+
+    def add_candidate(self, key, article, decision):
+        """検索結果から見つかった記事を記録する（ゲートで除外した記事も、再度取得しないよう記録する）"""
+        status = "skipped" if decision == "skip" else "pending"
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR IGNORE INTO candidates (key, decision, status, article) VALUES (?, ?, ?, ?)",
+                (key, decision, status, _dumps(article)),
+            )
+            self._commit_if_due()
+
+    def finish(self, key, article):
+        """詳細を取得し終えた記事の記録を保存する"""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE candidates SET status = 'done', article = ? WHERE key = ?",
+                (_dumps(article), key),
+            )
+            self._commit_if_due()
+
+    def candidates(self):
+        """記録した記事を見つかった順に返す"""
+        with self._lock:
+            rows = self._conn.execute("SELECT key, decision, status, article FROM candidates ORDER BY seq").fetchall()
+        return [
+            {"key": key, "decision": decision, "status": status, "article": ArticleRecord.from_dict(json.loads(article))}
+            for key, decision, status, article in rows
+        ]
+
+    def _commit_if_due(self):
+        if time.monotonic() - self._last_commit >= self.commit_interval:
+            self._conn.commit()
+            self._last_commit = time.monotonic()
+
+    def commit(self):
+        """書き込みをすぐに確定する"""
+        with self._lock:
+            self._conn.commit()
+            self._last_commit = time.monotonic()
+
+    def close(self):
+        """書き込みを確定してデータベースを閉じる"""
+        with self._lock:
+            self._conn.commit()
+            self._conn.close()
+
+    def remove(self):
+        """データベースを閉じて削除する（クロールが最後まで完了した場合）"""
+        self.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
@@ -0,0 +1,369 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import sys
+
+# noteのAI記事クローラーのコマンドラインインターフェース
+#
+# 起動を速くするため、このモジュールでは標準ライブラリだけを読み込み、
+# クローラー本体（requests, lxml など）は引数を解析した後、実行するコマンドが必要とするときに読み込む。
+#
+# 使用例:
+#     python cli.py crawl --keyword ChatGPT --pages 3 --formats csv,json,parquet
+#     python cli.py crawl --hashtag AI --pages 20
+#     python cli.py crawl -k ChatGPT -k Claude -t 生成AI --pages 3
+#     python cli.py compact --output-dir output
+#     python cli.py search Claude --tag 生成AI --since 2025-09-01 --until 2025-09-30
+#     python cli.py queue enqueue --keyword AI --pages 10 --shards 2
+#     python cli.py worker --shard 0
+
+
+def _formats(value):
+    """カンマ区切りの出力形式を解析する"""
+    formats = tuple(f.strip().lower() for f in value.split(",") if f.strip())
+    unknown = set(formats) - {"csv", "json", "parquet"}
+    if unknown:
+        raise argparse.ArgumentTypeError(f"未対応の出力形式です: {', '.join(sorted(unknown))}")
+    return formats
+
+
+# 記事ページから取得するフィールド（extractor.ARTICLE_FIELDS と同じ）
+ARTICLE_FIELDS = ("title", "author", "published_date", "likes", "tags", "content_preview")
+
+
+def _fields(value):
+    """カンマ区切りのフィールド名を解析する"""
+    fields = tuple(f.strip() for f in value.split(",") if f.strip())
+    unknown = set(fields) - set(ARTICLE_FIELDS)
+    if unknown:
+        raise argparse.ArgumentTypeError(
+            f"不明なフィールドです: {', '.join(sorted(unknown))}（{', '.join(ARTICLE_FIELDS)} から選んでください）"
+        )
+    return fields
+
+
+def _add_fetch_arguments(parser):
+    """記事の取得に関するオプション（crawl と worker で共通）を追加する"""
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="詳細取得の並行数（既定: 4）")
+    parser.add_argument(
+        "--rps", type=float, default=1.0, help="詳細取得の最大リクエスト数（毎秒、0で無制限。既定: 1.0）"
+    )
+    parser.add_argument("--min-wait", type=float, default=1.0, help="検索ページの最小取得間隔（秒、既定: 1.0）")
+    parser.add_argument(
+        "--max-wait", type=float, default=3.0, help="検索ページの初期の取得間隔の目安（min-waitとの平均で開始。既定: 3.0）"
+    )
+    parser.add_argument("--max-retries", type=int, default=3, help="429/5xx時の最大リトライ回数（既定: 3）")
+    parser.add_argument("--backend", choices=["html", "api"], default="html", help="取得方法（既定: html）")
+    parser.add_argument(
+        "--parser", choices=["structured", "compiled", "soup"], default="structured", help="記事ページの解析方法"
+    )
+    parser.add_argument(
+        "--parse-workers", type=int, default=0, help="記事ページの解析に使うワーカープロセスの数（既定: 0。取得したスレッドで解析）"
+    )
+    parser.add_argument(
+        "--stream", action="store_true", help="記事ページを読み込みながら解析し、必要な要素が揃ったら受信をやめる"
+    )
+    parser.add_argument(
+        "--stream-fields",
+        type=_fields,
+        default=ARTICLE_FIELDS,
+        help="--stream で値が確定するまで読み込むフィールド（カンマ区切り。既定: すべて）",
+    )
+    parser.add_argument(
+        "--max-page-bytes",
+        type=int,
+        default=2 * 1024 * 1024,
+        help="--stream で記事ページ1件から読み込む最大バイト数（既定: 2097152）",
+    )
+    parser.add_argument("--base-url", default="https://note.com", help="noteのURL（代替サーバーで試験する場合に変更）")
+    parser.add_argument("--relevance-threshold", type=int, default=None, help="詳細取得前の関連度ゲートのしきい値")
+    parser.add_argument("--gate-sample-rate", type=float, default=0.1, help="関連度ゲートの抜き取り確認の割合")
+    parser.add_argument("--no-store", action="store_true", help="取得済み記事のSQLiteストアを使わない")
+    parser.add_argument("--store-ttl-hours", type=float, default=24.0, help="保存済みの記事を再利用する期間（時間）")
+    parser.add_argument("--no-cache", action="store_true", help="レスポンスキャッシュを使わない")
+    parser.add_argument("--replay", action="store_true", help="ネットワークに接続せず、レスポンスキャッシュのみで実行する")
+
+
+def _add_metrics_arguments(parser):
+    """処理段階ごとの計測に関するオプション（crawl と worker で共通）を追加する"""
+    parser.add_argument(
+        "--metrics-file", default=None, help="終了時に指標をPrometheusのテキスト形式で書き出すファイル（既定: 計測しない）"
+    )
+    parser.add_argument(
+        "--metrics-port", type=int, default=None, help="実行中に指標を http://127.0.0.1:<port>/metrics で公開する"
+    )
+    parser.add_argument("--log-json", default=None, help="処理段階の終了やエラーをJSONで1行ずつ追記するファイル")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="note-ai-crawler", description="noteからAI関連の記事を収集する")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    crawl = subparsers.add_parser("crawl", help="記事を検索して詳細を取得し、AI関連の記事を保存する")
+    crawl.add_argument(
+        "-k", "--keyword", action="append", help="検索キーワード（複数指定可。既定: -t を指定しない場合は AI）"
+    )
+    crawl.add_argument(
+        "-t", "--hashtag", action="append", help="このハッシュタグの新着順の一覧をたどる（複数指定可。例: AI）"
+    )
+    crawl.add_argument(
+        "--full", action="store_true", help="ハッシュタグの一覧を、前回取得した記事で止めずに --pages まで取得する"
+    )
+    crawl.add_argument("-p", "--pages", type=int, default=5, help="検索する最大ページ数（既定: 5）")
+    crawl.add_argument("-o", "--output-dir", default="output", help="出力ディレクトリ（既定: output）")
+    crawl.add_argument(
+        "-f",
+        "--formats",
+        type=_formats,
+        default=("csv", "json"),
+        help="JSONLに加えて保存する形式をカンマ区切りで指定（csv, json, parquet。既定: csv,json）",
+    )
+    _add_fetch_arguments(crawl)
+    crawl.add_argument("--resume", action="store_true", help="前回中断したクロールをチェックポイントから再開する")
+    crawl.add_argument("--no-checkpoint", action="store_true", help="途中経過をチェックポイントに保存しない")
+    crawl.add_argument("--no-progress", action="store_true", help="進捗バーを表示しない（cronでの実行向け）")
+    crawl.add_argument("--no-index", action="store_true", help="保存した結果を全文検索の索引に追加しない")
+    _add_metrics_arguments(crawl)
+
+    compact = subparsers.add_parser("compact", help="過去の実行結果を投稿日ごとのParquetデータセットにまとめる")
+    compact.add_argument("-o", "--output-dir", default="output", help="過去の実行結果があるディレクトリ")
+    compact.add_argument("--dataset-dir", default=None, help="データセットのディレクトリ（既定: <output-dir>/parquet）")
+
+    search = subparsers.add_parser("search", help="全文検索の索引から、キーワード・タグ・著者・投稿日で記事を探す")
+    search.add_argument("text", nargs="*", help="タイトル・著者・タグ・本文の一部から探す語（複数指定するとすべてを含む記事）")
+    search.add_argument("-t", "--tag", action="append", help="タグ（複数指定するとすべてのタグが付いた記事）")
+    search.add_argument("-a", "--author", default=None, help="著者（大文字と小文字を区別しない完全一致）")
+    search.add_argument("--since", default=None, help="この日以降に投稿された記事（YYYY-MM-DD、またはISO 8601形式の日時）")
+    search.add_argument("--until", default=None, help="この日まで（その日を含む）に投稿された記事（YYYY-MM-DD）")
+    search.add_argument(
+        "-s", "--sort", choices=["date", "likes", "relevance"], default="date", help="並び順（既定: date。新しい順）"
+    )
+    search.add_argument("-n", "--limit", type=int, default=20, help="表示する最大件数（0ですべて。既定: 20）")
+    search.add_argument("--json", action="store_true", help="結果を1行1件のJSONで出力する")
+    search.add_argument("-o", "--output-dir", default="output", help="過去の実行結果と索引があるディレクトリ（既定: output）")
+    search.add_argument(
+        "--no-sync", action="store_true", help="索引に未追加の過去の実行結果を、検索する前に追加しない"
+    )
+
+    queue = subparsers.add_parser("queue", help="複数のワーカーで分担してクロールするための作業キューを操作する")
+    queue_commands = queue.add_subparsers(dest="queue_command", required=True)
+    enqueue = queue_commands.add_parser("enqueue", help="検索ページのタスクを作業キューに追加する")
+    enqueue.add_argument("-k", "--keyword", action="append", help="検索キーワード（複数指定可。既定: AI）")
+    enqueue.add_argument("-p", "--pages", type=int, default=5, help="キーワードごとに検索する最大ページ数（既定: 5）")
+    enqueue.add_argument("--shards", type=int, default=1, help="記事のタスクを分けるシャードの数（新しく作成するとき）")
+    serve = queue_commands.add_parser("serve", help="作業キューをHTTPで公開し、別のマシンのワーカーから使えるようにする")
+    serve.add_argument(
+        "--host",
+        default="127.0.0.1",
+        help="待ち受けるアドレス（既定: 127.0.0.1。別のマシンのワーカーに公開する場合は 0.0.0.0 など）",
+    )
+    serve.add_argument("--port", type=int, default=8765, help="待ち受けるポート（既定: 8765）")
+    stats = queue_commands.add_parser("stats", help="種類と状態ごとのタスク数を表示する")
+    merge = queue_commands.add_parser("merge", help="ワーカーが取得したAI関連の記事を1つの出力にまとめる")
+    merge.add_argument("-o", "--output-dir", default="output", help="出力ディレクトリ（既定: output）")
+    merge.add_argument("-f", "--formats", type=_formats, default=("csv", "json"), help="JSONLに加えて保存する形式")
+    for command in (enqueue, serve, stats, merge):
+        command.add_argument(
+            "-q", "--queue", default="output/queue.sqlite", help="作業キュー（SQLiteファイルのパス、またはブローカーのURL）"
+        )
+
+    worker = subparsers.add_parser("worker", help="作業キューからタスクを取得して処理する")
+    worker.add_argument(
+        "-q", "--queue", default="output/queue.sqlite", help="作業キュー（SQLiteファイルのパス、またはブローカーのURL）"
+    )
+    worker.add_argument("--shard", type=int, default=None, help="担当するシャードの番号（既定: すべてのシャード）")
+    worker.add_argument("--worker-id", default=None, help="ワーカーの識別子（既定: ホスト名とプロセスID）")
+    worker.add_argument("--lease-seconds", type=float, default=300.0, help="タスクのリースの期限（秒、既定: 300）")
+    worker.add_argument("-o", "--output-dir", default="output", help="ストアとキャッシュを置くディレクトリ（既定: output）")
+    worker.add_argument("--no-progress", action="store_true", help="進捗バーを表示しない")
+    _add_fetch_arguments(worker)
+    _add_metrics_arguments(worker)
+
+    return parser
+
+
+def _create_metrics(args):
+    """計測のオプションが指定されていれば指標を作成する（指定がなければNoneで、計測しない）"""
+    if not (args.metrics_file or args.metrics_port is not None or args.log_json):
+        return None
+
+    from metrics import Metrics
+
+    metrics = Metrics(prometheus_path=args.metrics_file, json_log_path=args.log_json)
+    if args.metrics_port is not None:
+        print(f"指標を {metrics.serve(args.metrics_port)} で公開しています")
+    return metrics
+
+
+def _create_crawler(args, **kwargs):
+    """コマンドライン引数からクローラーを作成する"""
+    from note_ai_crawler import NoteAICrawler
+
+    return NoteAICrawler(
+        output_dir=args.output_dir,
+        min_wait=args.min_wait,
+        max_wait=args.max_wait,
+        concurrency=args.concurrency,
+        requests_per_second=args.rps,
+        max_retries=args.max_retries,
+        use_store=not args.no_store,
+        store_ttl_hours=args.store_ttl_hours,
+        use_cache=not args.no_cache,
+        replay=args.replay,
+        parser=args.parser,
+        backend=args.backend,
+        base_url=args.base_url,
+        relevance_threshold=args.relevance_threshold,
+        gate_sample_rate=args.gate_sample_rate,
+        progress=not args.no_progress,
+        parse_workers=args.parse_workers,
+        stream=args.stream,
+        stream_fields=args.stream_fields,
+        max_page_bytes=args.max_page_bytes,
+        metrics=_create_metrics(args),
+        **kwargs,
+    )
+
+
+def run_crawl(args):
+    # 複数のキーワード・ハッシュタグを指定した場合は、まとめて取得して同じ記事の詳細は1回だけ取得する
+    keywords = args.keyword or ([] if args.hashtag else ["AI"])
+    hashtags = [f"#{hashtag.lstrip('#')}" for hashtag in args.hashtag or []]
+    crawler = _create_crawler(
+        args,
+        queries=keywords + hashtags,
+        incremental=not args.full,
+        max_pages=args.pages,
+        output_formats=args.formats,
+        checkpoint=not args.no_checkpoint,
+        resume=args.resume,
+        search_index=not args.no_index,
+    )
+    try:
+        # 記事が見つからなかった場合は終了コード1を返す（ハッシュタグの一覧に新着記事がなかった場合は0）
+        return 0 if crawler.run() else 1
+    finally:
+        crawler.metrics.close()
+
+
+def run_compact(args):
+    from parquet_dataset import compact
+
+    result = compact(args.output_dir, args.dataset_dir)
+    print(
+        f"{result['read']} 件の記録を {result['articles']} 件の記事にまとめ、"
+        f"{result['partitions']} 個のパーティションに保存しました。"
+    )
+    return 0
+
+
+def run_search(args):
+    import json
+    import os
+    import time
+
+    from search_index import SearchIndex
+
+    if not os.path.isdir(args.output_dir):
+        print(f"出力ディレクトリがありません: {args.output_dir}")
+        return 1
+    try:
+        index = SearchIndex(os.path.join(args.output_dir, "search_index.sqlite"))
+    except RuntimeError as e:
+        print(e, file=sys.stderr)
+        return 1
+    try:
+        if not args.no_sync:
+            synced = index.sync(args.output_dir)
+            if synced:
+                print(f"過去の実行結果 {synced} 件を索引に追加しました。", file=sys.stderr)
+        start = time.perf_counter()
+        try:
+            results = index.search(
+                " ".join(args.text),
+                tags=args.tag,
+                author=args.author,
+                since=args.since,
+                until=args.until,
+                sort=args.sort,
+                limit=args.limit or None,
+            )
+        except ValueError as e:
+            print(e, file=sys.stderr)
+            return 2
+        elapsed = time.perf_counter() - start
+    finally:
+        index.close()
+
+    if args.json:
+        for result in results:
+            print(json.dumps(result, ensure_ascii=False))
+    else:
+        for result in results:
+            published = (result["published_date"] or "")[:16].replace("T", " ") or "投稿日不明"
+            tags = " ".join(f"#{tag.lstrip('#')}" for tag in result["tags"])
+            print(f"{published}  ♡{result['likes'] or 0}  {result['author'] or ''}  {result['title'] or ''}")
+            print(f"    {result['url']}  {tags}".rstrip())
+    print(f"{len(results)} 件（{elapsed * 1000:.1f} ms）", file=sys.stderr)
+    # 記事が見つからなかった場合は終了コード1を返す
+    return 0 if results else 1
+
+
+def run_queue(args):
+    import json
+
+    from work_queue import enqueue_searches, open_queue, serve
+
+    work_queue = open_queue(args.queue, num_shards=getattr(args, "shards", None))
+    try:
+        if args.queue_command == "enqueue":
+            keywords = args.keyword or ["AI"]
+            added = enqueue_searches(work_queue, keywords, args.pages)
+            print(f"検索ページのタスクを {added} 件追加しました（シャード数: {work_queue.num_shards}）。")
+        elif args.queue_command == "serve":
+            serve(work_queue, args.host, args.port)
+        elif args.queue_command == "stats":
+            print(json.dumps(work_queue.stats(), ensure_ascii=False, indent=2))
+        elif args.queue_command == "merge":
+            from note_ai_crawler import NoteAICrawler
+
+            crawler = NoteAICrawler(
+                output_dir=args.output_dir, output_formats=args.formats, use_store=False, use_cache=False, checkpoint=False
+            )
+            return 0 if crawler.merge_queue_results(work_queue) else 1
+    finally:
+        work_queue.close()
+    return 0
+
+
+def run_worker(args):
+    from work_queue import open_queue
+
+    crawler = _create_crawler(args, checkpoint=False)
+    work_queue = open_queue(args.queue)
+    try:
+        processed = crawler.run_worker(
+            work_queue, worker_id=args.worker_id, shard=args.shard, lease_seconds=args.lease_seconds
+        )
+    finally:
+        work_queue.close()
+        crawler.print_stats()
+        crawler.metrics.close()
+    print(
+        f"検索ページ {processed['search']} 件、記事 {processed['detail']} 件"
+        f"（うちAI関連 {processed['relevant']} 件）を処理しました。失敗: {processed['failed']} 件"
+    )
+    return 0
+
+
+COMMANDS = {"crawl": run_crawl, "compact": run_compact, "search": run_search, "queue": run_queue, "worker": run_worker}
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return COMMANDS[args.command](args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,10 +1,11 @@
-import requests
 from bs4 import BeautifulSoup
 
+from http_client import HttpClient
+
 params = {"f": "new", "paid_only": "false", "page": "50000"}
 search_url = "https://note.com/hashtag/AI"
 
-response = requests.get(search_url, params=params)
+response = HttpClient().get(search_url, params=params)
 response.raise_for_status()
 
 soup = BeautifulSoup(response.text, "lxml")
@@ -21,8 +22,3 @@ article_links = soup.find_all("a", class_=["a-link", "m-largeNoteWrapper__link",
 with open("article_links.txt", "w") as f:
     for link in article_links:
         f.write(link.get("href") + "\n")
-
-# 記事リンクをファイルに保存
-with open("article_links.txt", "w") as f:
-    for link in article_links:
-        f.write(link.get("href") + "\n")
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import sqlite3
+import threading
+import time
+
+
+class CrawlStore:
+    def __init__(self, path):
+        """
+        記事IDをキーに取得済みの記事を保存するSQLiteストア
+
+        前回の取得日時、ETag/Last-Modified、本文のハッシュ値、抽出済みのフィールドを記録し、
+        次回以降のクロールで再取得の要否判定と条件付きGETに使用する。
+
+        Args:
+            path (str): SQLiteファイルのパス
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                note_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                record TEXT NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, note_id):
+        """記事IDに対応する保存済みの情報を返す。未保存の場合はNoneを返す"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, fetched_at, etag, last_modified, content_hash, record FROM articles WHERE note_id = ?",
+                (note_id,),
+            ).fetchone()
+        if row is None:
+            return None
+
+        url, fetched_at, etag, last_modified, content_hash, record = row
+        return {
+            "note_id": note_id,
+            "url": url,
+            "fetched_at": fetched_at,
+            "etag": etag,
+            "last_modified": last_modified,
+            "content_hash": content_hash,
+            "record": json.loads(record),
+        }
+
+    def put(self, note_id, url, record, etag=None, last_modified=None, content_hash=None):
+        """取得した記事の情報を保存する"""
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO articles
+                    (note_id, url, fetched_at, etag, last_modified, content_hash, record)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                """,
+                (note_id, url, time.time(), etag, last_modified, content_hash, json.dumps(record, ensure_ascii=False)),
+            )
+            self._conn.commit()
+
+    def touch(self, note_id):
+        """内容が変わっていないことを確認した記事の取得日時を更新する"""
+        with self._lock:
+            self._conn.execute("UPDATE articles SET fetched_at = ? WHERE note_id = ?", (time.time(), note_id))
+            self._conn.commit()
+
+    def close(self):
+        """データベースを閉じる"""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,401 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+
+from lxml import etree
+
+# CSSセレクタの属性条件（[name], [name='v'], [name^='v'], [name*='v']）
+_ATTR_PATTERN = re.compile(r"\[\s*([\w-]+)\s*(?:([\^*]?=)\s*['\"]?([^'\"\]]*)['\"]?\s*)?\]")
+# CSSセレクタのタグ名とクラス名
+_TAG_PATTERN = re.compile(r"^[\w-]+|^\*")
+_CLASS_PATTERN = re.compile(r"\.([\w-]+)")
+
+# タイトルやメタタグから "｜note" や "｜著者名" などの部分を削除する
+_TITLE_SUFFIX_PATTERN = re.compile(r"[\s\|｜].*$")
+_DIGITS_PATTERN = re.compile(r"\d+")
+_AUTHOR_URL_PATTERN = re.compile(r"note\.com/([^/]+)")
+
+# 記事ページから取得するフィールド
+ARTICLE_FIELDS = ("title", "author", "published_date", "likes", "tags", "content_preview")
+
+
+class _Compound:
+    """子孫結合子を含まない単一のセレクタ（例: div.note-body, a[href^='/hashtag/']）"""
+
+    __slots__ = ("tag", "classes", "attrs")
+
+    def __init__(self, text):
+        tag_match = _TAG_PATTERN.match(text)
+        self.tag = tag_match.group(0).lower() if tag_match and tag_match.group(0) != "*" else None
+        without_attrs = _ATTR_PATTERN.sub("", text)
+        self.classes = tuple(_CLASS_PATTERN.findall(without_attrs))
+        self.attrs = tuple((name, op, value) for name, op, value in _ATTR_PATTERN.findall(text))
+
+    def matches(self, attrib):
+        if self.classes:
+            class_tokens = attrib.get("class", "").split()
+            for class_name in self.classes:
+                if class_name not in class_tokens:
+                    return False
+        for name, op, value in self.attrs:
+            actual = attrib.get(name)
+            if actual is None:
+                return False
+            if op == "=" and actual != value:
+                return False
+            if op == "^=" and not actual.startswith(value):
+                return False
+            if op == "*=" and value not in actual:
+                return False
+        return True
+
+
+class _Rule:
+    """フィールドのパターン1つに属するセレクタ（子孫結合子に対応）"""
+
+    __slots__ = ("key", "target", "contexts")
+
+    def __init__(self, key, selector, context_ids):
+        parts = selector.split()
+        self.key = key
+        self.target = _Compound(parts[-1])
+        self.contexts = tuple(context_ids[part] for part in parts[:-1])
+
+
+def _text(element):
+    """BeautifulSoupの .text と同じく、コメントを除いた子孫のテキストを連結して返す"""
+    return "".join(element.itertext())
+
+
+class ExtractionState:
+    """
+    要素の開始・終了イベントを受け取り、各パターンに一致した要素を文書順に記録する状態
+
+    構築済みのツリーを走査する場合にも、ストリーミングで解析する場合にも同じように使える。
+    """
+
+    def __init__(self, extractor):
+        self._extractor = extractor
+        self._context_depth = [0] * len(extractor._contexts)
+        # 開いている要素と、その要素で深さを増やしたセレクタ
+        self._stack = []
+        self.matches = {key: [] for key in extractor.pattern_keys}
+
+    def start(self, element):
+        tag = element.tag
+        if not isinstance(tag, str):
+            return
+        tag = tag.lower()
+        attrib = element.attrib
+        extractor = self._extractor
+
+        # 祖先として条件になるセレクタの深さを更新する
+        opened = []
+        for contexts in (extractor._contexts_by_tag.get(tag, ()), extractor._contexts_any_tag):
+            for context_id, compound in contexts:
+                if compound.matches(attrib):
+                    self._context_depth[context_id] += 1
+                    opened.append(context_id)
+        self._stack.append((element, opened))
+
+        for rules in (extractor._rules_by_tag.get(tag, ()), extractor._rules_any_tag):
+            for rule in rules:
+                if rule.target.matches(attrib) and all(self._context_depth[c] for c in rule.contexts):
+                    found = self.matches[rule.key]
+                    if not found or found[-1] is not element:
+                        found.append(element)
+
+    def end(self, element):
+        if not isinstance(element.tag, str) or not self._stack:
+            return
+        for context_id in self._stack.pop()[1]:
+            self._context_depth[context_id] -= 1
+
+    def is_open(self, element):
+        """開始イベントを受け取った要素が、まだ閉じていないかを返す"""
+        return any(opened is element for opened, _ in self._stack)
+
+
+class ArticleExtractor:
+    def __init__(
+        self,
+        title_selectors,
+        author_selectors,
+        date_selectors,
+        likes_selectors,
+        tags_selectors,
+        content_selectors,
+    ):
+        """
+        記事ページの各要素を1回の走査でまとめて取得する抽出エンジン
+
+        各フィールドのセレクタのリストを初期化時に一度だけ解析し、タグ名ごとの索引を作っておく。
+        抽出時はlxmlのツリーを1回だけ走査し、すべてのパターンの一致を同時に記録したうえで、
+        NoteAICrawlerの _get_* メソッドと同じ優先順位で各フィールドの値を決める。
+
+        Args:
+            title_selectors (list): タイトルのセレクタ（h1.クラス, og:title, title, h1 の順）
+            author_selectors (list): 著者のセレクタ（data-note-user-name, og:site_name の順）
+            date_selectors (list): 投稿日のセレクタ
+            likes_selectors (list): いいね数のセレクタ
+            tags_selectors (list): タグのセレクタ
+            content_selectors (list): 本文のセレクタ
+        """
+        self.selectors = {
+            "title": list(title_selectors),
+            "author": list(author_selectors),
+            "published_date": list(date_selectors),
+            "likes": list(likes_selectors),
+            "tags": list(tags_selectors),
+            "content_preview": list(content_selectors),
+        }
+        self.pattern_keys = []
+        self._contexts = []
+        self._contexts_by_tag = {}
+        self._contexts_any_tag = []
+        self._rules_by_tag = {}
+        self._rules_any_tag = []
+
+        context_ids = {}
+        for field, selectors in self.selectors.items():
+            for index, selector_group in enumerate(selectors):
+                key = (field, index)
+                self.pattern_keys.append(key)
+                for selector in selector_group.split(","):
+                    for part in selector.split()[:-1]:
+                        if part not in context_ids:
+                            context_ids[part] = len(self._contexts)
+                            compound = _Compound(part)
+                            self._contexts.append(compound)
+                            entry = (context_ids[part], compound)
+                            if compound.tag:
+                                self._contexts_by_tag.setdefault(compound.tag, []).append(entry)
+                            else:
+                                self._contexts_any_tag.append(entry)
+                    rule = _Rule(key, selector.strip(), context_ids)
+                    if rule.target.tag:
+                        self._rules_by_tag.setdefault(rule.target.tag, []).append(rule)
+                    else:
+                        self._rules_any_tag.append(rule)
+
+    def parse(self, html, encoding=None):
+        """HTMLをlxmlで解析して、ルート要素を返す（空の文書の場合はNone）"""
+        if isinstance(html, str):
+            html = html.encode("utf-8")
+            encoding = "utf-8"
+        if not html.strip():
+            return None
+        return etree.fromstring(html, etree.HTMLParser(encoding=encoding))
+
+    def scan(self, root):
+        """ツリーを1回だけ走査して、各パターンに一致した要素を記録した状態を返す"""
+        state = ExtractionState(self)
+        if root is not None:
+            for event, element in etree.iterwalk(root, events=("start", "end")):
+                if event == "start":
+                    state.start(element)
+                else:
+                    state.end(element)
+        return state
+
+    def settled(self, state, fields=ARTICLE_FIELDS):
+        """
+        これ以降の要素を読んでも fields の値が変わらないかを返す（ストリーミングで解析する場合に使う）
+
+        各フィールドの最優先のパターンに一致した最初の要素が閉じていれば確定とする。
+        本文は3つ目の段落が閉じた時点、タグは最初のタグを含む一覧（親要素）が閉じた時点で確定とする。
+        """
+        matches = state.matches
+        for field in fields:
+            if not self.selectors[field]:
+                continue
+            found = matches[(field, 0)]
+            if field == "content_preview":
+                if len(found) < 3 or state.is_open(found[2]):
+                    return False
+            elif field == "tags":
+                parent = found[0].getparent() if found else None
+                if parent is None or state.is_open(parent):
+                    return False
+            elif not found or state.is_open(found[0]):
+                return False
+            elif field == "title" and not _text(found[0]).strip():
+                # 空のタイトルの場合は、後ろにある別のパターンで決まる可能性がある
+                return False
+        return True
+
+    def extract_stream(self, chunks, url, title_from_search="", encoding=None, fields=ARTICLE_FIELDS, max_bytes=None):
+        """
+        記事ページのHTMLを分割して受け取りながら解析し、fields の値が確定した時点で読み込みをやめる
+
+        lxmlのHTMLPullParserに断片を渡し、要素の開始・終了イベントを ExtractionState に渡す。
+        読み込みをやめた場合も、それまでに読み込んだ部分から extract() と同じ優先順位で各フィールドの値を決める。
+
+        Args:
+            chunks (iterable): HTMLのバイト列の断片（途中でやめた場合、残りは読み込まない）
+            url (str): 記事のURL
+            title_from_search (str): 検索結果ページで取得したタイトル
+            encoding (str): HTMLの文字コード（Noneの場合はlxmlが判定する）
+            fields (tuple): 値が確定するまで読み込むフィールド
+            max_bytes (int): 読み込む最大バイト数（超えた分は捨て、そこまでの内容で値を決める）
+
+        Returns:
+            tuple: (フィールドの辞書, フィールドごとに値を決めたパターンの辞書, 読み込んだバイト列,
+                読み込みを終えた理由。"complete"（値が確定）, "eof"（最後まで読んだ）, "truncated"（max_bytesに達した）)
+        """
+        parser = etree.HTMLPullParser(events=("start", "end"), encoding=encoding)
+        state = ExtractionState(self)
+        received = []
+        size = 0
+        pending = b""
+        status = "eof"
+        for chunk in chunks:
+            if max_bytes is not None and size + len(chunk) > max_bytes:
+                chunk = chunk[: max_bytes - size]
+                status = "truncated"
+            received.append(chunk)
+            size += len(chunk)
+
+            # libxml2のHTMLのプッシュパーサーは、タグの途中で区切って渡すとそれ以降のイベントを
+            # close() まで返さなくなることがあるため、最後の ">" までを渡し、残りは次の断片と合わせる
+            pending += chunk
+            cut = pending.rfind(b">") + 1
+            if cut:
+                parser.feed(pending[:cut])
+                pending = pending[cut:]
+                self._consume_events(parser, state)
+            if status == "truncated":
+                break
+            if self.settled(state, fields):
+                status = "complete"
+                break
+
+        # 読み込んだ部分で閉じていない要素を閉じ、残りのイベントを処理する
+        # （途中でやめた場合、残りは文字の途中で切れていることがあるため渡さない）
+        try:
+            if pending and status == "eof":
+                parser.feed(pending)
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        self._consume_events(parser, state)
+
+        values, winners = self.resolve(state, url, title_from_search)
+        return values, winners, b"".join(received), status
+
+    @staticmethod
+    def _consume_events(parser, state):
+        for event, element in parser.read_events():
+            if event == "start":
+                state.start(element)
+            else:
+                state.end(element)
+
+    def extract(self, html, url, title_from_search="", encoding=None):
+        """
+        記事ページのHTMLから各フィールドを取得する
+
+        Args:
+            html (str | bytes): 記事ページのHTML
+            url (str): 記事のURL（タイトル・著者のフォールバックに使用）
+            title_from_search (str): 検索結果ページで取得したタイトル
+            encoding (str): htmlがbytesの場合の文字コード
+
+        Returns:
+            tuple: (フィールドの辞書, フィールドごとに値を決めたパターンの辞書)
+        """
+        return self.resolve(self.scan(self.parse(html, encoding)), url, title_from_search)
+
+    def resolve(self, state, url, title_from_search=""):
+        """記録した一致から、_get_* メソッドと同じ優先順位で各フィールドの値を決める"""
+        matches = state.matches
+        winners = {}
+        fields = {}
+
+        fields["title"], winners["title"] = self._resolve_title(matches, url, title_from_search)
+        fields["author"], winners["author"] = self._resolve_author(matches, url)
+
+        # 投稿日: 最初に一致した要素のdatetime属性
+        fields["published_date"], winners["published_date"] = None, None
+        for index in range(len(self.selectors["published_date"])):
+            found = matches[("published_date", index)]
+            if found:
+                fields["published_date"], winners["published_date"] = found[0].get("datetime"), index
+                break
+
+        fields["likes"], winners["likes"] = self._resolve_likes(matches)
+        fields["tags"], winners["tags"] = self._resolve_tags(matches)
+
+        # 本文: いずれかのセレクタに一致した要素を文書順に3つまで
+        fields["content_preview"], winners["content_preview"] = "", None
+        found = matches[("content_preview", 0)] if self.selectors["content_preview"] else []
+        if found:
+            texts = [_text(p).strip() for p in found[:3]]
+            fields["content_preview"], winners["content_preview"] = "\n".join([t for t in texts if t]), 0
+
+        return fields, winners
+
+    def _resolve_title(self, matches, url, title_from_search):
+        selectors = self.selectors["title"]
+        for index, selector in enumerate(selectors):
+            found = matches[("title", index)]
+            if not found:
+                continue
+            if selector.startswith("meta"):
+                return _TITLE_SUFFIX_PATTERN.sub("", found[0].get("content", "")), index
+            if selector == "title":
+                return _TITLE_SUFFIX_PATTERN.sub("", _text(found[0]).strip()), index
+            # h1: テキストが空でない最初の要素（任意のh1タグのパターンではすべてのh1を確認する）
+            for element in found if selector == "h1" else found[:1]:
+                text = _text(element).strip()
+                if text:
+                    return text, index
+
+        # URLからスラッグを抽出して、タイトルとして使用
+        url_parts = url.split("/")
+        if url_parts:
+            return url_parts[-1].replace("-", " ").replace("_", " ").replace("n", ""), "url"
+        return title_from_search or "タイトル不明", None
+
+    def _resolve_author(self, matches, url):
+        selectors = self.selectors["author"]
+
+        # パターン1: data-note-user-name属性
+        if selectors and matches[("author", 0)]:
+            return matches[("author", 0)][0].get("data-note-user-name"), 0
+
+        # パターン2: URLから著者名を抽出
+        author_match = _AUTHOR_URL_PATTERN.search(url)
+        if author_match:
+            return author_match.group(1), "url"
+
+        # パターン3: メタタグから著者名を抽出
+        for index in range(1, len(selectors)):
+            found = matches[("author", index)]
+            if found:
+                author_text = found[0].get("content", "")
+                if author_text and author_text != "note":
+                    return author_text, index
+
+        return "著者不明", None
+
+    def _resolve_likes(self, matches):
+        for index, selector in enumerate(self.selectors["likes"]):
+            found = matches[("likes", index)]
+            if not found:
+                continue
+            if index == 0 and "data-like-count" in selector:
+                return found[0].get("data-like-count"), index
+            like_match = _DIGITS_PATTERN.search(_text(found[0]).strip())
+            if like_match:
+                return like_match.group(0), index
+        return "0", None
+
+    def _resolve_tags(self, matches):
+        for index in range(len(self.selectors["tags"])):
+            found = matches[("tags", index)]
+            if found:
+                return [t for t in (_text(tag).strip() for tag in found) if t], index
+        return [], None
+
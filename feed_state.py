@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+from datetime import datetime
+
+
+class FeedState:
+    def __init__(self, path, keep=50):
+        """
+        新着順のフィードごとに、前回までに取得した最新の記事IDを保存するJSONファイル
+
+        フィードの先頭から記事を取得し、前回取得した記事に到達したらページ送りを止めるために使う。
+        最新の記事が削除されても止まれるよう、最新の1件（newest）だけでなく、新しい順に keep 件の記事IDを保存する。
+
+        Args:
+            path (str): JSONファイルのパス
+            keep (int): フィードごとに保存する記事IDの数
+        """
+        self.path = path
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._feeds = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self._feeds = json.load(f)
+
+    def recent(self, feed):
+        """前回までに取得した記事IDを新しい順に返す（初回は空のリスト）"""
+        with self._lock:
+            return list(self._feeds.get(feed, {}).get("recent", []))
+
+    def newest(self, feed):
+        """前回までに取得した最新の記事IDを返す（初回はNone）"""
+        with self._lock:
+            return self._feeds.get(feed, {}).get("newest")
+
+    def update(self, feed, note_ids):
+        """
+        今回フィードの先頭から取得した記事ID（新しい順）を、前回までの記事IDの前に加えて保存する
+
+        Args:
+            feed (str): フィードの名前（例: hashtag/AI）
+            note_ids (list): 今回取得した記事ID（フィードに並んでいた順）
+        """
+        with self._lock:
+            merged = []
+            for note_id in list(note_ids) + self._feeds.get(feed, {}).get("recent", []):
+                if note_id and note_id not in merged:
+                    merged.append(note_id)
+                if len(merged) >= self.keep:
+                    break
+            if not merged:
+                return
+            self._feeds[feed] = {
+                "newest": merged[0],
+                "recent": merged,
+                "updated_at": datetime.now().astimezone().isoformat(timespec="seconds"),
+            }
+            self._save()
+
+    def _save(self):
+        # 書き込み中に中断されても前回の状態が壊れないよう、一時ファイルに書いてから置き換える
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        tmp_path = self.path + ".part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._feeds, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import inspect
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from metrics import NULL_METRICS
+from rate_limiter import THROTTLE_STATUS_CODES, endpoint_class, url_host
+from response_cache import CacheMissError
+
+# brotliがインストールされていればbrで圧縮されたレスポンスも受け取る
+try:
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+# リトライ対象のステータスコード
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+# 本文を分割して読み込む場合の1回の読み込みサイズ（バイト）
+STREAM_CHUNK_SIZE = 16 * 1024
+
+# urllib3 1.x のRetryは backoff_max 引数を受け付けない（上限はクラス属性で固定）
+_RETRY_ACCEPTS_BACKOFF_MAX = "backoff_max" in inspect.signature(Retry.__init__).parameters
+
+
+class _CountingRetry(Retry):
+    """リトライ回数を記録し、バックオフ時間にジッターを加えるRetry（urllib3 1.26以降）"""
+
+    def __init__(self, *args, on_retry=None, jitter=0.0, backoff_max=None, **kwargs):
+        if backoff_max is not None and _RETRY_ACCEPTS_BACKOFF_MAX:
+            kwargs["backoff_max"] = backoff_max
+        super().__init__(*args, **kwargs)
+        if backoff_max is not None:
+            self.backoff_max = backoff_max
+        elif not hasattr(self, "backoff_max"):
+            # 1.26.9 より前は BACKOFF_MAX
+            self.backoff_max = getattr(self, "DEFAULT_BACKOFF_MAX", None) or self.BACKOFF_MAX
+        self.on_retry = on_retry
+        self.jitter = jitter
+
+    def new(self, **kw):
+        retry = super().new(**kw)
+        retry.backoff_max = self.backoff_max
+        retry.on_retry = self.on_retry
+        retry.jitter = self.jitter
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, *args, **kwargs):
+        retry = super().increment(method, url, response, error, *args, **kwargs)
+        if self.on_retry:
+            retry_after = self.get_retry_after(response) if response is not None else None
+            self.on_retry(url, response.status if response is not None else None, error is not None, retry_after)
+        return retry
+
+    def get_backoff_time(self):
+        # urllib3 1.x はクラス属性の上限しか使わないため、ここで backoff_max に収める
+        backoff = min(self.backoff_max, super().get_backoff_time())
+        if backoff <= 0 or self.jitter <= 0:
+            return backoff
+        return min(self.backoff_max, backoff + random.uniform(0, self.jitter))
+
+
+class HttpClient:
+    def __init__(
+        self,
+        headers=None,
+        pool_size=10,
+        max_retries=3,
+        backoff_factor=0.5,
+        backoff_jitter=0.5,
+        backoff_max=30.0,
+        timeout=30.0,
+        cache=None,
+        replay=False,
+        rate_limiter=None,
+        metrics=None,
+    ):
+        """
+        クローラー全体で共有するHTTPクライアント
+
+        コネクションプール付きのSessionを保持し、keep-aliveによる接続の再利用、
+        gzip/brotliでの圧縮転送、429/5xxに対する指数バックオフ付きのリトライを行う。
+
+        Args:
+            headers (dict): すべてのリクエストに付与するヘッダー
+            pool_size (int): ホストごとに保持する接続数
+            max_retries (int): 最大リトライ回数
+            backoff_factor (float): 指数バックオフの基準時間（秒）
+            backoff_jitter (float): バックオフ時間に加えるランダムな揺らぎの最大値（秒）
+            backoff_max (float): バックオフ時間の上限（秒）
+            timeout (float): リクエストのタイムアウト（秒）
+            cache (ResponseCache): レスポンスキャッシュ。指定した場合は有効なキャッシュがあればそれを返す
+            replay (bool): Trueの場合はネットワークに接続せず、キャッシュのみからレスポンスを返す
+            rate_limiter (AdaptiveRateLimiter): 指定した場合、リトライを含むすべてのリクエストの前にホストごとの
+                トークンを待ち、リクエストごとに1回、最終的な応答時間とステータスコード（途中でリトライしたか）を
+                伝えて送信レートを調整する
+            metrics (Metrics): 指定した場合、エンドポイントごとのステータスコード・応答時間・バイト数・待機時間を記録する
+        """
+        if replay and cache is None:
+            raise ValueError("リプレイモードにはレスポンスキャッシュが必要です")
+
+        self.timeout = timeout
+        self.cache = cache
+        self.replay = replay
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics or NULL_METRICS
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._retries = 0
+        # 処理中のリクエストのエンドポイント・ホストと、リトライで混雑を受けたか（スレッドごと）
+        self._local = threading.local()
+
+        retry = _CountingRetry(
+            total=max_retries,
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET", "HEAD"]),
+            backoff_factor=backoff_factor,
+            backoff_max=backoff_max,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+            on_retry=self._record_retry,
+            jitter=backoff_jitter,
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+        self.session.headers.update({"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"})
+        if headers:
+            self.session.headers.update(headers)
+
+    def _record_retry(self, url, status_code, error, retry_after):
+        with self._lock:
+            self._retries += 1
+        endpoint, host = getattr(self._local, "request", None) or (endpoint_class(url) if url else "unknown", None)
+        self.metrics.inc("http_retries_total", endpoint=endpoint, status=status_code or "error")
+        if error or status_code in THROTTLE_STATUS_CODES:
+            self._local.throttled = True
+        # リトライもレート制限の対象にする。レートを下げるのはリクエストの最後に get() で1回だけにし、
+        # ここではトークンを待つ（Retry-Afterが指定された場合は、urllib3がその時間だけ待ってからリトライするので、
+        # 同じホストへの他のリクエストもその間止める）
+        if self.rate_limiter and url:
+            if retry_after:
+                self.rate_limiter.block(endpoint, retry_after, host=host)
+            else:
+                wait = self.rate_limiter.acquire(endpoint, host=host)
+                self.metrics.observe("rate_limit_wait_seconds", wait, endpoint=endpoint)
+
+    def get(self, url, params=None, cache_ttl_hours=None, endpoint=None, stream=False, use_cache=True, **kwargs):
+        """
+        GETリクエストを送信してレスポンスを返す
+
+        有効なキャッシュがあればキャッシュから返す。ただし条件付きGETの場合と use_cache=False の場合は、
+        サーバーに更新の有無を確認するためキャッシュを使わない（リプレイモードを除く）。
+
+        Args:
+            url (str): URL
+            params (dict): クエリパラメータ
+            cache_ttl_hours (float): レスポンスをキャッシュする期間（時間）。未指定の場合はキャッシュのデフォルト
+            endpoint (str): レート制限のエンドポイントの種類（"search", "detail"）。未指定の場合はURLから判定する
+            stream (bool): Trueの場合は本文を読み込まずにレスポンスを返す。本文は iter_body() で読み込む
+                （途中で読み込みをやめられるよう、レスポンスキャッシュには保存しない）
+            use_cache (bool): Falseの場合はキャッシュを読まずにサーバーから取得する（取得したレスポンスは保存する）
+        """
+        headers = kwargs.get("headers") or {}
+        conditional = "If-None-Match" in headers or "If-Modified-Since" in headers
+        if self.cache is not None and (self.replay or (use_cache and not conditional)):
+            cached = self.cache.get(url, params=params, allow_expired=self.replay)
+            if cached is not None:
+                return cached
+            if self.replay:
+                raise CacheMissError(f"キャッシュに存在しません: {url}")
+
+        kwargs.setdefault("timeout", self.timeout)
+        with self._lock:
+            self._requests += 1
+
+        endpoint = endpoint or endpoint_class(url)
+        host = url_host(url)
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.acquire(endpoint, host=host)
+            self.metrics.observe("rate_limit_wait_seconds", wait, endpoint=endpoint)
+
+        self._local.request = (endpoint, host)
+        self._local.throttled = False
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, stream=stream, **kwargs)
+        except requests.RequestException as e:
+            self.metrics.inc("http_errors_total", endpoint=endpoint, error=type(e).__name__)
+            if self.rate_limiter is not None:
+                self.rate_limiter.record(endpoint, error=True, host=host)
+            raise
+        finally:
+            self._local.request = None
+
+        if self.metrics.enabled:
+            # リトライした場合は、最初の送信から最後の応答までの時間になる
+            self.metrics.observe("http_request_seconds", time.perf_counter() - start, endpoint=endpoint)
+            self.metrics.inc("http_requests_total", endpoint=endpoint, status=response.status_code)
+            if not stream:
+                self.metrics.inc("http_bytes_total", len(response.content), endpoint=endpoint)
+        if self.rate_limiter is not None:
+            self.rate_limiter.record(
+                endpoint,
+                latency=response.elapsed.total_seconds(),
+                status_code=response.status_code,
+                throttled=self._local.throttled,
+                host=host,
+            )
+
+        if self.cache is not None and not stream:
+            self.cache.put(url, response, params=params, ttl_hours=cache_ttl_hours)
+        return response
+
+    def iter_body(self, response, endpoint=None, chunk_size=STREAM_CHUNK_SIZE):
+        """
+        stream=True で取得したレスポンスの本文を分割して返し、読み込んだバイト数を記録する
+
+        途中でジェネレーターを閉じると、残りの本文を受信せずに接続を閉じる。
+        キャッシュから返したレスポンスの場合は、本文全体を1つの断片として返す。
+        """
+        if getattr(response, "from_cache", False):
+            yield response.content
+            return
+        endpoint = endpoint or endpoint_class(response.url)
+        try:
+            for chunk in response.iter_content(chunk_size):
+                self.metrics.inc("http_bytes_total", len(chunk), endpoint=endpoint)
+                yield chunk
+        finally:
+            response.close()
+
+    def stats(self):
+        """リクエスト数、リトライ数、接続の新規作成数と再利用数を返す"""
+        connections = 0
+        pooled_requests = 0
+        pools = self.adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            connections += pool.num_connections
+            pooled_requests += pool.num_requests
+
+        with self._lock:
+            return {
+                "requests": self._requests,
+                "retries": self._retries,
+                "connections_opened": connections,
+                "connections_reused": max(0, pooled_requests - connections),
+            }
+
+    def close(self):
+        """Sessionを閉じて接続を解放する"""
+        self.session.close()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import unicodedata
+from collections import deque
+
+
+def normalize(text):
+    """全角・半角と大文字・小文字の違いをなくす（NFKC正規化 + casefold）"""
+    return unicodedata.normalize("NFKC", text).casefold()
+
+
+class KeywordMatcher:
+    def __init__(self, keywords):
+        """
+        複数のキーワードを1回の走査で検出するAho-Corasickオートマトン
+
+        キーワードは初期化時にNFKC正規化と大文字・小文字の統一を行ってからオートマトンに登録する。
+        同じく正規化したテキストを先頭から1文字ずつ読むだけで、すべてのキーワードの出現位置がわかる。
+
+        Args:
+            keywords (list): 検出するキーワード
+        """
+        self.keywords = list(dict.fromkeys(keywords))
+        # ノードごとの遷移、失敗時の遷移先、そのノードで一致するキーワードの番号
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+
+        for index, keyword in enumerate(self.keywords):
+            node = 0
+            for char in normalize(keyword):
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto[node][char] = next_node
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                node = next_node
+            if node:
+                self._output[node].append(index)
+
+        # 幅優先で失敗時の遷移先を決め、一致するキーワードを引き継ぐ
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] = self._output[child] + self._output[self._fail[child]]
+
+        self._lengths = [len(normalize(keyword)) for keyword in self.keywords]
+
+    def find(self, text):
+        """
+        テキスト中のキーワードの出現をすべて返す
+
+        Args:
+            text (str): 検索するテキスト
+
+        Returns:
+            list: (キーワード, 正規化したテキスト上の開始位置) のリスト（出現順）
+        """
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        matches = []
+        node = 0
+        for position, char in enumerate(normalize(text)):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in output[node]:
+                matches.append((self.keywords[index], position - self._lengths[index] + 1))
+        return matches
+
+    def match_article(self, article):
+        """
+        記事のタイトル、タグ、本文からキーワードを検出する
+
+        Args:
+            article (dict): 記事の情報
+
+        Returns:
+            list: {"keyword", "field", "start"} の辞書のリスト。タグは "tags[0]" のように番号付きのフィールド名になる
+        """
+        fields = [("title", article.get("title") or "")]
+        fields += [(f"tags[{i}]", tag) for i, tag in enumerate(article.get("tags") or [])]
+        fields.append(("content_preview", article.get("content_preview") or ""))
+
+        return [
+            {"keyword": keyword, "field": field, "start": start}
+            for field, text in fields
+            for keyword, start in self.find(text)
+        ]
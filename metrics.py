@@ -0,0 +1,251 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime
+
+# 処理時間のヒストグラムの区切り（秒）
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 各指標の説明（Prometheusの HELP 行）
+DESCRIPTIONS = {
+    "stage_seconds": "処理段階ごとの処理時間（秒）",
+    "stage_total": "処理段階ごとの実行回数（outcome=ok/error）",
+    "http_requests_total": "エンドポイントとステータスコードごとのHTTPリクエスト数",
+    "http_request_seconds": "エンドポイントごとのHTTPリクエストの応答時間（秒）",
+    "http_errors_total": "エンドポイントと例外の種類ごとの通信エラー数",
+    "http_retries_total": "エンドポイントとステータスコードごとのリトライ数",
+    "http_bytes_total": "エンドポイントごとのダウンロードしたバイト数（展開後）",
+    "rate_limit_wait_seconds": "エンドポイントごとのレート制限による待機時間（秒）",
+    "extract_seconds": "_get_* メソッドごとの処理時間（秒）",
+    "field_pattern_total": "フィールドごとに値を決めたパターン（structured=埋め込みJSON、url=URL、none=取得できず）",
+    "events_total": "クローラーの集計項目（fetched, parsed_dom, relevant, detail_error など）ごとの件数",
+}
+
+
+def _label_key(labels):
+    # ステータスコードやパターンの番号のような数値も文字列にし、文字列のラベルと並べて比較できるようにする
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(key, extra=None):
+    items = list(key) + (list(extra) if extra else [])
+    if not items:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in items) + "}"
+
+
+class _NullSpan:
+    """計測を無効にした場合の何もしないコンテキストマネージャー"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class NullMetrics:
+    """
+    計測を無効にした場合の指標（すべてのメソッドが何もしない）
+
+    クローラーは計測の有無にかかわらず同じように呼び出し、無効の場合の負荷はメソッド呼び出し1回分だけにする。
+    """
+
+    enabled = False
+
+    def inc(self, name, value=1, **labels):
+        pass
+
+    def observe(self, name, value, **labels):
+        pass
+
+    def span(self, stage, **labels):
+        return _NULL_SPAN
+
+    def log(self, event, **fields):
+        pass
+
+    def close(self):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+class Metrics:
+    def __init__(self, prefix="note_crawler_", buckets=DEFAULT_BUCKETS, prometheus_path=None, json_log_path=None):
+        """
+        処理段階ごとのカウンターと処理時間のヒストグラムを記録する指標（スレッドセーフ）
+
+        記録した値はPrometheusのテキスト形式でファイルに書き出すか、serve() で起動するエンドポイントから取得できる。
+        json_log_path を指定した場合は、処理段階の終了などのイベントを1行1件のJSONで書き出す。
+
+        Args:
+            prefix (str): 指標の名前の接頭辞
+            buckets (tuple): ヒストグラムの区切り（秒）
+            prometheus_path (str): close() のときにPrometheusのテキスト形式で書き出すファイルのパス
+            json_log_path (str): イベントをJSONで追記するファイルのパス
+        """
+        self.enabled = True
+        self.prefix = prefix
+        self.buckets = tuple(buckets)
+        self.prometheus_path = prometheus_path
+        self._counters = {}
+        self._histograms = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._log_file = None
+        if json_log_path:
+            os.makedirs(os.path.dirname(os.path.abspath(json_log_path)), exist_ok=True)
+            self._log_file = open(json_log_path, "a", encoding="utf-8")
+
+    def inc(self, name, value=1, **labels):
+        """カウンターを加算する"""
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """ヒストグラムに値（秒）を記録する"""
+        key = (name, _label_key(labels))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            histogram["buckets"][index] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def span(self, stage, **labels):
+        """処理段階の処理時間と実行回数を記録する（例外が発生した場合は outcome="error"）"""
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield self
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.observe("stage_seconds", elapsed, stage=stage, **labels)
+            self.inc("stage_total", stage=stage, outcome=outcome, **labels)
+            if self._log_file:
+                self.log("stage", stage=stage, outcome=outcome, seconds=round(elapsed, 6), **labels)
+
+    def log(self, event, **fields):
+        """イベントを1行のJSONとして書き出す（json_log_pathを指定した場合のみ）"""
+        if not self._log_file:
+            return
+        record = {"time": datetime.now().astimezone().isoformat(timespec="milliseconds"), "event": event, **fields}
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            self._log_file.write(line + "\n")
+
+    def snapshot(self):
+        """記録した値を辞書で返す"""
+        with self._lock:
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in sorted(self._counters.items())
+            ]
+            histograms = [
+                {"name": name, "labels": dict(labels), "count": h["count"], "sum": round(h["sum"], 6)}
+                for (name, labels), h in sorted(self._histograms.items())
+            ]
+        return {"counters": counters, "histograms": histograms}
+
+    def to_prometheus(self):
+        """記録した値をPrometheusのテキスト形式で返す"""
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, dict(h, buckets=list(h["buckets"]))) for key, h in self._histograms.items())
+
+        described = set()
+
+        def header(name, kind):
+            if name not in described:
+                described.add(name)
+                lines.append(f"# HELP {self.prefix}{name} {DESCRIPTIONS.get(name, name)}")
+                lines.append(f"# TYPE {self.prefix}{name} {kind}")
+
+        for (name, labels), value in counters:
+            header(name, "counter")
+            lines.append(f"{self.prefix}{name}{_format_labels(labels)} {value}")
+
+        for (name, labels), histogram in histograms:
+            header(name, "histogram")
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], histogram["buckets"]):
+                cumulative += count
+                lines.append(f"{self.prefix}{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+            lines.append(f"{self.prefix}{name}_sum{_format_labels(labels)} {histogram['sum']:.6f}")
+            lines.append(f"{self.prefix}{name}_count{_format_labels(labels)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, path=None):
+        """Prometheusのテキスト形式でファイルに書き出す（node_exporterのtextfile collectorで読み込める）"""
+        path = path or self.prometheus_path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = path + ".part"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+        return path
+
+    def serve(self, port, host="127.0.0.1"):
+        """GET /metrics でPrometheusのテキスト形式を返すエンドポイントを、別スレッドで起動する"""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self._server.server_port}/metrics"
+
+    def close(self):
+        """最終的な値をJSONのログとファイルに書き出し、エンドポイントを終了する"""
+        if self._log_file:
+            self.log("metrics", **self.snapshot())
+        if self.prometheus_path:
+            self.write_prometheus()
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            if self._log_file:
+                self._log_file.close()
+                self._log_file = None
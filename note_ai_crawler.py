@@ -1,17 +1,35 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
+import hashlib
 import os
-import random
+import queue
 import re
+import socket
+import threading
 import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
-import pandas as pd
-import requests
-from bs4 import BeautifulSoup
-from tqdm import tqdm
+from article_record import ArticleRecord
+from backends import create_backend
+from checkpoint import Checkpoint
+from crawl_store import CrawlStore
+from extractor import ARTICLE_FIELDS, ArticleExtractor
+from feed_state import FeedState
+from http_client import STREAM_CHUNK_SIZE, HttpClient
+from keyword_matcher import KeywordMatcher
+from metrics import NULL_METRICS
+from note_urls import article_key, canonicalize_url, extract_note_id, is_article_url
+from parquet_dataset import require_pyarrow, write_results
+from parse_pool import ParsePool
+from rate_limiter import AdaptiveRateLimiter, TokenBucket
+from relevance_gate import RelevanceGate
+from response_cache import ResponseCache
+from search_index import SearchIndex
+from structured_data import extract_structured_fields
+from writers import StreamingResultWriter
 
 
 class NoteAICrawler:
@@ -34,6 +52,10 @@ class NoteAICrawler:
         "span[class*='like'], div[class*='like'], span[class*='heart'], div[class*='heart']",  # パターン3: likeやheartを含むクラス名の要素
     ]
 
+    DATE_SELECTORS = [
+        "time",  # パターン1: timeタグのdatetime属性
+    ]
+
     TAGS_SELECTORS = [
         "a[href^='/hashtag/']",  # パターン1: /hashtag/へのリンク
         "a[class*='tag'], span[class*='tag']",  # パターン2: tagを含むクラス名の要素
@@ -43,7 +65,15 @@ class NoteAICrawler:
         "div.note-common-styles__textnote-body p, div[class*='styles__text'] p, article p"  # 複数のパターンを試す
     ]
 
-    # AI関連キーワード
+    # すべてのセレクタを一度だけコンパイルした抽出エンジン
+    EXTRACTOR = ArticleExtractor(
+        TITLE_SELECTORS, AUTHOR_SELECTORS, DATE_SELECTORS, LIKES_SELECTORS, TAGS_SELECTORS, CONTENT_SELECTORS
+    )
+
+    # 検索結果ページは更新されやすいため、レスポンスキャッシュの有効期間を短くする（時間）
+    SEARCH_CACHE_TTL_HOURS = 1.0
+
+    # AI関連キーワード（クローラーの作成時に検出器に組み込むため、サブクラスやインスタンスでも変更できる）
     AI_KEYWORDS = [
         "AI",
         "人工知能",
@@ -62,6 +92,12 @@ class NoteAICrawler:
         "大規模言語モデル",
     ]
 
+    # キーワードが見つかったフィールドごとの関連度の重み
+    RELEVANCE_WEIGHTS = {"title": 3, "tags": 2, "content_preview": 1}
+
+    # JSONLに加えて保存できる形式
+    OUTPUT_FORMATS = ("csv", "json", "parquet")
+
     def __init__(
         self,
         search_keyword="AI",
@@ -69,8 +105,34 @@ class NoteAICrawler:
         output_dir="output",
         min_wait=1.0,
         max_wait=3.0,
-        detail_min_wait=2.0,
-        detail_max_wait=4.0,
+        concurrency=4,
+        requests_per_second=1.0,
+        pool_size=None,
+        max_retries=3,
+        use_store=True,
+        store_ttl_hours=24.0,
+        use_cache=True,
+        cache_ttl_hours=24.0 * 7,
+        cache_max_size_mb=512,
+        replay=False,
+        parser="structured",
+        backend="html",
+        base_url="https://note.com",
+        relevance_threshold=None,
+        gate_sample_rate=0.1,
+        output_formats=("csv", "json"),
+        progress=True,
+        parse_workers=0,
+        checkpoint=True,
+        resume=False,
+        metrics=None,
+        hashtag=None,
+        incremental=True,
+        queries=None,
+        stream=False,
+        stream_fields=ARTICLE_FIELDS,
+        max_page_bytes=2 * 1024 * 1024,
+        search_index=True,
     ):
         """
         noteからAI関連の記事をクロールするクラス
@@ -79,154 +141,609 @@ class NoteAICrawler:
             search_keyword (str): 検索キーワード
             max_pages (int): クロールする最大ページ数
             output_dir (str): 出力ディレクトリ
-            min_wait (float): 検索時の最小待機時間（秒）
-            max_wait (float): 検索時の最大待機時間（秒）
-            detail_min_wait (float): 詳細取得時の最小待機時間（秒）
-            detail_max_wait (float): 詳細取得時の最大待機時間（秒）
+            min_wait (float): 検索ページの最小取得間隔（秒）。サーバーが安定していれば、この間隔まで速める
+            max_wait (float): 検索ページの初期の取得間隔の目安（秒）。最初は min_wait と max_wait の平均の間隔で取得する
+            concurrency (int): 詳細取得を並行して行う最大数
+            requests_per_second (float): 詳細取得時に送る最大リクエスト数（毎秒）。0の場合は制限しない。
+                検索・詳細とも、429/5xxや遅い応答を受けるとレートを下げ、成功が続くと上限まで戻す
+            pool_size (int): HTTP接続プールのサイズ（未指定の場合はconcurrencyに合わせる）
+            max_retries (int): 429/5xx時の最大リトライ回数
+            use_store (bool): 取得済みの記事を出力ディレクトリのSQLiteストアに保存し、次回以降に再利用するか
+            store_ttl_hours (float): 保存済みの記事を再取得せずに使う期間（時間）
+            use_cache (bool): 取得したHTMLを出力ディレクトリのレスポンスキャッシュに保存するか
+            cache_ttl_hours (float): レスポンスキャッシュの有効期間（時間）
+            cache_max_size_mb (float): レスポンスキャッシュの最大サイズ（MB）
+            replay (bool): ネットワークに接続せず、レスポンスキャッシュのみを使ってクロールするか
+                （セレクタを変更したときの再抽出用。取得済み記事のストアと待機時間は使用しない）
+            parser (str): 記事ページの解析方法。"structured"（埋め込みJSONから取得し、ない場合のみHTMLを解析）、
+                "compiled"（1回の走査で全要素を取得）、"soup"（BeautifulSoupと _get_* メソッドで要素ごとに取得）
+            backend (str): 取得方法。"html"（検索ページと記事ページのHTML）または "api"（noteのJSON API）
+            base_url (str): noteのURL（ローカルの代替サーバーで試験する場合に変更する）
+            relevance_threshold (int): 指定した場合、検索結果のカードから計算した関連度がこの値未満の記事は
+                詳細を取得しない（カードに判定できる情報がない記事は取得する）
+            gate_sample_rate (float): 関連度が足りない記事のうち、取りこぼしの推定のために詳細を取得する割合
+            output_formats (tuple): JSONLに加えて保存する形式。"csv"、"json"、"parquet"（投稿日ごとに分けた
+                output_dir/parquet のデータセット。pyarrowが必要）から選ぶ
+            progress (bool): 進捗バーを表示するか（表示しない場合はtqdmを読み込まない）
+            parse_workers (int): 記事ページの解析に使うワーカープロセスの数（0の場合は取得したスレッドで解析する）。
+                指定した場合、詳細取得のスレッド数はconcurrencyとparse_workersの大きい方になる
+            checkpoint (bool): run() の途中経過を出力ディレクトリのチェックポイント（checkpoint.sqlite）に保存するか
+            resume (bool): 前回中断したクロールのチェックポイントがあれば、その続きから再開するか
+            metrics (Metrics): 指定した場合、処理段階ごとの処理時間、HTTPのステータスコードとバイト数、
+                フィールドごとに値を決めたパターンなどを記録する（未指定の場合は記録しない）
+            hashtag (str): 指定した場合、キーワード検索の代わりにこのハッシュタグの新着順の一覧（フィード）をたどる
+            incremental (bool): フィードをたどるとき、前回取得した記事に到達したらページ送りを止めるか。
+                フィードごとの最新の記事IDは、run() が完了したときに出力ディレクトリの feed_state.json に保存する
+            queries (list): 指定した場合、search_keyword と hashtag の代わりに、複数の検索キーワードとハッシュタグ
+                （"#" で始まるもの）の検索ページを並行して取得する。同じ記事の詳細は1回だけ取得し、
+                各記事の queries に、その記事を見つけたクエリを記録する
+            stream (bool): 記事ページを分割して読み込みながら解析し、stream_fields の値が確定した時点で
+                残りを受信せずに接続を閉じるか（backend="html" の場合のみ）。読み込んだページはレスポンスキャッシュに
+                保存せず、parse_workers も使わない
+            stream_fields (tuple): ストリーミングで取得する場合に、値が確定するまで読み込むフィールド
+            max_page_bytes (int): ストリーミングで取得する場合に、記事ページ1件から読み込む最大バイト数
+            search_index (bool): 保存した結果を出力ディレクトリの全文検索の索引（search_index.sqlite）に追加するか
         """
-        self.base_url = "https://note.com"
+        self.base_url = base_url.rstrip("/")
         self.search_url = f"{self.base_url}/search"
         self.search_keyword = search_keyword
+        self.hashtag = hashtag.lstrip("#") if hashtag else None
+        if queries:
+            self.queries = list(dict.fromkeys(q.strip() for q in queries if q.strip()))
+        else:
+            self.queries = [f"#{self.hashtag}" if self.hashtag else search_keyword]
+        # 複数のクエリをまとめて取得する場合だけ、記事を見つけたクエリを記録に加える
+        self.batch = len(self.queries) > 1
+        self.incremental = incremental
+        self.feed_state = None
+        if any(query.startswith("#") for query in self.queries):
+            self.feed_state = FeedState(os.path.join(output_dir, "feed_state.json"))
+        self._query_hits = {query: {} for query in self.queries}
+        self._query_context = threading.local()
+        self._claim_lock = threading.Lock()
+        self._search_failed = False
+        # 作業キューのワーカーでは、取得の失敗を例外のまま返し、タスクを再試行できるようにする（run_worker() で有効にする）
+        self.raise_errors = False
         self.max_pages = max_pages
         self.output_dir = output_dir
+        self.replay = replay
+        self.parser = parser
+        unknown_formats = set(output_formats) - set(self.OUTPUT_FORMATS)
+        if unknown_formats:
+            raise ValueError(f"未対応の出力形式です: {', '.join(sorted(unknown_formats))}")
+        self.output_formats = tuple(output_formats)
+        if "parquet" in self.output_formats:
+            # 長いクロールの後で失敗しないよう、pyarrowがあるか先に確認する
+            require_pyarrow()
+        self.progress = progress
+        self.metrics = metrics or NULL_METRICS
         self.min_wait = min_wait
         self.max_wait = max_wait
-        self.detail_min_wait = detail_min_wait
-        self.detail_max_wait = detail_max_wait
+        self.concurrency = max(1, concurrency)
+        # リプレイモードではキャッシュにあるページ全体を解析する
+        self.stream = stream and backend == "html" and not replay
+        self.stream_fields = tuple(stream_fields)
+        self.max_page_bytes = max_page_bytes
+        self.parse_pool = None
+        if parse_workers > 0 and backend == "html" and not self.stream:
+            self.parse_pool = ParsePool(parse_workers, parser)
+        # 解析待ちでワーカープロセスが遊ばないよう、詳細取得のスレッドはワーカー数以上にする
+        self.fetch_threads = max(self.concurrency, parse_workers)
+        self.requests_per_second = requests_per_second
+        # リプレイモードではネットワークに接続しないため待機しない
+        self.rate_limiter = None if replay else self._create_rate_limiter()
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36",
             "Accept-Language": "ja,en-US;q=0.9,en;q=0.8",
         }
-        self.articles = []
+        self.backend = create_backend(backend, self)
+        # AI関連キーワードを一度だけ組み込んだ検出器
+        self.matcher = KeywordMatcher(self.AI_KEYWORDS)
+        self.gate = None
+        if relevance_threshold is not None:
+            self.gate = RelevanceGate(self.matcher, threshold=relevance_threshold, sample_rate=gate_sample_rate)
+        self._seen_keys = set()
+        self.use_checkpoint = checkpoint
+        self.resume = resume
+        self.checkpoint = None
+        self.candidate_count = 0
+        self.stats = Counter()
+        self._stats_lock = threading.Lock()
 
         # 出力ディレクトリの作成
         if not os.path.exists(output_dir):
             os.makedirs(output_dir)
 
-    def search_articles(self):
-        """検索ページから記事のリンクを取得"""
-        print(f"「{self.search_keyword}」に関する記事を検索中...")
+        # 取得済み記事のストア（リプレイモードでは抽出し直すため使わない）
+        self.store_ttl = store_ttl_hours * 3600
+        self.store = CrawlStore(os.path.join(output_dir, "crawl_store.sqlite")) if use_store and not replay else None
 
-        for page in tqdm(range(1, self.max_pages + 1), desc="ページ"):
+        # 全文検索の索引（SQLiteがFTS5のtrigramトークナイザーに対応していない場合は更新しない）
+        self.search_index = None
+        if search_index:
             try:
-                params = {"q": self.search_keyword, "page": page}
-
-                response = requests.get(self.search_url, params=params, headers=self.headers)
-                response.raise_for_status()
-
-                soup = BeautifulSoup(response.text, "lxml")
-
-                # 現在のnoteのWebサイト構造に合わせて記事リンクを取得
-                article_links = soup.find_all("a", class_=["a-link", "m-largeNoteWrapper__link", "fn"])
-
-                if not article_links:
-                    # クラス名での検索がうまくいかない場合は、パスで検索
-                    article_links = [link for link in soup.find_all("a", href=True) if "/n/" in link.get("href")]
-
-                if not article_links:
-                    print(f"ページ {page} に記事が見つかりませんでした。終了します。")
-                    break
-
-                for link in article_links:
-                    article_url = link.get("href")
-                    if article_url:
-                        # 検索結果ページや無効なURLは除外
-                        if "search?" in article_url or article_url == "#" or "help-note.com" in article_url:
-                            continue
-
-                        # 相対パスの場合は絶対パスに変換
-                        if article_url.startswith("/"):
-                            article_url = self.base_url + article_url
-
-                        # 既に取得済みのURLでなければリストに追加
-                        if article_url not in [a["url"] for a in self.articles]:
-                            # 検索結果ページから記事のタイトルを取得
-                            title_elem = link.find("h3") or link.find(
-                                "div", class_=lambda c: c and "title" in c.lower()
-                            )
-                            title = title_elem.text.strip() if title_elem else ""
-
-                            self.articles.append({"url": article_url, "title_from_search": title})
+                self.search_index = SearchIndex(os.path.join(output_dir, "search_index.sqlite"))
+            except RuntimeError as e:
+                print(f"{e}。検索の索引は更新しません。")
+
+        # HTTPクライアントとレスポンスキャッシュ
+        self.cache = None
+        if use_cache or replay:
+            self.cache = ResponseCache(
+                os.path.join(output_dir, "http_cache"), ttl_hours=cache_ttl_hours, max_size_mb=cache_max_size_mb
+            )
+        self.http = HttpClient(
+            headers=self.headers,
+            pool_size=pool_size or max(10, self.concurrency),
+            max_retries=max_retries,
+            cache=self.cache,
+            replay=replay,
+            rate_limiter=self.rate_limiter,
+            metrics=self.metrics,
+        )
+
+    def _create_rate_limiter(self):
+        """ホストごとに、検索ページと記事の詳細で別々に送信レートを調整するレートリミッターを作成する"""
+        # 検索ページ: min_waitとmax_waitの平均の間隔で始め、min_waitの間隔まで速める
+        mean_wait = (self.min_wait + self.max_wait) / 2
+        search_rate = 1.0 / mean_wait if mean_wait > 0 else 0.0
+        search_max_rate = 1.0 / self.min_wait if self.min_wait > 0 else search_rate * 2
+        return AdaptiveRateLimiter(
+            {
+                "search": TokenBucket(search_rate, max_rate=search_max_rate),
+                "detail": TokenBucket(self.requests_per_second),
+            }
+        )
+
+    def iter_search_results(self):
+        """検索結果を順に取得し、未取得の記事を見つかり次第返すジェネレーター"""
+        if len(self.queries) == 1:
+            return self._iter_query(self.queries[0])
+        return self._iter_queries_concurrently()
+
+    def _iter_queries_concurrently(self):
+        """
+        複数のクエリの検索ページをクエリごとのスレッドで並行して取得し、見つかった順に記事を返す
 
-                # サーバーに負荷をかけないよう少し待機
-                time.sleep(random.uniform(self.min_wait, self.max_wait))
+        HTTPクライアントとレートリミッターは共有しているため、クエリが増えても検索ページの送信レートは変わらない。
+        検索ページを取得し終えたことは、そのページの記事の後に同じキューで受け渡し、このジェネレーターを進めるスレッドで
+        チェックポイントに記録する。呼び出し側がそのページの記事をすべて受け取ってから記録するため、
+        記録した直後に中断しても、再開したときにそのページの記事が失われない。
+        """
+        found = queue.Queue()
+        stop = threading.Event()
 
+        def search(query):
+            self._query_context.page_done = lambda page, keys: found.put((query, page, keys))
+            results = self._iter_query(query)
+            try:
+                for article in results:
+                    if stop.is_set():
+                        break
+                    found.put(article)
             except Exception as e:
-                print(f"ページ {page} の取得中にエラーが発生しました: {e}")
-                continue
+                print(f"「{query}」の検索中にエラーが発生しました: {e}")
+            finally:
+                results.close()
+                found.put(None)
+
+        threads = [threading.Thread(target=search, args=(query,), daemon=True) for query in self.queries]
+        for thread in threads:
+            thread.start()
+        try:
+            remaining = len(threads)
+            while remaining:
+                item = found.get()
+                if item is None:
+                    remaining -= 1
+                elif isinstance(item, tuple):
+                    self._save_page_done(*item)
+                else:
+                    yield item
+        finally:
+            stop.set()
+
+    def _iter_query(self, query):
+        """
+        1つのクエリ（"#" で始まる場合はハッシュタグの新着順の一覧、それ以外は検索キーワード）の記事を返す
 
-        print(f"合計 {len(self.articles)} 件の記事が見つかりました。")
+        このジェネレーターを進めるスレッドに、クエリと前回取得した記事IDを記録しておき、
+        claim_article_url() がクエリごとに見つかった記事を記録し、前回取得した記事でページ送りを止められるようにする。
+        """
+        context = self._query_context
+        context.query = query
+        context.known = set()
+        context.stopped = False
+        context.failed = False
+        start_page = self.checkpoint.get(self._last_page_key(query), 0) + 1 if self.checkpoint else 1
+
+        if query.startswith("#"):
+            hashtag = query[1:]
+            if self.incremental:
+                context.known = set(self.feed_state.recent(self.feed_name(hashtag)))
+            yield from self.backend.iter_hashtag(hashtag, self.max_pages, order="new", start_page=start_page)
+        else:
+            yield from self.backend.iter_search(query, self.max_pages, start_page=start_page)
+
+    def _last_page_key(self, query):
+        """チェックポイントに取得し終えた検索ページを記録する名前（クエリが1つの場合は従来どおり last_page）"""
+        return "last_page" if len(self.queries) == 1 else f"last_page:{query}"
+
+    @staticmethod
+    def feed_name(hashtag):
+        """フィードの状態を保存する名前"""
+        return f"hashtag/{hashtag}"
+
+    @property
+    def target_label(self):
+        """表示用のクロール対象（「#AI」の新着記事、「AI」に関する記事、「AI」「#生成AI」の記事）"""
+        if len(self.queries) > 1:
+            return "".join(f"「{query}」" for query in self.queries) + "の記事"
+        if self.queries[0].startswith("#"):
+            return f"「{self.queries[0]}」の新着記事"
+        return f"「{self.queries[0]}」に関する記事"
+
+    def queries_for(self, url):
+        """記事を見つけたクエリを、クエリの指定順に返す"""
+        key = article_key(url)
+        with self._claim_lock:
+            return [query for query in self.queries if key in self._query_hits[query]]
+
+    def _save_feed_state(self):
+        """今回ハッシュタグの一覧の先頭から見つかった記事IDを保存し、次回はそこで止まるようにする"""
+        if not self.feed_state:
+            return
+        for query in self.queries:
+            if query.startswith("#"):
+                with self._claim_lock:
+                    keys = list(self._query_hits[query])
+                self.feed_state.update(self.feed_name(query[1:]), [key.rsplit("/", 1)[-1] for key in keys])
+
+    def search_page_done(self, page, failed=False):
+        """
+        検索ページの記事をすべて受け取ったことを記録する（バックエンドから呼び出される）
 
-    def get_article_details(self):
-        """各記事の詳細情報を取得"""
-        print("記事の詳細情報を取得中...")
+        取得に失敗したページと、そのクエリでそれより後のページは、チェックポイントに取得済みとして記録しない。
+        再開したときは、失敗したページから取得し直す（取得済みの記事は記事IDで除外される）。
 
-        for i, article in enumerate(tqdm(self.articles, desc="記事")):
-            try:
-                # URLが無効な場合はスキップ
-                if article["url"] == "#" or "help-note.com" in article["url"] or "search?" in article["url"]:
-                    self.articles[i].update(
-                        {
-                            "title": article.get("title_from_search", "無効なURL"),
-                            "author": "不明",
-                            "published_date": None,
-                            "likes": "0",
-                            "tags": [],
-                            "content_preview": "無効なURLのため取得できませんでした",
-                        }
-                    )
-                    continue
+        Args:
+            page (int): ページ番号
+            failed (bool): ページの取得・解析に失敗したか
 
-                response = requests.get(article["url"], headers=self.headers)
+        Returns:
+            bool: ページ送りを止めるか（ハッシュタグの一覧で、前回取得した記事に到達した場合にTrue）
+        """
+        context = self._query_context
+        query = getattr(context, "query", None)
+        if failed:
+            context.failed = True
+            self._search_failed = True
+        if self.checkpoint and query is not None and not getattr(context, "failed", False):
+            # 再開したときも、記事を見つけたクエリとハッシュタグの一覧の順序がわかるようにする
+            with self._claim_lock:
+                keys = list(self._query_hits[query])
+            page_done = getattr(context, "page_done", None)
+            if page_done:
+                # 複数のクエリを並行して取得する場合は、ページの記事を受け取ったスレッドで記録する
+                page_done(page, keys)
+            else:
+                self._save_page_done(query, page, keys)
+        return getattr(self._query_context, "stopped", False)
+
+    def _save_page_done(self, query, page, keys):
+        """クエリの検索ページを取得し終えたことと、そのクエリで見つかった記事をチェックポイントに記録する"""
+        if not self.checkpoint:
+            return
+        self.checkpoint.set(self._last_page_key(query), page)
+        self.checkpoint.set(f"query_keys:{query}", keys)
+        self.checkpoint.commit()
+
+    def claim_article_url(self, href):
+        """
+        検索結果のリンクを正規化し、未取得の記事であれば取得済みとして記録してURLを返す
+
+        記事以外のリンク（ハッシュタグ、ユーザーページ、共有リンク、ヘルプなど）や
+        取得済みの記事（同じ記事へのリンクは、独自ドメインの記事も含めて記事IDでまとめる）の場合はNoneを返す。
+        ハッシュタグの一覧で前回取得した記事に到達した場合は、それ以降の記事もNoneを返す。
+        """
+        if not href or href == "#":
+            return None
+
+        # 相対パスを絶対パスに変換し、クエリやフラグメントを取り除く
+        article_url = canonicalize_url(href, self.base_url)
+        if not is_article_url(article_url, self.base_url):
+            return None
+
+        key = article_key(article_url)
+        context = self._query_context
+        if getattr(context, "stopped", False):
+            return None
+
+        with self._claim_lock:
+            # 他のクエリで取得済みの記事でも、このクエリで見つかったことは記録する
+            query = getattr(context, "query", None)
+            if query is not None:
+                self._query_hits[query][key] = None
+
+            if getattr(context, "known", None) and extract_note_id(article_url) in context.known:
+                context.stopped = True
+                print(f"前回取得した記事（{extract_note_id(article_url)}）に到達したため、「{query}」のページ送りを終了します。")
+                self._count("feed_reached_known")
+                return None
+
+            if key in self._seen_keys:
+                return None
+            self._seen_keys.add(key)
+        return article_url
+
+    def progress_bar(self, iterable, total=None, desc=None):
+        """進捗バーを表示しながら要素を返す（progress=Falseの場合はそのまま返す）"""
+        if not self.progress:
+            return iterable
+
+        from tqdm import tqdm
+
+        return tqdm(iterable, total=total, desc=desc)
+
+    def _fetch_article_detail(self, article):
+        """1件の記事の詳細情報を取得して、更新用の辞書を返す"""
+        with self.metrics.span("detail"):
+            return self._fetch_detail(article)
+
+    def _fetch_detail(self, article):
+        try:
+            # URLが無効な場合はスキップ
+            detail_url = self.backend.detail_url(article)
+            if not detail_url or detail_url == "#" or "help-note.com" in detail_url or "search?" in detail_url:
+                return {
+                    "title": article.get("title_from_search", "無効なURL"),
+                    "author": "不明",
+                    "published_date": None,
+                    "likes": "0",
+                    "tags": [],
+                    "content_preview": "無効なURLのため取得できませんでした",
+                }
+
+            # 保存済みの記事がまだ新しければ、リクエストせずに再利用する
+            note_id = extract_note_id(article["url"])
+            stored = self.store.get(note_id) if self.store and note_id else None
+            if stored and time.time() - stored["fetched_at"] < self.store_ttl:
+                self._count("store_fresh")
+                return stored["record"]
+
+            # 保存済みの記事は条件付きGETで更新の有無を確認する
+            headers = {}
+            if stored and stored["etag"]:
+                headers["If-None-Match"] = stored["etag"]
+            if stored and stored["last_modified"]:
+                headers["If-Modified-Since"] = stored["last_modified"]
+
+            # サーバーに負荷をかけないよう、詳細取得のレート制限に従って取得する
+            # （ストリーミングで取得する場合は、ここでは本文を読み込まない）
+            # 保存済みの記事の再確認では、ストアの有効期間より長く残るレスポンスキャッシュを使わない
+            response = self.http.get(
+                detail_url, headers=headers, endpoint="detail", stream=self.stream, use_cache=not stored
+            )
+            if stored and response.status_code == 304:
+                response.close()
+                self._count("store_not_modified")
+                self.store.touch(note_id)
+                return stored["record"]
+            if response.status_code >= 400:
+                response.close()
                 response.raise_for_status()
 
-                soup = BeautifulSoup(response.text, "lxml")
-
-                # 記事の各要素を取得
-                title = self._get_title(soup, article)
-                author = self._get_author(soup, article)
-                published_date = self._get_published_date(soup)
-                likes = self._get_likes(soup)
-                tags = self._get_tags(soup)
-                content_preview = self._get_content_preview(soup)
-
-                # 記事情報を更新
-                self.articles[i].update(
-                    {
-                        "title": title,
-                        "author": author,
-                        "published_date": published_date,
-                        "likes": likes,
-                        "tags": tags,
-                        "content_preview": content_preview,
-                    }
+            if self.stream:
+                # 読み込みながら解析するため、本文のハッシュ値は読み込んだ部分から計算する
+                detail, body = self._parse_article_stream(response, article)
+                content_hash = hashlib.sha256(body).hexdigest()
+                self._count("fetched")
+            else:
+                # 本文が変わっていなければ解析を省略する
+                content_hash = hashlib.sha256(response.content).hexdigest()
+                if stored and stored["content_hash"] == content_hash:
+                    self._count("store_unchanged")
+                    detail = stored["record"]
+                else:
+                    self._count("fetched")
+                    detail = self.backend.parse_detail(response, article)
+
+            if self.store and note_id:
+                self.store.put(
+                    note_id,
+                    article["url"],
+                    detail,
+                    etag=response.headers.get("ETag"),
+                    last_modified=response.headers.get("Last-Modified"),
+                    content_hash=content_hash,
                 )
+            return detail
 
-                # サーバーに負荷をかけないよう少し待機
-                time.sleep(random.uniform(self.detail_min_wait, self.detail_max_wait))
+        except Exception as e:
+            print(f"記事 {article['url']} の詳細取得中にエラーが発生しました: {e}")
+            self._count("detail_error")
+            self.metrics.log("detail_error", url=article["url"], error=str(e), error_type=type(e).__name__)
+            if self.raise_errors:
+                raise
+            return {
+                "title": article.get("title_from_search", "取得エラー"),
+                "author": "不明",
+                "published_date": None,
+                "likes": "0",
+                "tags": [],
+                "content_preview": f"エラーにより取得できませんでした: {str(e)}",
+            }
+
+    def _parse_article(self, html, article, encoding=None):
+        """記事ページのHTMLから各要素を取得する（parse_workersを指定した場合はワーカープロセスで解析する）"""
+        # 計測する場合だけ、フィールドごとに値を決めたパターンと _get_* メソッドごとの処理時間を受け取る
+        trace = {} if self.metrics.enabled else None
+        with self.metrics.span("parse"):
+            if self.parse_pool:
+                fields, kind = self.parse_pool.parse(html, article, encoding, trace=trace)
+            else:
+                fields, kind = self.parse_page(html, article, self.parser, encoding, trace=trace)
+        self._count(f"parsed_{kind}")
+        self._record_trace(trace)
+        return fields
+
+    def _parse_article_stream(self, response, article):
+        """
+        記事ページを分割して読み込みながら解析し、stream_fields の値が確定した時点で読み込みをやめる
 
-            except Exception as e:
-                print(f"記事 {article['url']} の詳細取得中にエラーが発生しました: {e}")
-                self.articles[i].update(
-                    {
-                        "title": article.get("title_from_search", "取得エラー"),
-                        "author": "不明",
-                        "published_date": None,
-                        "likes": "0",
-                        "tags": [],
-                        "content_preview": f"エラーにより取得できませんでした: {str(e)}",
-                    }
+        Returns:
+            tuple: (フィールドの辞書, 読み込んだ本文のバイト列)
+        """
+        trace = {} if self.metrics.enabled else None
+        chunks = self.http.iter_body(response, endpoint="detail", chunk_size=min(STREAM_CHUNK_SIZE, self.max_page_bytes))
+        try:
+            # 受信しながら解析するため、処理時間には受信の待ち時間も含まれる
+            with self.metrics.span("stream_parse"):
+                fields, body, status = self.parse_page_stream(
+                    chunks,
+                    article,
+                    self.parser,
+                    response.encoding,
+                    fields=self.stream_fields,
+                    max_bytes=self.max_page_bytes,
+                    trace=trace,
                 )
+        finally:
+            chunks.close()
+        self._count("parsed_dom")
+        self._count(f"stream_{status}")
+        self._count("stream_bytes", len(body))
+        self._record_trace(trace)
+        return fields, body
+
+    def _record_trace(self, trace):
+        """フィールドごとに値を決めたパターンと _get_* メソッドごとの処理時間を指標に記録する"""
+        if not trace:
+            return
+        for field, pattern in trace.get("winners", {}).items():
+            self.metrics.inc("field_pattern_total", field=field, pattern="none" if pattern is None else pattern)
+        for method, seconds in trace.get("timings", {}).items():
+            self.metrics.observe("extract_seconds", seconds, method=method)
+
+    @classmethod
+    def parse_page(cls, html, article, parser="structured", encoding=None, trace=None):
+        """
+        記事ページのHTMLから各要素を取得する
+
+        クローラーの状態を使わないため、ワーカープロセスからも呼び出せる。
+
+        Args:
+            html (str | bytes): 記事ページのHTML
+            article (dict): 記事の情報（url, title_from_search を使用）
+            parser (str): 解析方法（"structured", "compiled", "soup"）
+            encoding (str): htmlがbytesの場合の文字コード
+            trace (dict): 指定した場合、"winners" にフィールドごとに値を決めたパターン（セレクタの番号、
+                "structured"、"url"、None）を、"timings" に _get_* メソッドごとの処理時間（秒）を記録する
+
+        Returns:
+            tuple: (フィールドの辞書, 解析の種類。"structured"（埋め込みJSONのみ）, "dom", "soup" のいずれか)
+        """
+        structured = {}
+        if parser == "structured":
+            # ページに埋め込まれたJSONだけで揃えば、HTMLの木は作らない
+            text = html.decode(encoding or "utf-8", errors="replace") if isinstance(html, bytes) else html
+            structured = extract_structured_fields(text, extract_note_id(article["url"]))
+            if all(field in structured for field in ARTICLE_FIELDS):
+                if trace is not None:
+                    trace["winners"] = dict.fromkeys(structured, "structured")
+                return structured, "structured"
+
+        if parser in ("structured", "compiled"):
+            fields, winners = cls.EXTRACTOR.extract(
+                html, article["url"], article.get("title_from_search", ""), encoding=encoding
+            )
+            # JSONから取得できたフィールドはそちらを優先する
+            fields.update(structured)
+            if trace is not None:
+                winners.update(dict.fromkeys(structured, "structured"))
+                trace["winners"] = winners
+            return fields, "dom"
+
+        from bs4 import BeautifulSoup
+
+        soup = BeautifulSoup(html, "lxml", from_encoding=encoding if isinstance(html, bytes) else None)
+        getters = (
+            ("title", cls._get_title, (soup, article)),
+            ("author", cls._get_author, (soup, article)),
+            ("published_date", cls._get_published_date, (soup,)),
+            ("likes", cls._get_likes, (soup,)),
+            ("tags", cls._get_tags, (soup,)),
+            ("content_preview", cls._get_content_preview, (soup,)),
+        )
+        if trace is None:
+            return {field: getter(*args) for field, getter, args in getters}, "soup"
+
+        fields = {}
+        winners = trace["winners"] = {}
+        timings = trace["timings"] = {}
+        for field, getter, args in getters:
+            start = time.perf_counter()
+            fields[field] = getter(*args, winners=winners)
+            timings[getter.__name__] = time.perf_counter() - start
+        return fields, "soup"
+
+    @classmethod
+    def parse_page_stream(
+        cls, chunks, article, parser="structured", encoding=None, fields=ARTICLE_FIELDS, max_bytes=None, trace=None
+    ):
+        """
+        記事ページのHTMLを分割して受け取りながら解析し、fields の値が確定した時点で読み込みをやめる
 
-    def _get_title(self, soup, article):
-        """記事のタイトルを取得する"""
+        要素は parser によらず抽出エンジン（"compiled" と同じ方法）で取得する。
+        "structured" の場合は、読み込んだ部分に埋め込まれたJSONから取得できたフィールドを優先する。
+
+        Args:
+            chunks (iterable): 記事ページのHTMLのバイト列の断片
+            article (dict): 記事の情報（url, title_from_search を使用）
+            parser (str): 解析方法（"structured", "compiled", "soup"）
+            encoding (str): HTMLの文字コード
+            fields (tuple): 値が確定するまで読み込むフィールド
+            max_bytes (int): 読み込む最大バイト数
+            trace (dict): 指定した場合、"winners" にフィールドごとに値を決めたパターンを記録する
+
+        Returns:
+            tuple: (フィールドの辞書, 読み込んだバイト列, 読み込みを終えた理由。"complete", "eof", "truncated")
+        """
+        values, winners, body, status = cls.EXTRACTOR.extract_stream(
+            chunks, article["url"], article.get("title_from_search", ""), encoding, fields, max_bytes
+        )
+        if parser == "structured":
+            text = body.decode(encoding or "utf-8", errors="replace")
+            structured = extract_structured_fields(text, extract_note_id(article["url"]))
+            values.update(structured)
+            winners.update(dict.fromkeys(structured, "structured"))
+        if trace is not None:
+            trace["winners"] = winners
+        return values, body, status
+
+    def _count(self, name, value=1):
+        """統計情報のカウンターを加算する（計測する場合は指標にも記録する）"""
+        with self._stats_lock:
+            self.stats[name] += value
+        self.metrics.inc("events_total", value, event=name)
+
+    @staticmethod
+    def _won(winners, field, pattern, value):
+        """値を決めたパターンを winners に記録して、値をそのまま返す"""
+        if winners is not None:
+            winners[field] = pattern
+        return value
+
+    @classmethod
+    def _get_title(cls, soup, article, winners=None):
+        """記事のタイトルを取得する（winnersを指定した場合は、値を決めたパターンを記録する）"""
         title = article.get("title_from_search", "")
 
         # パターン1: o-noteContentHeader__title クラスのh1タグ
         try:
-            title_elem = soup.select_one(self.TITLE_SELECTORS[0])
+            title_elem = soup.select_one(cls.TITLE_SELECTORS[0])
             if title_elem and title_elem.text.strip():
-                return title_elem.text.strip()
+                return cls._won(winners, "title", 0, title_elem.text.strip())
         except (AttributeError, TypeError) as e:
             print(f"タイトル取得パターン1でエラー: {e}")
 
@@ -236,7 +753,7 @@ class NoteAICrawler:
             if meta_title:
                 title_text = meta_title.get("content", "")
                 # "｜note"や"｜著者名"などの部分を削除
-                return re.sub(r"[\s\|｜].*$", "", title_text)
+                return cls._won(winners, "title", 1, re.sub(r"[\s\|｜].*$", "", title_text))
         except (AttributeError, TypeError) as e:
             print(f"タイトル取得パターン2でエラー: {e}")
 
@@ -246,7 +763,7 @@ class NoteAICrawler:
             if title_elem:
                 title_text = title_elem.text.strip()
                 # "｜note"や"｜著者名"などの部分を削除
-                return re.sub(r"[\s\|｜].*$", "", title_text)
+                return cls._won(winners, "title", 2, re.sub(r"[\s\|｜].*$", "", title_text))
         except (AttributeError, TypeError) as e:
             print(f"タイトル取得パターン3でエラー: {e}")
 
@@ -255,7 +772,7 @@ class NoteAICrawler:
             h1_elems = soup.find_all("h1")
             for h1 in h1_elems:
                 if h1 and hasattr(h1, "text") and h1.text.strip():
-                    return h1.text.strip()
+                    return cls._won(winners, "title", 3, h1.text.strip())
         except (AttributeError, TypeError) as e:
             print(f"タイトル取得パターン4でエラー: {e}")
 
@@ -265,19 +782,20 @@ class NoteAICrawler:
             if len(url_parts) > 0:
                 slug = url_parts[-1]
                 # スラッグをタイトルらしい形式に変換（ハイフンをスペースに置換など）
-                return slug.replace("-", " ").replace("_", " ").replace("n", "")
+                return cls._won(winners, "title", "url", slug.replace("-", " ").replace("_", " ").replace("n", ""))
         except Exception as e:
             print(f"タイトル取得パターン5でエラー: {e}")
 
-        return title or "タイトル不明"
+        return cls._won(winners, "title", None, title or "タイトル不明")
 
-    def _get_author(self, soup, article):
+    @classmethod
+    def _get_author(cls, soup, article, winners=None):
         """記事の著者を取得する"""
         # パターン1: data-note-user-name属性
         try:
-            author_elem = soup.select_one(self.AUTHOR_SELECTORS[0])
+            author_elem = soup.select_one(cls.AUTHOR_SELECTORS[0])
             if author_elem:
-                return author_elem.get("data-note-user-name")
+                return cls._won(winners, "author", 0, author_elem.get("data-note-user-name"))
         except (AttributeError, TypeError) as e:
             print(f"著者取得パターン1でエラー: {e}")
 
@@ -285,7 +803,7 @@ class NoteAICrawler:
         try:
             author_match = re.search(r"note\.com/([^/]+)", article["url"])
             if author_match:
-                return author_match.group(1)
+                return cls._won(winners, "author", "url", author_match.group(1))
         except Exception as e:
             print(f"著者取得パターン2でエラー: {e}")
 
@@ -295,162 +813,542 @@ class NoteAICrawler:
             if meta_author:
                 author_text = meta_author.get("content", "")
                 if author_text and author_text != "note":
-                    return author_text
+                    return cls._won(winners, "author", 1, author_text)
         except (AttributeError, TypeError) as e:
             print(f"著者取得パターン3でエラー: {e}")
 
-        return "著者不明"
+        return cls._won(winners, "author", None, "著者不明")
 
-    def _get_published_date(self, soup):
+    @classmethod
+    def _get_published_date(cls, soup, winners=None):
         """記事の投稿日を取得する"""
         try:
-            date_elem = soup.select_one("time")
+            date_elem = soup.select_one(cls.DATE_SELECTORS[0])
             if date_elem:
-                return date_elem.get("datetime")
+                return cls._won(winners, "published_date", 0, date_elem.get("datetime"))
         except (AttributeError, TypeError) as e:
             print(f"投稿日取得でエラー: {e}")
-        return None
+        return cls._won(winners, "published_date", None, None)
 
-    def _get_likes(self, soup):
+    @classmethod
+    def _get_likes(cls, soup, winners=None):
         """記事のいいね数を取得する"""
         # パターン1: data-like-count属性
         try:
-            like_elem = soup.select_one(self.LIKES_SELECTORS[0])
+            like_elem = soup.select_one(cls.LIKES_SELECTORS[0])
             if like_elem:
-                return like_elem.get("data-like-count")
+                return cls._won(winners, "likes", 0, like_elem.get("data-like-count"))
         except (AttributeError, TypeError) as e:
             print(f"いいね数取得パターン1でエラー: {e}")
 
         # パターン2: o-noteContentHeader__titleAttachment クラスの要素
         try:
-            like_elem = soup.select_one(self.LIKES_SELECTORS[1])
+            like_elem = soup.select_one(cls.LIKES_SELECTORS[1])
             if like_elem:
                 like_text = like_elem.text.strip()
                 like_match = re.search(r"\d+", like_text)
                 if like_match:
-                    return like_match.group(0)
+                    return cls._won(winners, "likes", 1, like_match.group(0))
         except (AttributeError, TypeError) as e:
             print(f"いいね数取得パターン2でエラー: {e}")
 
         # パターン3: likeやheartを含むクラス名の要素
         try:
-            like_text_elem = soup.select_one(self.LIKES_SELECTORS[2])
+            like_text_elem = soup.select_one(cls.LIKES_SELECTORS[2])
             if like_text_elem:
                 like_text = like_text_elem.text.strip()
                 like_match = re.search(r"\d+", like_text)
                 if like_match:
-                    return like_match.group(0)
+                    return cls._won(winners, "likes", 2, like_match.group(0))
         except (AttributeError, TypeError) as e:
             print(f"いいね数取得パターン3でエラー: {e}")
 
-        return "0"
+        return cls._won(winners, "likes", None, "0")
 
-    def _get_tags(self, soup):
+    @classmethod
+    def _get_tags(cls, soup, winners=None):
         """記事のタグを取得する"""
         tags = []
 
         # パターン1: /hashtag/へのリンク
         try:
-            tags_elems = soup.select(self.TAGS_SELECTORS[0])
+            tags_elems = soup.select(cls.TAGS_SELECTORS[0])
             if tags_elems:
-                return [tag.text.strip() for tag in tags_elems if tag.text.strip()]
+                return cls._won(winners, "tags", 0, [tag.text.strip() for tag in tags_elems if tag.text.strip()])
         except (AttributeError, TypeError) as e:
             print(f"タグ取得パターン1でエラー: {e}")
 
         # パターン2: tagを含むクラス名の要素
         try:
-            tags_elems = soup.select(self.TAGS_SELECTORS[1])
+            tags_elems = soup.select(cls.TAGS_SELECTORS[1])
             if tags_elems:
-                return [tag.text.strip() for tag in tags_elems if tag.text.strip()]
+                return cls._won(winners, "tags", 1, [tag.text.strip() for tag in tags_elems if tag.text.strip()])
         except (AttributeError, TypeError) as e:
             print(f"タグ取得パターン2でエラー: {e}")
 
-        return tags
+        return cls._won(winners, "tags", None, tags)
 
-    def _get_content_preview(self, soup):
+    @classmethod
+    def _get_content_preview(cls, soup, winners=None):
         """記事の本文プレビューを取得する"""
         try:
             # 複数のパターンを試す
-            content_elems = soup.select(self.CONTENT_SELECTORS[0])
+            content_elems = soup.select(cls.CONTENT_SELECTORS[0])
             if content_elems:
-                return "\n".join([p.text.strip() for p in content_elems[:3] if p.text.strip()])
+                preview = "\n".join([p.text.strip() for p in content_elems[:3] if p.text.strip()])
+                return cls._won(winners, "content_preview", 0, preview)
         except (AttributeError, TypeError) as e:
             print(f"本文プレビュー取得でエラー: {e}")
 
-        return ""
+        return cls._won(winners, "content_preview", None, "")
 
-    def filter_ai_articles(self):
-        """AI関連の記事のみをフィルタリング"""
-        filtered_articles = []
-
-        for article in self.articles:
-            # タイトル、タグ、本文のいずれかにAI関連キーワードが含まれているか確認
-            title = article.get("title", "").lower()
-            tags = [tag.lower() for tag in article.get("tags", [])]
-            content = article.get("content_preview", "").lower()
+    def _is_ai_related(self, article):
+        """
+        タイトル、タグ、本文のいずれかにAI関連キーワードが含まれているか確認
 
-            is_ai_related = False
-            for keyword in self.AI_KEYWORDS:
-                keyword_lower = keyword.lower()
-                if keyword_lower in title or any(keyword_lower in tag for tag in tags) or keyword_lower in content:
-                    is_ai_related = True
-                    break
+        見つかったキーワードと位置、関連度を記事に記録する。
+        - matched_keywords: 見つかったキーワード（出現数の多い順）
+        - keyword_matches: キーワード、フィールド、正規化したテキスト上の開始位置
+        - relevance: フィールドごとの重みを付けた出現数の合計
+        """
+        matches = self.matcher.match_article(article)
+        counts = Counter(match["keyword"] for match in matches)
 
-            if is_ai_related:
-                filtered_articles.append(article)
+        article["matched_keywords"] = [keyword for keyword, _ in counts.most_common()]
+        article["keyword_matches"] = matches
+        article["relevance"] = sum(self.RELEVANCE_WEIGHTS[match["field"].split("[")[0]] for match in matches)
+        return bool(matches)
 
-        print(f"AI関連の記事は {len(filtered_articles)}/{len(self.articles)} 件でした。")
-        self.articles = filtered_articles
+    def iter_crawl(self):
+        """
+        検索→詳細取得→フィルタリングをパイプラインで実行し、AI関連の記事を検索結果の順に返すジェネレーター
 
-    def save_results(self):
-        """結果をCSVとJSONで保存"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        検索ページは別スレッドで取得し、記事のリンクが見つかり次第、詳細取得のワーカーに渡す。
+        そのため、最初の記事は検索1ページと詳細1件の取得が終わった時点で返される。
+        チェックポイントから再開する場合は、記録済みの記事（取得済みの記事は取得し直さない）を先に処理し、
+        続きの検索ページから取得する。
+        """
+        pending = queue.Queue(maxsize=self.fetch_threads * 4)
+        stop = threading.Event()
+        search_done = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=self.fetch_threads)
+        checkpoint = self.checkpoint
+        restored = checkpoint.candidates() if checkpoint else []
+        self.candidate_count = 0
+        self._search_failed = False
+
+        def produce():
+            try:
+                for candidate in restored:
+                    if stop.is_set():
+                        return
+                    article = candidate["article"]
+                    if candidate["status"] == "done":
+                        pending.put((article, None, candidate["decision"]))
+                    elif candidate["status"] == "pending":
+                        future = executor.submit(self._fetch_article_detail, article)
+                        pending.put((article, future, candidate["decision"]))
+
+                if checkpoint and checkpoint.get("search_complete"):
+                    search_done.set()
+                    return
+
+                for article in self.iter_search_results():
+                    if stop.is_set():
+                        return
+
+                    # 検索結果のカードだけで関連が薄いと判断できる記事は、詳細を取得しない
+                    decision = self.gate.decide(article) if self.gate else "pass"
+                    if checkpoint:
+                        checkpoint.add_candidate(article_key(article["url"]), article, decision)
+                    if decision == "skip":
+                        continue
+                    future = executor.submit(self._fetch_article_detail, article)
+                    pending.put((article, future, decision))
+
+                search_done.set()
+                # 取得できなかった検索ページがある場合は、再開したときにそのページから検索し直す
+                if checkpoint and not self._search_failed:
+                    checkpoint.set("search_complete", True)
+            except RuntimeError:
+                # 途中で終了した場合はexecutorが停止済みになる
+                pass
+            finally:
+                pending.put(None)
+
+        producer = threading.Thread(target=produce, daemon=True)
+        producer.start()
+
+        # 複数のクエリの場合、後から別のクエリでも見つかることがあるため、
+        # 記事を見つけたクエリが確定する（すべての検索ページを取得し終える）まで結果を返すのを待つ。
+        # 待っている間の記事はメモリにだけあり、出力の .part ファイルにはまだ書かれない
+        # （詳細はチェックポイントに記録済みのため、中断しても --resume で復元できる）
+        deferred = []
+
+        def with_queries(articles):
+            for article in articles:
+                article["queries"] = self.queries_for(article["url"])
+                yield article
 
-        # 不要なフィールドを削除
-        for article in self.articles:
-            if "title_from_search" in article:
-                del article["title_from_search"]
+        try:
+            while True:
+                item = pending.get()
+                if item is None:
+                    break
 
-        # CSVとして保存
-        df = pd.DataFrame(self.articles)
-        csv_path = os.path.join(self.output_dir, f"note_ai_articles_{timestamp}.csv")
-        df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+                # 投入した順に結果を受け取ることで、検索結果の順序を保つ
+                # （チェックポイントで取得済みの記事は future が None で、記録済みの内容をそのまま使う）
+                article, future, decision = item
+                if future is not None:
+                    article.update(future.result())
+                    if checkpoint:
+                        checkpoint.finish(article_key(article["url"]), article)
+                self.candidate_count += 1
+
+                is_ai_related = self._is_ai_related(article)
+                self._count("relevant" if is_ai_related else "not_relevant")
+                if decision == "audit" and future is not None:
+                    self.gate.record_audit(is_ai_related)
+                if not is_ai_related:
+                    continue
+                if not self.batch:
+                    yield article
+                elif search_done.is_set():
+                    yield from with_queries(deferred)
+                    deferred.clear()
+                    yield from with_queries([article])
+                else:
+                    deferred.append(article)
+
+            yield from with_queries(deferred)
+        finally:
+            stop.set()
+            # 後続の待ちを解除して、生産側のスレッドを終了させる
+            while producer.is_alive():
+                try:
+                    pending.get(timeout=0.1)
+                except queue.Empty:
+                    pass
+            executor.shutdown(wait=True, cancel_futures=True)
+            self.close_parse_pool()
+
+    def close_parse_pool(self):
+        """解析のワーカープロセスを終了する（次に解析するときに起動し直す）"""
+        if self.parse_pool:
+            self.parse_pool.close()
+
+    def _open_checkpoint(self):
+        """
+        チェックポイントを開く
 
-        # JSONとして保存
-        json_path = os.path.join(self.output_dir, f"note_ai_articles_{timestamp}.json")
-        with open(json_path, "w", encoding="utf-8") as f:
-            json.dump(self.articles, f, ensure_ascii=False, indent=2)
+        resume=True で、同じ設定で中断したクロールのチェックポイントがあれば、それを開いて取得済みの記事を復元する。
+        それ以外の場合は、古いチェックポイントを削除して新しく作成する。
+        """
+        path = os.path.join(self.output_dir, "checkpoint.sqlite")
+        params = {
+            "queries": self.queries,
+            "backend": self.backend.name,
+            "base_url": self.base_url,
+        }
 
-        print(f"結果を保存しました:")
-        print(f"- CSV: {csv_path}")
-        print(f"- JSON: {json_path}")
+        if os.path.exists(path):
+            checkpoint = Checkpoint(path)
+            if self.resume and checkpoint.get("params") == params:
+                candidates = checkpoint.candidates()
+                self._seen_keys.update(candidate["key"] for candidate in candidates)
+                for query in self.queries:
+                    self._query_hits[query].update(dict.fromkeys(checkpoint.get(f"query_keys:{query}", [])))
+                done = sum(1 for candidate in candidates if candidate["status"] == "done")
+                pages = "、".join(
+                    (f"「{query}」" if len(self.queries) > 1 else "") + str(checkpoint.get(self._last_page_key(query), 0))
+                    for query in self.queries
+                )
+                print(
+                    f"前回中断したクロールを再開します（検索ページ {pages} まで取得済み、"
+                    f"記事 {len(candidates)} 件のうち {done} 件取得済み）"
+                )
+                return checkpoint
+            if self.resume:
+                print("前回のチェックポイントは設定が異なるため、最初からクロールします。")
+            checkpoint.remove()
+        elif self.resume:
+            print("再開できるチェックポイントがないため、最初からクロールします。")
+
+        checkpoint = Checkpoint(path)
+        checkpoint.set("params", params)
+        checkpoint.set("basename", self._new_basename())
+        checkpoint.commit()
+        return checkpoint
+
+    def _new_basename(self):
+        return f"note_ai_articles_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+    def _open_writer(self, basename=None):
+        """結果を追記するライターを作成する（basenameを省略した場合はタイムスタンプ付きのファイル名）"""
+        formats = [f for f in self.output_formats if f in ("csv", "json")]
+        return StreamingResultWriter(self.output_dir, basename or self._new_basename(), formats=formats)
+
+    def _finalize(self, writer):
+        """結果のファイルを確定し、必要ならParquetデータセットにも追加して、保存先を表示する"""
+        with self.metrics.span("save_results"):
+            paths = writer.finalize()
+            if "parquet" in self.output_formats:
+                dataset_dir = os.path.join(self.output_dir, "parquet")
+                paths["parquet"] = write_results(paths["jsonl"], dataset_dir)
+        indexed = None
+        if self.search_index:
+            with self.metrics.span("index_results"):
+                indexed = self.search_index.add_run(paths["jsonl"])
+
+        print("結果を保存しました:")
+        for name, key in (("CSV", "csv"), ("JSON", "json"), ("JSONL", "jsonl")):
+            if key in paths:
+                print(f"- {name}: {paths[key]}")
+        if "parquet" in paths:
+            print(f"- Parquet: {dataset_dir}（{len(paths['parquet'])} 個のパーティション）")
+        if indexed is not None:
+            print(
+                f"- 検索の索引: {self.search_index.path}（{indexed} 件を追加・更新、"
+                f"計 {self.search_index.stats()['articles']} 件）"
+            )
+        self.metrics.log("saved", records=writer.count, paths=paths)
+        return paths
+
+    def print_stats(self):
+        """HTTP通信と記事取得の統計情報を表示"""
+        stats = self.http.stats()
+        print(
+            f"HTTPリクエスト: {stats['requests']} 件 "
+            f"（リトライ {stats['retries']} 回、接続の新規作成 {stats['connections_opened']} 件、"
+            f"再利用 {stats['connections_reused']} 件）"
+        )
+        if self.rate_limiter:
+            for endpoint, name in (("search", "検索"), ("detail", "詳細")):
+                limit = self.rate_limiter.stats()[endpoint]
+                if not limit["requests"]:
+                    continue
+                rate = f"{limit['rate']:.2f} 件/秒" if limit["rate"] is not None else "制限なし"
+                print(
+                    f"レート制限（{name}）: 現在 {rate}、待機 {limit['waited']:.1f} 秒、"
+                    f"429/5xx・エラー {limit['throttled']} 件、遅い応答 {limit['slow']} 件"
+                    + (f"（{limit['hosts']} ホスト）" if limit["hosts"] > 1 else "")
+                )
+        if self.cache:
+            cache_stats = self.cache.stats()
+            print(
+                f"レスポンスキャッシュ: ヒット {cache_stats['hits']} 件、ミス {cache_stats['misses']} 件、"
+                f"削除 {cache_stats['evictions']} 件（{cache_stats['entries']} 件、"
+                f"{cache_stats['size_bytes'] / 1024 / 1024:.1f} MB）"
+            )
+        if self.parser == "structured" and (self.stats["parsed_structured"] or self.stats["parsed_dom"]):
+            print(
+                f"記事の解析: 埋め込みJSONのみ {self.stats['parsed_structured']} 件、"
+                f"HTMLを解析 {self.stats['parsed_dom']} 件"
+            )
+        if self.stream and self.stats["parsed_dom"]:
+            print(
+                f"ストリーミング取得: 途中で停止 {self.stats['stream_complete']} 件、"
+                f"最後まで読み込み {self.stats['stream_eof']} 件、上限で打ち切り {self.stats['stream_truncated']} 件"
+                f"（読み込み {self.stats['stream_bytes'] / 1024 / 1024:.1f} MB）"
+            )
+        if self.gate:
+            report = self.gate.report()
+            missed = report["estimated_missed"]
+            print(
+                f"関連度ゲート: 詳細取得を省略 {report['saved_fetches']} 件"
+                f"（通過 {report['passed']} 件、判定不能 {report['uncertain']} 件、抜き取り確認 {report['audited']} 件）、"
+                f"取りこぼしの推定 {missed if missed is not None else '不明'} 件"
+            )
+        if self.store:
+            print(
+                f"記事の詳細: 新規取得 {self.stats['fetched']} 件、"
+                f"保存済みを再利用 {self.stats['store_fresh']} 件、"
+                f"未更新（304） {self.stats['store_not_modified']} 件、"
+                f"内容変化なし {self.stats['store_unchanged']} 件"
+            )
 
     def run(self):
-        """クローラーを実行"""
-        self.search_articles()
-        if self.articles:
-            self.get_article_details()
-            self.filter_ai_articles()
-            self.save_results()
+        """
+        クローラーを実行
+
+        Returns:
+            bool: 結果を保存したか、ハッシュタグの一覧が前回の位置まで取得済みで新着記事がなかった場合にTrue。
+                記事が見つからなかった場合はFalse
+        """
+        print(f"{self.target_label}を検索・取得中...")
+
+        # 途中経過をチェックポイントに保存し、中断しても --resume で続きから再開できるようにする
+        self.checkpoint = self._open_checkpoint() if self.use_checkpoint else None
+
+        # 記事はメモリに溜めず、見つかり次第ファイルに追記する
+        # （再開した場合は、同じファイル名でチェックポイントに記録済みの記事から書き直す）
+        writer = self._open_writer(self.checkpoint.get("basename") if self.checkpoint else None)
+        try:
+            for article in self.iter_crawl():
+                writer.write(article)
+
+            if not self.candidate_count and not (self.gate and self.gate.counts["skip"]):
+                # 前回取得した記事に到達して止まった場合は、一覧が最新の状態で、失敗ではない
+                up_to_date = all(query.startswith("#") for query in self.queries) and self.stats["feed_reached_known"]
+                print("新着記事はありませんでした。" if up_to_date else "記事が見つかりませんでした。")
+                writer.discard()
+                self._remove_checkpoint()
+                return bool(up_to_date)
+
+            print(f"AI関連の記事は {writer.count}/{self.candidate_count} 件でした。")
+            self._finalize(writer)
+            # 結果を保存できてから、次回のフィードの止まる位置を更新する
+            self._save_feed_state()
+            self._remove_checkpoint()
             return True
-        return False
+        except BaseException:
+            # 中断された場合も、それまでの結果は .part ファイルとチェックポイントに残す
+            writer.close()
+            print(f"中断されました。{writer.count} 件の結果が {writer.jsonl_path}.part に保存されています。")
+            if self.checkpoint:
+                self.checkpoint.close()
+                self.checkpoint = None
+                print("同じ設定で --resume（resume=True）を指定して実行すると、続きから再開できます。")
+            raise
+        finally:
+            self.metrics.log(
+                "run", queries=self.queries, candidates=self.candidate_count, written=writer.count, stats=self.stats
+            )
+            self.print_stats()
+
+    def run_worker(self, work_queue, worker_id=None, shard=None, lease_seconds=300.0, poll_interval=1.0):
+        """
+        作業キューからタスクを取得して処理するワーカーとして実行する
+
+        concurrency 個のスレッドがそれぞれタスクを借りて処理する。検索ページのタスクでは見つかった記事を
+        記事のタスクとしてキューに追加し、記事のタスクでは詳細を取得してAI関連かどうかを判定した結果を保存する。
+        未完了のタスクがなくなったら終了する。
+        検索ページや記事の取得に失敗したタスクは、エラーの記録を結果にせず失敗として返し、作業キューが再試行する。
+
+        Args:
+            work_queue (WorkQueue | RemoteWorkQueue): 作業キュー
+            worker_id (str): ワーカーの識別子（未指定の場合はホスト名とプロセスID）
+            shard (int): 担当するシャードの番号（Noneの場合はすべてのシャード）
+            lease_seconds (float): タスクのリースの期限（秒）。この時間内に完了しなければ別のワーカーが取得し直す
+            poll_interval (float): 取得できるタスクがないときに待つ時間（秒）
+
+        Returns:
+            Counter: 処理したタスクの数（search, detail, relevant, failed）
+        """
+        worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.raise_errors = True
+        processed = Counter()
+        lock = threading.Lock()
+
+        def work(thread_index):
+            owner = f"{worker_id}-{thread_index}"
+            while True:
+                task = work_queue.lease(owner, shard=shard, lease_seconds=lease_seconds)
+                if task is None:
+                    if not work_queue.pending_count(shard=shard):
+                        return
+                    # 他のワーカーが処理中の検索ページから、記事のタスクが追加されるのを待つ
+                    time.sleep(poll_interval)
+                    continue
+
+                try:
+                    if task["kind"] == "search":
+                        result = self._process_search_task(work_queue, task["payload"])
+                    else:
+                        result = self._process_detail_task(task["payload"])
+                    work_queue.complete(task["id"], owner, result)
+                    with lock:
+                        processed[task["kind"]] += 1
+                        processed["relevant"] += bool(result.get("relevant"))
+                except Exception as e:
+                    print(f"タスク {task['key']} の処理中にエラーが発生しました: {e}")
+                    work_queue.fail(task["id"], owner, str(e))
+                    with lock:
+                        processed["failed"] += 1
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            list(executor.map(work, range(self.concurrency)))
+        self.close_parse_pool()
+        return processed
+
+    def _process_search_task(self, work_queue, payload):
+        """検索ページを1ページ取得し、見つかった記事を記事のタスクとして追加する"""
+        found = 0
+        page = payload["page"]
+        key = None
+        try:
+            for article in self.backend.iter_search(payload["keyword"], page, start_page=page):
+                decision = self.gate.decide(article) if self.gate else "pass"
+                if decision == "skip":
+                    continue
+                key = article_key(article["url"])
+                payload = {"article": article.to_dict(search=True), "decision": decision}
+                found += work_queue.add("detail", key, payload)
+                key = None
+        except Exception:
+            # キューに追加できなかった記事は、タスクを再試行したときに追加し直せるよう未取得に戻す
+            # （追加済みの記事は、キューが記事IDで重複を除く）
+            if key is not None:
+                with self._claim_lock:
+                    self._seen_keys.discard(key)
+            raise
+        return {"found": found}
+
+    def _process_detail_task(self, payload):
+        """記事の詳細を取得し、AI関連かどうかを判定した記録を返す"""
+        article = ArticleRecord.from_dict(payload["article"])
+        article.update(self._fetch_article_detail(article))
+        is_ai_related = self._is_ai_related(article)
+        if payload["decision"] == "audit":
+            self.gate.record_audit(is_ai_related)
+        return {"record": article.to_dict(), "relevant": is_ai_related}
+
+    def merge_queue_results(self, work_queue):
+        """
+        作業キューの記事のタスクの結果から、AI関連の記事を1つの出力にまとめて保存する
+
+        記事のタスクは記事IDで重複なく登録されているため、複数のワーカーで取得しても同じ記事は1件になる。
+
+        Returns:
+            bool: AI関連の記事が1件以上あったか
+        """
+        writer = self._open_writer()
+        total = 0
+        after_id = 0
+        try:
+            while True:
+                rows = work_queue.results(after_id=after_id)
+                if not rows:
+                    break
+                for row in rows:
+                    total += 1
+                    if row["result"].get("relevant"):
+                        writer.write(row["result"]["record"])
+                after_id = rows[-1]["id"]
+        except BaseException:
+            writer.discard()
+            raise
+
+        if not writer.count:
+            print(f"AI関連の記事は見つかりませんでした（取得済みの記事 {total} 件）。")
+            writer.discard()
+            return False
+
+        print(f"AI関連の記事は {writer.count}/{total} 件でした。")
+        self._finalize(writer)
+        return True
+
+    def _remove_checkpoint(self):
+        """クロールが完了したらチェックポイントを削除する"""
+        if self.checkpoint:
+            self.checkpoint.remove()
+            self.checkpoint = None
 
 
 if __name__ == "__main__":
-    # クローラーの設定
-    search_keyword = "AI"  # 検索キーワード
-    max_pages = 5  # 検索する最大ページ数
-    output_dir = "output"  # 出力ディレクトリ
-
-    # クローラーの実行
-    crawler = NoteAICrawler(
-        search_keyword=search_keyword,
-        max_pages=max_pages,
-        output_dir=output_dir,
-        min_wait=1.0,
-        max_wait=3.0,
-        detail_min_wait=2.0,
-        detail_max_wait=4.0,
-    )
+    # 設定はコマンドライン引数で指定する（python note_ai_crawler.py --help）
+    import sys
+
+    from cli import main
 
-    crawler.run()
+    sys.exit(main(["crawl", *sys.argv[1:]]))
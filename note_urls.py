@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import re
+from urllib.parse import urljoin, urlsplit, urlunsplit
+
+# 記事URLのパス（/<ユーザー名>/n/<記事ID> または /n/<記事ID>）
+ARTICLE_PATH_PATTERN = re.compile(r"^(?:/[^/]+)?/n/(n[0-9a-z]+)$")
+
+# 記事URLと同じ形式のパスがあっても、noteの記事ではないホスト（サブドメインを含む）
+NON_ARTICLE_HOSTS = ("help-note.com", "lp-note.com")
+
+
+def canonicalize_url(url, base_url="https://note.com"):
+    """
+    URLを正規化する
+
+    相対パスを絶対URLに変換し、ホスト名を小文字にして、クエリ、フラグメント、末尾のスラッシュを取り除く。
+
+    Args:
+        url (str): 正規化するURL
+        base_url (str): 相対パスの基準となるURL
+
+    Returns:
+        str: 正規化したURL
+    """
+    parts = urlsplit(urljoin(base_url + "/", url.strip()))
+    path = parts.path.rstrip("/")
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, "", ""))
+
+
+def extract_note_id(url):
+    """記事URLから記事ID（例: n2edf753c0fe5）を取り出す。記事URLでなければNoneを返す"""
+    match = ARTICLE_PATH_PATTERN.match(urlsplit(url).path.rstrip("/"))
+    return match.group(1) if match else None
+
+
+def _is_excluded_host(host):
+    host = host.split(":", 1)[0]
+    return any(host == excluded or host.endswith("." + excluded) for excluded in NON_ARTICLE_HOSTS)
+
+
+def is_article_url(url, base_url="https://note.com"):
+    """
+    正規化済みのURLが記事ページかどうか
+
+    独自ドメインで公開されている記事（https://kensuu.com/n/... など）も記事として扱うため、ホストは
+    base_url と同じでなくてもよい。http(s)のURLで、パスが記事URLの形式であり、ヘルプなどnoteの記事以外の
+    ホスト（NON_ARTICLE_HOSTS）でないものを記事とみなす。
+
+    Args:
+        url (str): 正規化済みのURL
+        base_url (str): noteのURL（このホストの記事は常に記事とみなす）
+    """
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.netloc:
+        return False
+    if parts.netloc != urlsplit(base_url).netloc.lower() and _is_excluded_host(parts.netloc):
+        return False
+    return extract_note_id(url) is not None
+
+
+def article_key(url):
+    """重複判定に使うキーを返す。記事URLは /n/<記事ID> にまとめ、それ以外は正規化したURLを返す"""
+    note_id = extract_note_id(url)
+    return f"/n/{note_id}" if note_id else canonicalize_url(url)
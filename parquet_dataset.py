@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import ast
+import csv
+import glob
+import json
+import os
+import re
+from datetime import datetime
+
+from article_record import JST, parse_datetime, parse_likes
+from note_urls import article_key
+from writers import iter_jsonl
+
+# 投稿日が不明な記事のパーティション（Hive形式の慣例に合わせ、読み込み時はnullになる）
+DEFAULT_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+PARTITION_KEY = "date"
+
+# 過去の実行結果のファイル名（note_ai_articles_YYYYmmdd_HHMMSS.{jsonl,json,csv}）
+_RUN_FILE_PATTERN = re.compile(r"note_ai_articles_(\d{8}_\d{6})\.(jsonl|json|csv)$")
+# 同じ実行のファイルが複数ある場合に優先する形式（型の情報が失われていないものから）
+_FORMAT_PRIORITY = ("jsonl", "json", "csv")
+_MIN_TIME = datetime.min.replace(tzinfo=JST)
+
+
+def _import_pyarrow():
+    """pyarrowを必要になったときに読み込む（Parquetで保存しない場合はインストール不要）"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise RuntimeError("Parquetで保存するには pyarrow が必要です（pip install pyarrow）") from e
+    return pyarrow, pyarrow.parquet
+
+
+def require_pyarrow():
+    """pyarrowがインストールされているか確認する（クロールを始める前に確認するために使う）"""
+    _import_pyarrow()
+
+
+def _schema(pa):
+    """データセットのスキーマ（著者とタグは辞書エンコード）"""
+    return pa.schema(
+        [
+            ("note_id", pa.string()),
+            ("url", pa.string()),
+            ("title", pa.string()),
+            ("author", pa.dictionary(pa.int32(), pa.string())),
+            ("published_date", pa.timestamp("ms", tz="+09:00")),
+            ("likes", pa.int64()),
+            ("tags", pa.list_(pa.dictionary(pa.int32(), pa.string()))),
+            ("content_preview", pa.string()),
+            ("matched_keywords", pa.list_(pa.string())),
+            (
+                "keyword_matches",
+                pa.list_(pa.struct([("keyword", pa.string()), ("field", pa.string()), ("start", pa.int64())])),
+            ),
+            ("relevance", pa.int64()),
+            ("queries", pa.list_(pa.dictionary(pa.int32(), pa.string()))),
+            ("crawled_at", pa.timestamp("ms", tz="+09:00")),
+        ]
+    )
+
+
+def _parse_list(value):
+    """CSVで文字列になったリスト（"['AI', '機械学習']"）を元に戻す"""
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    if not value:
+        return []
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+def to_row(record, crawled_at):
+    """
+    クロール結果の記録を、データセットの1行（型を変換した辞書）にする
+
+    Args:
+        record (dict): クロール結果の記録（JSON/JSONLの記録、またはCSVの行）
+        crawled_at (datetime): 記録を取得した実行の日時
+
+    Returns:
+        dict: スキーマの列名をキーとする辞書
+    """
+    url = record.get("url") or ""
+    key = article_key(url)
+    relevance = record.get("relevance")
+    return {
+        "note_id": key.rsplit("/", 1)[-1] if key else None,
+        "url": url,
+        "title": record.get("title") or None,
+        "author": record.get("author") or None,
+        "published_date": parse_datetime(record.get("published_date")),
+        "likes": parse_likes(record.get("likes")),
+        "tags": [str(tag) for tag in _parse_list(record.get("tags"))],
+        "content_preview": record.get("content_preview") or None,
+        "matched_keywords": [str(k) for k in _parse_list(record.get("matched_keywords"))],
+        "keyword_matches": [m for m in _parse_list(record.get("keyword_matches")) if isinstance(m, dict)],
+        "relevance": int(relevance) if relevance not in (None, "") else None,
+        "queries": [str(query) for query in _parse_list(record.get("queries"))],
+        "crawled_at": parse_datetime(crawled_at),
+    }
+
+
+def _row_key(row):
+    """重複を判定するキー（記事IDがわかれば記事ID、わからなければURL）"""
+    return row["note_id"] or row["url"]
+
+
+def _partition(row):
+    published = row["published_date"]
+    return published.strftime("%Y-%m-%d") if published else DEFAULT_PARTITION
+
+
+def _build_table(pa, rows):
+    schema = _schema(pa)
+    # 列を追加する前に作成したファイルの行には、その列がない
+    columns = [pa.array([row.get(field.name) for row in rows], type=field.type) for field in schema]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def _write_table(pq, table, path):
+    """書き終えてから置き換えることで、書き込み途中のファイルを読まれないようにする"""
+    tmp_path = path + ".part"
+    pq.write_table(table, tmp_path, compression="zstd")
+    os.replace(tmp_path, path)
+
+
+def write_dataset(rows, dataset_dir, basename):
+    """
+    行を投稿日（日本時間）ごとのパーティションに分けてParquetファイルに書き出す
+
+    ファイルは dataset_dir/date=YYYY-MM-DD/<basename>.parquet に作成する。
+    投稿日が不明な行は date=__HIVE_DEFAULT_PARTITION__ に入る。
+
+    Args:
+        rows (iterable): to_row() で変換した行
+        dataset_dir (str): データセットのディレクトリ
+        basename (str): 各パーティションに作成するファイル名（拡張子なし）
+
+    Returns:
+        list: 作成したファイルのパス
+    """
+    pa, pq = _import_pyarrow()
+    partitions = {}
+    for row in rows:
+        partitions.setdefault(_partition(row), []).append(row)
+
+    paths = []
+    for partition, partition_rows in sorted(partitions.items()):
+        partition_dir = os.path.join(dataset_dir, f"{PARTITION_KEY}={partition}")
+        os.makedirs(partition_dir, exist_ok=True)
+        path = os.path.join(partition_dir, f"{basename}.parquet")
+        _write_table(pq, _build_table(pa, partition_rows), path)
+        paths.append(path)
+    return paths
+
+
+def write_results(jsonl_path, dataset_dir, crawled_at=None):
+    """1回の実行の結果（JSONL）をデータセットに追加する（実行日時は省略するとファイル名から求める）"""
+    basename = os.path.splitext(os.path.basename(jsonl_path))[0]
+    crawled_at = crawled_at or run_time_of(jsonl_path)
+    rows = (to_row(record, crawled_at) for record in iter_jsonl(jsonl_path))
+    return write_dataset(rows, dataset_dir, basename)
+
+
+def _run_time(timestamp):
+    return datetime.strptime(timestamp, "%Y%m%d_%H%M%S").astimezone(JST)
+
+
+def run_time_of(path):
+    """実行結果のファイル名（note_ai_articles_YYYYmmdd_HHMMSS.*）から実行日時を求める（求められない場合は現在時刻）"""
+    match = _RUN_FILE_PATTERN.search(os.path.basename(path))
+    return _run_time(match.group(1)) if match else datetime.now(JST)
+
+
+def read_run_file(path, file_format):
+    """実行結果のファイルの記録をリストで返す（CSVの場合は文字列の行）"""
+    if file_format == "jsonl":
+        return list(iter_jsonl(path))
+    if file_format == "json":
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    with open(path, encoding="utf-8-sig", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def iter_run_files(output_dir):
+    """
+    出力ディレクトリにある過去の実行結果を、古い順に1実行につき1ファイルずつ返す
+
+    Returns:
+        iterator: (ファイルのパス, 形式, 実行日時) のタプル
+    """
+    runs = {}
+    for path in glob.glob(os.path.join(output_dir, "note_ai_articles_*")):
+        match = _RUN_FILE_PATTERN.search(os.path.basename(path))
+        if match:
+            runs.setdefault(match.group(1), {})[match.group(2)] = path
+
+    for timestamp in sorted(runs):
+        for file_format in _FORMAT_PRIORITY:
+            if file_format in runs[timestamp]:
+                yield runs[timestamp][file_format], file_format, _run_time(timestamp)
+                break
+
+
+def _iter_dataset_rows(pq, dataset_dir):
+    for path in sorted(glob.glob(os.path.join(dataset_dir, f"{PARTITION_KEY}=*", "*.parquet"))):
+        yield path, pq.read_table(path).to_pylist()
+
+
+def compact(output_dir, dataset_dir=None):
+    """
+    過去の実行結果（JSON/CSV/JSONL）と既存のデータセットをまとめ、記事ごとに1行にする
+
+    同じ記事（記事ID、わからなければURL）が複数ある場合は、最も新しい実行の行を残す。
+    パーティションごとに1ファイルに書き直してから、まとめる前のファイルを削除する。
+    途中で失敗しても、もう一度実行すれば同じ結果になる。
+
+    Args:
+        output_dir (str): 過去の実行結果があるディレクトリ
+        dataset_dir (str): データセットのディレクトリ（未指定の場合は output_dir/parquet）
+
+    Returns:
+        dict: 読み込んだ行数、重複を除いた行数、パーティション数、作成したファイルのパス
+    """
+    pa, pq = _import_pyarrow()
+    dataset_dir = dataset_dir or os.path.join(output_dir, "parquet")
+
+    latest = {}
+    read_count = 0
+
+    def add(row):
+        # 同じ実行日時の場合は後から読んだ行を残す
+        key = _row_key(row)
+        current = latest.get(key)
+        if current is None or (row["crawled_at"] or _MIN_TIME) >= (current["crawled_at"] or _MIN_TIME):
+            latest[key] = row
+
+    old_paths = []
+    for path, rows in _iter_dataset_rows(pq, dataset_dir):
+        old_paths.append(path)
+        for row in rows:
+            read_count += 1
+            add(row)
+
+    for path, file_format, crawled_at in iter_run_files(output_dir):
+        for record in read_run_file(path, file_format):
+            if record.get("url"):
+                read_count += 1
+                add(to_row(record, crawled_at))
+
+    rows = sorted(latest.values(), key=lambda row: (row["published_date"] is None, row["published_date"] or 0))
+    basename = "compacted_" + datetime.now().strftime("%Y%m%d_%H%M%S")
+    new_paths = write_dataset(rows, dataset_dir, basename)
+
+    # 新しいファイルを書き終えてから、まとめる前のファイルと空になったパーティションを削除する
+    for path in set(old_paths) - set(new_paths):
+        os.remove(path)
+        partition_dir = os.path.dirname(path)
+        if not os.listdir(partition_dir):
+            os.rmdir(partition_dir)
+
+    return {"read": read_count, "articles": len(rows), "partitions": len(new_paths), "paths": new_paths}
+
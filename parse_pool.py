@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+
+def parse_page(html, url, title_from_search, parser, encoding=None, trace=False):
+    """
+    ワーカープロセスで記事ページを解析する
+
+    BeautifulSoupやlxmlでの解析はGILを保持したまま行われるため、別プロセスで実行して複数のコアを使う。
+    受け渡しはページのバイト列と解析結果の辞書だけにして、ツリーやsoupのオブジェクトは返さない。
+
+    Args:
+        html (bytes): 記事ページのHTML
+        url (str): 記事のURL
+        title_from_search (str): 検索結果ページで取得したタイトル
+        parser (str): 解析方法（"structured", "compiled", "soup"）
+        encoding (str): HTMLの文字コード
+        trace (bool): 値を決めたパターンと _get_* メソッドごとの処理時間も返すか
+
+    Returns:
+        tuple: (フィールドの辞書, 解析の種類, trace=Trueの場合は記録した辞書、それ以外はNone)
+    """
+    from note_ai_crawler import NoteAICrawler
+
+    article = {"url": url, "title_from_search": title_from_search}
+    recorded = {} if trace else None
+    fields, kind = NoteAICrawler.parse_page(html, article, parser, encoding, trace=recorded)
+    return fields, kind, recorded
+
+
+class ParsePool:
+    def __init__(self, workers, parser):
+        """
+        記事ページの解析を複数のプロセスで行うプール
+
+        通信はこれまでどおりスレッドで行い、取得したページのバイト列だけをワーカープロセスに渡す。
+        プロセスは最初の解析を依頼したときに起動し、close() で終了する（その後に依頼すると起動し直す）。
+        スレッドから起動しても安全なように、ワーカーはspawnで起動する。
+
+        Args:
+            workers (int): ワーカープロセスの数
+            parser (str): 解析方法（"structured", "compiled", "soup"）
+        """
+        self.workers = workers
+        self.parser = parser
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def parse(self, html, article, encoding=None, trace=None):
+        """
+        ワーカープロセスで記事ページを解析し、結果を待って (フィールドの辞書, 解析の種類) を返す
+
+        traceに辞書を指定した場合は、NoteAICrawler.parse_page と同じく、ワーカーで記録した内容をそこに反映する。
+        """
+        future = self._get_executor().submit(
+            parse_page,
+            html,
+            article["url"],
+            article.get("title_from_search", ""),
+            self.parser,
+            encoding,
+            trace is not None,
+        )
+        fields, kind, recorded = future.result()
+        if trace is not None:
+            trace.update(recorded)
+        return fields, kind
+
+    def close(self):
+        """ワーカープロセスを終了する"""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
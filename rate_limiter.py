@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+from urllib.parse import urlparse, urlsplit
+
+# 検索結果や記事一覧のページとみなすパス（それ以外は記事の詳細）
+_SEARCH_PATH_PARTS = ("/search", "/searches", "/hashtag/", "/hashtags/")
+
+# 混雑・過負荷を示すステータスコード
+THROTTLE_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def endpoint_class(url):
+    """URLから、レート制限を分けるエンドポイントの種類（"search" または "detail"）を返す"""
+    path = urlparse(url).path if "://" in url else url
+    return "search" if any(part in path for part in _SEARCH_PATH_PARTS) else "detail"
+
+
+def url_host(url):
+    """URLから、レート制限を分けるホスト名（小文字、ポートを含む）を返す"""
+    return urlsplit(url).netloc.lower() if url and "://" in url else None
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        rate,
+        min_rate=0.05,
+        max_rate=None,
+        burst=1.0,
+        increase=0.05,
+        decrease=0.5,
+        slow_decrease=0.8,
+        latency_target=2.0,
+        decrease_interval=1.0,
+    ):
+        """
+        AIMD（加算増加・乗算減少）で送信レートを調整するトークンバケット（スレッドセーフ）
+
+        リクエストの前に acquire() でトークンを予約し、足りなければ補充されるまで待つ。
+        レスポンスを受け取ったら record() で結果を伝える。成功するたびにレートを increase ずつ上げ、
+        429/5xxや通信エラーでは decrease 倍、応答が latency_target 秒より遅い場合は slow_decrease 倍に下げる。
+        並行するリクエストが同じ混雑を続けて報告してもレートが下がりすぎないよう、レートを下げるのは
+        decrease_interval 秒（その応答時間の方が長ければ応答時間）に1回までにする。
+
+        Args:
+            rate (float): 初期レート（毎秒）。0以下の場合は制限しない
+            min_rate (float): レートの下限（毎秒）
+            max_rate (float): レートの上限（毎秒）。未指定の場合は初期レート
+            burst (float): まとめて送れるリクエスト数（バケットの容量）
+            increase (float): 成功1回あたりに上げるレート（毎秒）
+            decrease (float): 429/5xx・通信エラー時にレートに掛ける係数
+            slow_decrease (float): 応答が遅い場合にレートに掛ける係数
+            latency_target (float): これより遅い応答をサーバーの混雑とみなす時間（秒）
+            decrease_interval (float): レートを下げる最短の間隔（秒）
+        """
+        self._config = {
+            "rate": rate,
+            "min_rate": min_rate,
+            "max_rate": max_rate,
+            "burst": burst,
+            "increase": increase,
+            "decrease": decrease,
+            "slow_decrease": slow_decrease,
+            "latency_target": latency_target,
+            "decrease_interval": decrease_interval,
+        }
+        self.unlimited = rate <= 0
+        self.max_rate = max_rate if max_rate is not None else rate
+        self.min_rate = min(min_rate, self.max_rate) if not self.unlimited else 0.0
+        self.rate = rate
+        self.burst = burst
+        self.increase = increase
+        self.decrease = decrease
+        self.slow_decrease = slow_decrease
+        self.latency_target = latency_target
+        self.decrease_interval = decrease_interval
+
+        self.requests = 0
+        self.throttled = 0
+        self.slow = 0
+        self.waited = 0.0
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._decreased_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def copy(self):
+        """同じ設定の、初期状態のトークンバケットを返す（ホストごとにバケットを分けるために使う）"""
+        return TokenBucket(**self._config)
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """トークンを1つ予約し、使えるようになるまで待機して、待機した秒数を返す"""
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # トークンを先に差し引いておくことで、同時に呼ばれても順番に間隔があく
+            self._tokens -= 1
+            delay = max(-self._tokens / self.rate if self._tokens < 0 else 0.0, self._blocked_until - now)
+            self.requests += 1
+            self.waited += delay
+
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def record(self, latency=None, status_code=None, error=False, retry_after=None, throttled=False):
+        """
+        リクエストの最終的な結果からレートを調整する（リトライを含めて1回のリクエストにつき1回呼び出す）
+
+        Args:
+            latency (float): 応答時間（秒）
+            status_code (int): ステータスコード
+            error (bool): 通信エラー（タイムアウト、接続エラーなど）だったか
+            retry_after (float): Retry-Afterヘッダーで指定された待機時間（秒）
+            throttled (bool): 最終的には成功したが、途中で429/5xx・通信エラーによりリトライしたか
+        """
+        if self.unlimited:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if error or throttled or status_code in THROTTLE_STATUS_CODES:
+                self.throttled += 1
+                self._decrease(self.decrease, now, latency)
+                if retry_after:
+                    self._blocked_until = max(self._blocked_until, now + retry_after)
+            elif latency is not None and latency > self.latency_target:
+                self.slow += 1
+                self._decrease(self.slow_decrease, now, latency)
+            else:
+                self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def _decrease(self, factor, now, latency=None):
+        # 前回下げてから decrease_interval 秒（応答時間の方が長ければ応答時間）経っていなければ下げない
+        if now - self._decreased_at < max(self.decrease_interval, latency or 0.0):
+            return
+        self._decreased_at = now
+        self.rate = max(self.min_rate, self.rate * factor)
+
+    def block(self, seconds):
+        """Retry-Afterで指定された時間、トークンを渡さないようにする（レートは変えない）"""
+        if self.unlimited or not seconds:
+            return
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def wait_time(self):
+        """次のリクエストを送れるようになるまでの時間（秒）"""
+        if self.unlimited:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            token_wait = (1 - self._tokens) / self.rate if self._tokens < 1 else 0.0
+            return max(token_wait, self._blocked_until - now, 0.0)
+
+    def stats(self):
+        """現在のレート、次のリクエストまでの待機時間、累計の待機時間などを返す"""
+        wait_time = self.wait_time()
+        with self._lock:
+            return {
+                "rate": None if self.unlimited else round(self.rate, 3),
+                "wait_time": round(wait_time, 3),
+                "requests": self.requests,
+                "throttled": self.throttled,
+                "slow": self.slow,
+                "waited": round(self.waited, 3),
+            }
+
+
+class AdaptiveRateLimiter:
+    def __init__(self, buckets):
+        """
+        ホストとエンドポイントの種類（検索・詳細）の組ごとにトークンバケットを持つレートリミッター
+
+        HttpClientからすべてのリクエストの前後に呼び出され、リトライも含めてレートを守る。
+        独自ドメインの記事などnote.com以外のホストへのリクエストが失敗しても、note.comのレートは下がらない。
+
+        Args:
+            buckets (dict): エンドポイントの種類から、そのひな形のTokenBucketへの辞書（"search" と "detail"）。
+                ホストごとのバケットは、初めてリクエストを送るときにひな形の設定で作成する
+        """
+        self.templates = buckets
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, endpoint, host):
+        template = self.templates.get(endpoint)
+        if template is None:
+            return None
+        key = (host, endpoint)
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = template.copy()
+            return bucket
+
+    def acquire(self, endpoint, host=None):
+        """ホストのエンドポイントのトークンを予約して待機し、待機した秒数を返す"""
+        bucket = self._bucket(endpoint, host)
+        return bucket.acquire() if bucket else 0.0
+
+    def record(
+        self, endpoint, latency=None, status_code=None, error=False, retry_after=None, throttled=False, host=None
+    ):
+        """ホストのエンドポイントへのリクエストの結果を伝えてレートを調整する"""
+        bucket = self._bucket(endpoint, host)
+        if bucket:
+            bucket.record(latency, status_code, error, retry_after, throttled)
+
+    def block(self, endpoint, seconds, host=None):
+        """ホストのエンドポイントへの送信を、Retry-Afterで指定された時間止める"""
+        bucket = self._bucket(endpoint, host)
+        if bucket:
+            bucket.block(seconds)
+
+    def rate(self, endpoint, host=None):
+        """ホストのエンドポイントの現在のレート（毎秒。制限しない場合はNone）"""
+        bucket = self._bucket(endpoint, host)
+        return None if bucket is None or bucket.unlimited else bucket.rate
+
+    def wait_time(self, endpoint, host=None):
+        """ホストのエンドポイントに次のリクエストを送れるようになるまでの時間（秒）"""
+        bucket = self._bucket(endpoint, host)
+        return bucket.wait_time() if bucket else 0.0
+
+    def host_stats(self):
+        """(ホスト, エンドポイントの種類) ごとの統計情報を返す"""
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {key: bucket.stats() for key, bucket in sorted(buckets.items(), key=lambda item: str(item[0]))}
+
+    def stats(self):
+        """
+        エンドポイントの種類ごとに、全ホストの統計情報をまとめて返す
+
+        リクエスト数・待機時間などは全ホストの合計、rate と wait_time はリクエストが最も多いホストの値にする。
+        hosts はリクエストを送ったホストの数。
+        """
+        totals = {}
+        busiest = {}
+        for (_, endpoint), stats in self.host_stats().items():
+            total = totals.setdefault(
+                endpoint,
+                {"rate": stats["rate"], "wait_time": stats["wait_time"], "requests": 0, "throttled": 0, "slow": 0,
+                 "waited": 0.0, "hosts": 0},
+            )
+            if stats["requests"] > busiest.get(endpoint, -1):
+                busiest[endpoint] = stats["requests"]
+                total["rate"] = stats["rate"]
+                total["wait_time"] = stats["wait_time"]
+            for name in ("requests", "throttled", "slow", "waited"):
+                total[name] += stats[name]
+            total["waited"] = round(total["waited"], 3)
+            total["hosts"] += 1
+        for endpoint, template in self.templates.items():
+            if endpoint not in totals:
+                totals[endpoint] = dict(template.stats(), hosts=0)
+        return totals
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import threading
+from collections import Counter
+
+
+class RelevanceGate:
+    # 検索結果のカードで見つかったフィールドごとの関連度の重み
+    WEIGHTS = {"title": 3, "tags": 2, "snippet": 1}
+
+    def __init__(self, matcher, threshold=1, sample_rate=0.1, seed=None):
+        """
+        詳細を取得する前に、検索結果のカードの情報だけで関連度を判定するゲート
+
+        カードのタイトル、抜粋、ハッシュタグからAI関連キーワードを検出して関連度を計算し、
+        しきい値以上の記事と、カードに判定できる情報がない記事（uncertain）だけを詳細取得に回す。
+        しきい値未満の記事も sample_rate の割合で抜き取って詳細を取得し（audit）、
+        実際にはAI関連だった割合から取りこぼした記事の数を推定する。
+
+        Args:
+            matcher (KeywordMatcher): AI関連キーワードの検出器
+            threshold (int): 詳細取得に回す関連度の下限
+            sample_rate (float): しきい値未満の記事のうち、取りこぼしの推定のために詳細を取得する割合
+            seed (int): 抜き取りに使う乱数のシード
+        """
+        self.matcher = matcher
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.counts = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def score(self, candidate):
+        """検索結果のカードの情報から関連度を計算する。判定できる情報がない場合はNoneを返す"""
+        fields = [("title", candidate.get("title_from_search") or "")]
+        fields.append(("snippet", candidate.get("snippet_from_search") or ""))
+        fields += [("tags", tag) for tag in candidate.get("tags_from_search") or []]
+        if not any(text.strip() for _, text in fields):
+            return None
+        return sum(self.WEIGHTS[field] * len(self.matcher.find(text)) for field, text in fields)
+
+    def decide(self, candidate):
+        """
+        記事の詳細を取得するかどうかを判定する
+
+        Returns:
+            str: "pass"（関連度がしきい値以上）、"uncertain"（判定できない）、
+                "audit"（しきい値未満だが抜き取りで取得する）、"skip"（取得しない）のいずれか
+        """
+        score = self.score(candidate)
+        with self._lock:
+            if score is None:
+                decision = "uncertain"
+            elif score >= self.threshold:
+                decision = "pass"
+            elif self._random.random() < self.sample_rate:
+                decision = "audit"
+            else:
+                decision = "skip"
+            self.counts[decision] += 1
+        return decision
+
+    def record_audit(self, is_relevant):
+        """抜き取りで詳細を取得した記事が、実際にAI関連だったかどうかを記録する"""
+        with self._lock:
+            self.counts["audit_relevant" if is_relevant else "audit_irrelevant"] += 1
+
+    def report(self):
+        """省略した詳細取得の数と、取りこぼした可能性のあるAI関連記事の推定数を返す"""
+        with self._lock:
+            counts = dict(self.counts)
+        audited = counts.get("audit_relevant", 0) + counts.get("audit_irrelevant", 0)
+        skipped = counts.get("skip", 0)
+        miss_rate = counts.get("audit_relevant", 0) / audited if audited else None
+        return {
+            "passed": counts.get("pass", 0),
+            "uncertain": counts.get("uncertain", 0),
+            "audited": audited,
+            "saved_fetches": skipped,
+            "audit_miss_rate": miss_rate,
+            "estimated_missed": round(skipped * miss_rate) if miss_rate is not None else None,
+        }
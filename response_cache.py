@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# キャッシュに保存するレスポンスヘッダー
+CACHED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+
+class CacheMissError(requests.RequestException):
+    """リプレイモードでキャッシュに存在しないURLを取得しようとした場合のエラー"""
+
+
+class ResponseCache:
+    def __init__(self, cache_dir, ttl_hours=24.0 * 7, max_size_mb=512):
+        """
+        HTTPレスポンスを圧縮してディスクに保存するキャッシュ
+
+        本文はSHA-256をファイル名とした圧縮ファイルとして保存し（同じ内容は1つにまとめる）、
+        URLと本文の対応、有効期限、最終アクセス日時はSQLiteのインデックスで管理する。
+        合計サイズが上限を超えた場合は、最後にアクセスされた日時が古いものから削除する。
+
+        Args:
+            cache_dir (str): キャッシュを保存するディレクトリ
+            ttl_hours (float): エントリの有効期間（時間）
+            max_size_mb (float): キャッシュ全体の最大サイズ（MB、圧縮後）
+        """
+        self.cache_dir = cache_dir
+        self.ttl = ttl_hours * 3600
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite"), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self._conn.commit()
+        self._total_size = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT body_hash, size FROM entries)"
+        ).fetchone()[0]
+
+    @staticmethod
+    def make_key(url, params=None):
+        """URLとクエリパラメータからキャッシュのキーを作成する"""
+        prepared = requests.Request("GET", url, params=params).prepare()
+        return hashlib.sha256(prepared.url.encode("utf-8")).hexdigest()
+
+    def _object_path(self, body_hash):
+        return os.path.join(self.cache_dir, "objects", body_hash[:2], body_hash + ".z")
+
+    def get(self, url, params=None, allow_expired=False):
+        """
+        キャッシュからレスポンスを取得する
+
+        Args:
+            url (str): URL
+            params (dict): クエリパラメータ
+            allow_expired (bool): 有効期限切れのエントリも返すか
+
+        Returns:
+            requests.Response: キャッシュされたレスポンス。存在しない場合はNone
+        """
+        key = self.make_key(url, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, body_hash, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (not allow_expired and row[4] < time.time()):
+                self.misses += 1
+                return None
+
+            try:
+                with open(self._object_path(row[3]), "rb") as f:
+                    body = zlib.decompress(f.read())
+            except (OSError, zlib.error):
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+
+        response = requests.Response()
+        response.status_code = row[1]
+        response.reason = "OK"
+        response.url = row[0]
+        response.headers = CaseInsensitiveDict(json.loads(row[2]))
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        response._content = body
+        response.from_cache = True
+        return response
+
+    def urls(self, contains=None):
+        """キャッシュされているURLを返す（containsを指定した場合は、その文字列を含むURLのみ）"""
+        with self._lock:
+            rows = self._conn.execute("SELECT url FROM entries WHERE status = 200 ORDER BY stored_at").fetchall()
+        return [row[0] for row in rows if contains is None or contains in row[0]]
+
+    def put(self, url, response, params=None, ttl_hours=None):
+        """
+        成功したレスポンスをキャッシュに保存する
+
+        Args:
+            url (str): リクエストしたURL
+            response (requests.Response): 保存するレスポンス
+            params (dict): リクエスト時のクエリパラメータ
+            ttl_hours (float): このエントリの有効期間（時間）。未指定の場合はデフォルトの有効期間
+        """
+        if response.status_code != 200:
+            return
+
+        key = self.make_key(url, params)
+        body = response.content
+        body_hash = hashlib.sha256(body).hexdigest()
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        ttl = self.ttl if ttl_hours is None else ttl_hours * 3600
+        now = time.time()
+
+        with self._lock:
+            path = self._object_path(body_hash)
+            size_row = self._conn.execute(
+                "SELECT size FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)
+            ).fetchone()
+            if size_row is None or not os.path.exists(path):
+                data = zlib.compress(body, 6)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = f"{path}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+                size = len(data)
+                if size_row is None:
+                    self._total_size += size
+            else:
+                size = size_row[0]
+
+            old = self._conn.execute("SELECT body_hash FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO entries
+                    (key, url, status, headers, body_hash, size, stored_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, response.url, response.status_code, json.dumps(headers), body_hash, size, now, now + ttl, now),
+            )
+            if old and old[0] != body_hash:
+                self._remove_object_if_unused(old[0])
+            self._evict()
+            self._conn.commit()
+
+    def _remove_object_if_unused(self, body_hash):
+        """どのエントリからも参照されなくなった本文ファイルを削除する"""
+        row = self._conn.execute("SELECT size FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)).fetchone()
+        if row is not None:
+            return
+        path = self._object_path(body_hash)
+        try:
+            self._total_size -= os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self):
+        """合計サイズが上限を下回るまで、最終アクセスが古いエントリから削除する"""
+        while self._total_size > self.max_size:
+            row = self._conn.execute("SELECT key, body_hash FROM entries ORDER BY last_access LIMIT 1").fetchone()
+            if row is None:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (row[0],))
+            self._remove_object_if_unused(row[1])
+            self.evictions += 1
+
+    def stats(self):
+        """ヒット数、ミス数、削除数、エントリ数、合計サイズを返す"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": entries,
+                "size_bytes": self._total_size,
+            }
+
+    def close(self):
+        """インデックスを閉じる"""
+        with self._lock:
+            self._conn.close()
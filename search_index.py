@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+
+from article_record import JST, parse_datetime
+from parquet_dataset import iter_run_files, read_run_file, run_time_of, to_row
+from writers import iter_jsonl
+
+# 全文検索の対象にする列（trigramトークナイザーで3文字ずつに区切るため、日本語も分かち書きせずに検索できる）
+TEXT_COLUMNS = ("title", "author", "tags", "content_preview")
+
+# 検索結果の並び順
+SORT_ORDERS = ("date", "likes", "relevance")
+
+# trigramトークナイザーで索引を引ける最短の語の長さ（これより短い語はLIKEで探す）
+_MIN_MATCH_LENGTH = 3
+
+
+def _match_phrase(term):
+    """FTS5のMATCHの語句として引用する"""
+    return '"' + term.replace('"', '""') + '"'
+
+
+def _like_pattern(term):
+    """LIKEの部分一致のパターンにする（% と _ は文字としてエスケープする）"""
+    return "%" + term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+
+
+def _date_bound(value, end=False):
+    """
+    日付の範囲の境界を、索引に保存した投稿日（日本時間のISO 8601形式の文字列）と比べられる形にする
+
+    Args:
+        value (str | datetime): 日付（YYYY-MM-DD）または日時
+        end (bool): 範囲の終わりか（日付だけの場合はその日の終わりまでを含める）
+
+    Returns:
+        tuple: (比較演算子, 境界の文字列)
+    """
+    if isinstance(value, str) and len(value.strip()) == 10:
+        try:
+            day = datetime.strptime(value.strip(), "%Y-%m-%d").replace(tzinfo=JST)
+        except ValueError:
+            raise ValueError(f"日付を解釈できません: {value}") from None
+        if end:
+            return "<", (day + timedelta(days=1)).isoformat(timespec="milliseconds")
+        return ">=", day.isoformat(timespec="milliseconds")
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f"日付を解釈できません: {value}")
+    return ("<=" if end else ">="), parsed.isoformat(timespec="milliseconds")
+
+
+class SearchIndex:
+    def __init__(self, path):
+        """
+        クロールした記事の全文検索の索引（SQLiteのFTS5、記事IDごとに1件）
+
+        タイトル・著者・タグ・本文の一部をtrigramトークナイザーで索引にし、タグ・著者・投稿日の絞り込みには
+        通常の索引を使う。同じ記事が複数の実行で取得された場合は、最も新しい実行の記録を残す。
+        索引に追加した実行結果のファイル名も保存し、sync() では未追加の実行結果だけを読み込む。
+
+        Args:
+            path (str): SQLiteファイルのパス
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        try:
+            columns = ", ".join(TEXT_COLUMNS)
+            self._conn.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS articles_fts USING fts5({columns}, tokenize='trigram')"
+            )
+        except sqlite3.OperationalError as e:
+            self._conn.close()
+            raise RuntimeError(
+                f"全文検索の索引にはFTS5のtrigramトークナイザー（SQLite 3.34以降）が必要です"
+                f"（このPythonのSQLite: {sqlite3.sqlite_version}）"
+            ) from e
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                note_id TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                title TEXT,
+                author TEXT,
+                published_date TEXT,
+                likes INTEGER,
+                tags TEXT NOT NULL,
+                content_preview TEXT,
+                queries TEXT NOT NULL,
+                crawled_at TEXT
+            );
+            CREATE INDEX IF NOT EXISTS articles_published ON articles (published_date);
+            CREATE INDEX IF NOT EXISTS articles_author ON articles (author COLLATE NOCASE);
+            CREATE INDEX IF NOT EXISTS articles_likes ON articles (likes, published_date);
+            CREATE TABLE IF NOT EXISTS article_tags (
+                tag TEXT NOT NULL COLLATE NOCASE,
+                note_id TEXT NOT NULL,
+                PRIMARY KEY (tag, note_id)
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS runs (name TEXT PRIMARY KEY, indexed_at TEXT NOT NULL, records INTEGER NOT NULL);
+            """
+        )
+        self._conn.commit()
+
+    def add(self, record, crawled_at=None):
+        """
+        記録を1件追加する（コミットはしない）
+
+        索引にある記事より古い実行の記録の場合は、索引を更新しない。
+
+        Args:
+            record (dict): クロール結果の記録（ArticleRecord、JSON/JSONLの記録、またはCSVの行）
+            crawled_at (datetime): 記録を取得した実行の日時
+
+        Returns:
+            bool: 索引を追加・更新したか
+        """
+        row = to_row(record, crawled_at or datetime.now(JST))
+        note_id = row["note_id"] or row["url"]
+        if not note_id:
+            return False
+
+        published = row["published_date"]
+        crawled = row["crawled_at"]
+        with self._lock:
+            current = self._conn.execute(
+                "SELECT rowid, crawled_at FROM articles WHERE note_id = ?", (note_id,)
+            ).fetchone()
+            crawled_text = crawled.isoformat(timespec="milliseconds") if crawled else None
+            # 同じ実行日時の場合は後から追加した記録を残す
+            if current is not None and (current[1] or "") > (crawled_text or ""):
+                return False
+
+            values = (
+                note_id,
+                row["url"],
+                row["title"],
+                row["author"],
+                published.isoformat(timespec="milliseconds") if published else None,
+                row["likes"],
+                json.dumps(row["tags"], ensure_ascii=False),
+                row["content_preview"],
+                json.dumps(row["queries"], ensure_ascii=False),
+                crawled_text,
+            )
+            if current is not None:
+                self._conn.execute("DELETE FROM articles_fts WHERE rowid = ?", (current[0],))
+                self._conn.execute("DELETE FROM article_tags WHERE note_id = ?", (note_id,))
+            rowid = self._conn.execute(
+                "INSERT OR REPLACE INTO articles (rowid, note_id, url, title, author, published_date, likes, tags, "
+                "content_preview, queries, crawled_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (current[0] if current else None,) + values,
+            ).lastrowid
+            self._conn.execute(
+                "INSERT INTO articles_fts (rowid, title, author, tags, content_preview) VALUES (?, ?, ?, ?, ?)",
+                (rowid, row["title"] or "", row["author"] or "", " ".join(row["tags"]), row["content_preview"] or ""),
+            )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO article_tags (tag, note_id) VALUES (?, ?)",
+                [(tag.lstrip("#"), note_id) for tag in row["tags"] if tag.lstrip("#")],
+            )
+        return True
+
+    def add_records(self, name, records, crawled_at=None):
+        """
+        1回の実行の記録をまとめて追加し、実行の名前を記録してコミットする
+
+        Args:
+            name (str): 実行の名前（結果のファイル名から拡張子を除いたもの）
+            records (iterable): クロール結果の記録
+            crawled_at (datetime): 記録を取得した実行の日時
+
+        Returns:
+            int: 追加・更新した記事の数
+        """
+        added = 0
+        try:
+            for record in records:
+                added += self.add(record, crawled_at)
+            with self._lock:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO runs (name, indexed_at, records) VALUES (?, ?, ?)",
+                    (name, datetime.now(JST).isoformat(timespec="seconds"), added),
+                )
+                self._conn.commit()
+        except BaseException:
+            with self._lock:
+                self._conn.rollback()
+            raise
+        return added
+
+    def add_run(self, jsonl_path, crawled_at=None):
+        """1回の実行の結果（JSONL）を索引に追加する（実行日時は省略するとファイル名から求める）"""
+        name = os.path.splitext(os.path.basename(jsonl_path))[0]
+        return self.add_records(name, iter_jsonl(jsonl_path), crawled_at or run_time_of(jsonl_path))
+
+    def sync(self, output_dir):
+        """
+        出力ディレクトリにある過去の実行結果（JSON/CSV/JSONL）のうち、索引に未追加のものを古い順に追加する
+
+        Returns:
+            int: 追加した実行結果の数
+        """
+        with self._lock:
+            indexed = {name for (name,) in self._conn.execute("SELECT name FROM runs")}
+        count = 0
+        for path, file_format, crawled_at in iter_run_files(output_dir):
+            name = os.path.splitext(os.path.basename(path))[0]
+            if name in indexed:
+                continue
+            records = (record for record in read_run_file(path, file_format) if record.get("url"))
+            self.add_records(name, records, crawled_at)
+            count += 1
+        return count
+
+    def search(self, text=None, tags=(), author=None, since=None, until=None, sort="date", limit=20):
+        """
+        条件に合う記事を返す（条件はすべて満たすものを返す）
+
+        Args:
+            text (str): タイトル・著者・タグ・本文の一部から探す語（空白区切りで複数指定するとすべてを含む記事）。
+                3文字以上の語は全文検索の索引で、2文字以下の語（"AI" など）は部分一致で探す
+            tags (list): タグ（"#" は省略可。複数指定するとすべてのタグが付いた記事）
+            author (str): 著者（大文字と小文字を区別しない完全一致）
+            since (str | datetime): この日（YYYY-MM-DD）・日時以降に投稿された記事
+            until (str | datetime): この日（YYYY-MM-DD、その日を含む）・日時以前に投稿された記事
+            sort (str): 並び順。"date"（新しい順）、"likes"（いいねの多い順）、"relevance"（語との一致度の順。
+                3文字以上の語を指定した場合のみ、それ以外は "date" と同じ）
+            limit (int): 返す記事の最大数（Noneの場合はすべて）
+
+        Returns:
+            list: 記事の辞書（note_id, url, title, author, published_date, likes, tags, content_preview,
+                queries, crawled_at）のリスト
+        """
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"未対応の並び順です: {sort}（{', '.join(SORT_ORDERS)} から選んでください）")
+
+        conditions = []
+        params = []
+        terms = (text or "").split()
+        phrases = [_match_phrase(term) for term in terms if len(term) >= _MIN_MATCH_LENGTH]
+        if phrases:
+            conditions.append("articles_fts MATCH ?")
+            params.append(" AND ".join(phrases))
+        for term in terms:
+            if len(term) < _MIN_MATCH_LENGTH:
+                pattern = _like_pattern(term)
+                # 索引を使わずに記事の表を投稿日の順にたどるため、よく現れる語ほど早く limit 件に達する
+                conditions.append("(" + " OR ".join(f"a.{c} LIKE ? ESCAPE '\\'" for c in TEXT_COLUMNS) + ")")
+                params.extend([pattern] * len(TEXT_COLUMNS))
+        for tag in tags or ():
+            conditions.append("a.note_id IN (SELECT note_id FROM article_tags WHERE tag = ?)")
+            params.append(tag.lstrip("#"))
+        if author:
+            conditions.append("a.author = ? COLLATE NOCASE")
+            params.append(author)
+        if since:
+            operator, bound = _date_bound(since)
+            conditions.append(f"a.published_date {operator} ?")
+            params.append(bound)
+        if until:
+            operator, bound = _date_bound(until, end=True)
+            conditions.append(f"a.published_date {operator} ?")
+            params.append(bound)
+
+        sql = (
+            "SELECT a.note_id, a.url, a.title, a.author, a.published_date, a.likes, a.tags, a.content_preview, "
+            "a.queries, a.crawled_at FROM articles a"
+        )
+        if phrases:
+            sql += " JOIN articles_fts ON articles_fts.rowid = a.rowid"
+        if conditions:
+            sql += " WHERE " + " AND ".join(conditions)
+        if sort == "relevance" and phrases:
+            sql += " ORDER BY bm25(articles_fts), a.published_date DESC"
+        elif sort == "likes":
+            sql += " ORDER BY a.likes DESC, a.published_date DESC"
+        else:
+            # SQLiteではNULLが最も小さいため、投稿日が不明な記事は最後になる
+            sql += " ORDER BY a.published_date DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        columns = ("note_id", "url", "title", "author", "published_date", "likes", "tags", "content_preview")
+        results = []
+        for row in rows:
+            result = dict(zip(columns, row))
+            result["tags"] = json.loads(result["tags"])
+            result["queries"] = json.loads(row[8])
+            result["crawled_at"] = row[9]
+            results.append(result)
+        return results
+
+    def stats(self):
+        """索引にある記事の数と、追加した実行結果の数を返す"""
+        with self._lock:
+            articles = self._conn.execute("SELECT COUNT(*) FROM articles").fetchone()[0]
+            runs = self._conn.execute("SELECT COUNT(*) FROM runs").fetchone()[0]
+        return {"articles": articles, "runs": runs}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
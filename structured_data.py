@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import html as html_lib
+import json
+import re
+
+# <script type="application/json"> や <script type="application/ld+json"> を木を作らずに取り出す
+_SCRIPT_PATTERN = re.compile(r"<script\b([^>]*)>(.*?)</script\s*>", re.S | re.I)
+_TYPE_PATTERN = re.compile(r"""type\s*=\s*["']?(application/(?:ld\+)?json)""", re.I)
+_PARAGRAPH_PATTERN = re.compile(r"<p\b[^>]*>(.*?)</p\s*>", re.S | re.I)
+_TAG_PATTERN = re.compile(r"<[^>]+>")
+
+# 記事の種類を表すJSON-LDの@type
+_ARTICLE_TYPES = {"Article", "BlogPosting", "NewsArticle", "SocialMediaPosting"}
+
+
+def iter_embedded_json(html):
+    """HTMLに埋め込まれたJSON（application/json, application/ld+json）を順に返す"""
+    for attrs, body in _SCRIPT_PATTERN.findall(html):
+        type_match = _TYPE_PATTERN.search(attrs)
+        if not type_match:
+            continue
+        try:
+            yield type_match.group(1).lower(), json.loads(body)
+        except ValueError:
+            continue
+
+
+def _walk(data, depth=0):
+    """JSONの中の辞書をすべて返す"""
+    if depth > 30:
+        return
+    if isinstance(data, dict):
+        yield data
+        for value in data.values():
+            yield from _walk(value, depth + 1)
+    elif isinstance(data, list):
+        for value in data:
+            yield from _walk(value, depth + 1)
+
+
+def _first(data, *keys):
+    for key in keys:
+        value = data.get(key)
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _body_preview(body):
+    """記事本文のHTMLから、最初の3段落のテキストを取り出す"""
+    paragraphs = _PARAGRAPH_PATTERN.findall(body) or [body]
+    texts = [html_lib.unescape(_TAG_PATTERN.sub("", p)).strip() for p in paragraphs[:3]]
+    return "\n".join([t for t in texts if t])
+
+
+def note_fields(note):
+    """noteの記事データ（APIやページに埋め込まれたもの）から各フィールドを取り出す"""
+    fields = {}
+
+    title = _first(note, "name", "title")
+    if title:
+        fields["title"] = str(title).strip()
+
+    user = note.get("user") if isinstance(note.get("user"), dict) else {}
+    author = _first(user, "urlname", "urlName", "nickname")
+    if author:
+        fields["author"] = author
+
+    published = _first(note, "publishAt", "publish_at", "publishedAt", "published_at")
+    if published:
+        fields["published_date"] = published
+
+    likes = _first(note, "likeCount", "like_count")
+    if likes is not None:
+        fields["likes"] = str(int(likes))
+
+    hashtags = note.get("hashtags") or note.get("hashtagNotes") or note.get("hashtag_notes")
+    if isinstance(hashtags, list):
+        tags = []
+        for item in hashtags:
+            hashtag = item.get("hashtag", item) if isinstance(item, dict) else {"name": item}
+            name = hashtag.get("name") if isinstance(hashtag, dict) else None
+            if name:
+                tags.append(name)
+        fields["tags"] = tags
+
+    body = _first(note, "body")
+    if isinstance(body, str):
+        fields["content_preview"] = _body_preview(body)
+
+    return fields
+
+
+def _from_ld_json(data):
+    """JSON-LDのArticleから各フィールドを取り出す"""
+    fields = {}
+    if data.get("headline"):
+        fields["title"] = str(data["headline"]).strip()
+
+    author = data.get("author")
+    if isinstance(author, list) and author:
+        author = author[0]
+    if isinstance(author, dict):
+        url = author.get("url") or ""
+        urlname = url.rstrip("/").rsplit("/", 1)[-1] if "note.com/" in url else None
+        if urlname or author.get("name"):
+            fields["author"] = urlname or author["name"]
+
+    if data.get("datePublished"):
+        fields["published_date"] = data["datePublished"]
+
+    keywords = data.get("keywords")
+    if isinstance(keywords, list):
+        fields["tags"] = [str(k) for k in keywords if k]
+
+    for statistic in data.get("interactionStatistic") or []:
+        if isinstance(statistic, dict) and "Like" in str(statistic.get("interactionType", "")):
+            fields["likes"] = str(int(statistic.get("userInteractionCount", 0)))
+
+    if isinstance(data.get("articleBody"), str):
+        fields["content_preview"] = _body_preview(data["articleBody"])
+
+    return fields
+
+
+def extract_structured_fields(html, note_id=None):
+    """
+    記事ページに埋め込まれたJSONから各フィールドを取得する
+
+    ページに埋め込まれた記事データ（application/json）のうち、記事IDが一致するものを優先し、
+    見つからなければJSON-LDのArticleを使う。どちらもなければ空の辞書を返す。
+
+    Args:
+        html (str): 記事ページのHTML
+        note_id (str): 記事ID（例: n2edf753c0fe5）
+
+    Returns:
+        dict: 取得できたフィールドだけを含む辞書
+    """
+    ld_fields = {}
+    for script_type, data in iter_embedded_json(html):
+        for obj in _walk(data):
+            if script_type == "application/ld+json":
+                if not ld_fields and str(obj.get("@type")) in _ARTICLE_TYPES:
+                    ld_fields = _from_ld_json(obj)
+            elif note_id and obj.get("key") == note_id and ("body" in obj or "name" in obj):
+                return note_fields(obj)
+    return ld_fields
@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+
+def shard_for(key, num_shards):
+    """記事のキー（/n/<記事ID>）のハッシュ値から、担当するシャードの番号を決める"""
+    if num_shards <= 1:
+        return 0
+    return int(hashlib.sha1(key.encode("utf-8")).hexdigest()[:8], 16) % num_shards
+
+
+class WorkQueue:
+    def __init__(self, path, num_shards=None):
+        """
+        複数のワーカーで分担してクロールするための、SQLiteの作業キュー（同じマシンの複数プロセスから共有できる）
+
+        検索ページ（search）と記事の詳細（detail）のタスクを、キーの重複なく保存する。
+        記事のタスクは記事IDのハッシュ値でシャードに分け、ワーカーは担当するシャードのタスクだけを取得する。
+        タスクは期限付きで貸し出し（リース）、期限までに完了しなければ別のワーカーが取得し直せる。
+
+        Args:
+            path (str): SQLiteファイルのパス
+            num_shards (int): 記事のタスクを分けるシャードの数（キューを作成するときに指定し、以後は保存した値を使う）
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL UNIQUE,
+                shard INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'queued',
+                lease_owner TEXT,
+                lease_expires REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, kind, shard)")
+
+        stored = self._conn.execute("SELECT value FROM meta WHERE name = 'num_shards'").fetchone()
+        if stored is None:
+            self.num_shards = num_shards or 1
+            self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('num_shards', ?)", (str(self.num_shards),))
+        else:
+            self.num_shards = int(stored[0])
+
+    def add(self, kind, key, payload):
+        """タスクを追加する。同じキーのタスクがすでにあれば追加せずFalseを返す"""
+        shard = shard_for(key, self.num_shards) if kind == "detail" else 0
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO tasks (kind, key, shard, payload) VALUES (?, ?, ?, ?)",
+                (kind, key, shard, json.dumps(payload, ensure_ascii=False)),
+            )
+        return cursor.rowcount > 0
+
+    def lease(self, worker_id, shard=None, lease_seconds=300.0):
+        """
+        未処理のタスク、またはリースの期限が切れたタスクを1件貸し出す
+
+        検索ページのタスクはどのワーカーにも貸し出し、記事のタスクは shard が一致するものだけを貸し出す。
+        記事のタスクを先に貸し出すことで、見つかった記事から順に取得する。
+
+        Args:
+            worker_id (str): ワーカーの識別子
+            shard (int): 担当するシャードの番号（Noneの場合はすべてのシャード）
+            lease_seconds (float): リースの期限（秒）
+
+        Returns:
+            dict: タスク（id, kind, key, payload, attempts）。貸し出せるタスクがない場合はNone
+        """
+        now = time.time()
+        shard_condition = "" if shard is None else "AND (kind = 'search' OR shard = ?)"
+        params = (now,) if shard is None else (now, shard)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"""
+                    SELECT id, kind, key, payload, attempts FROM tasks
+                    WHERE (status = 'queued' OR (status = 'leased' AND lease_expires < ?)) {shard_condition}
+                    ORDER BY kind = 'search', id
+                    LIMIT 1
+                    """,
+                    params,
+                ).fetchone()
+                if row is not None:
+                    self._conn.execute(
+                        """
+                        UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1
+                        WHERE id = ?
+                        """,
+                        (worker_id, now + lease_seconds, row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        if row is None:
+            return None
+        return {"id": row[0], "kind": row[1], "key": row[2], "payload": json.loads(row[3]), "attempts": row[4] + 1}
+
+    def complete(self, task_id, worker_id, result=None):
+        """タスクを完了する。リースの期限が切れて別のワーカーに貸し出されていた場合はFalseを返す"""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE tasks SET status = 'done', result = ?, lease_expires = NULL "
+                "WHERE id = ? AND lease_owner = ? AND status = 'leased'",
+                (json.dumps(result, ensure_ascii=False), task_id, worker_id),
+            )
+        return cursor.rowcount > 0
+
+    def fail(self, task_id, worker_id, error, max_attempts=3):
+        """タスクの失敗を記録する。試行回数が max_attempts 未満なら再び未処理に戻す"""
+        with self._lock:
+            cursor = self._conn.execute(
+                """
+                UPDATE tasks SET status = CASE WHEN attempts < ? THEN 'queued' ELSE 'failed' END,
+                    error = ?, lease_owner = NULL, lease_expires = NULL
+                WHERE id = ? AND lease_owner = ? AND status = 'leased'
+                """,
+                (max_attempts, str(error), task_id, worker_id),
+            )
+        return cursor.rowcount > 0
+
+    def pending_count(self, shard=None):
+        """未完了（未処理・貸し出し中）のタスクの数を返す"""
+        shard_condition = "" if shard is None else "AND (kind = 'search' OR shard = ?)"
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT COUNT(*) FROM tasks WHERE status IN ('queued', 'leased') {shard_condition}",
+                () if shard is None else (shard,),
+            ).fetchone()
+        return row[0]
+
+    def results(self, after_id=0, limit=1000):
+        """完了した記事のタスクの結果を、追加した順に返す"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, key, result FROM tasks WHERE kind = 'detail' AND status = 'done' AND id > ? "
+                "ORDER BY id LIMIT ?",
+                (after_id, limit),
+            ).fetchall()
+        return [{"id": row[0], "key": row[1], "result": json.loads(row[2])} for row in rows]
+
+    def stats(self):
+        """種類と状態ごとのタスク数を返す"""
+        with self._lock:
+            rows = self._conn.execute("SELECT kind, status, COUNT(*) FROM tasks GROUP BY kind, status").fetchall()
+        stats = {"num_shards": self.num_shards}
+        for kind, status, count in rows:
+            stats.setdefault(kind, {})[status] = count
+        return stats
+
+    def close(self):
+        """データベースを閉じる"""
+        with self._lock:
+            self._conn.close()
+
+
+class RemoteWorkQueue:
+    def __init__(self, url, timeout=30.0):
+        """
+        別のマシンで serve() しているブローカー経由で WorkQueue を使うクライアント（WorkQueueと同じメソッドを持つ）
+
+        Args:
+            url (str): ブローカーのURL（例: http://192.168.0.10:8765）
+            timeout (float): リクエストのタイムアウト（秒）
+        """
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.num_shards = self._call("num_shards")
+
+    def _call(self, method, **params):
+        response = self.session.post(f"{self.url}/{method}", json=params, timeout=self.timeout)
+        if response.status_code >= 400:
+            try:
+                error = response.json().get("error")
+            except ValueError:
+                error = None
+            if error:
+                raise requests.HTTPError(
+                    f"ブローカーでエラーが発生しました（{response.status_code}、{method}）: {error}", response=response
+                )
+        response.raise_for_status()
+        return response.json()["result"]
+
+    def add(self, kind, key, payload):
+        return self._call("add", kind=kind, key=key, payload=payload)
+
+    def lease(self, worker_id, shard=None, lease_seconds=300.0):
+        return self._call("lease", worker_id=worker_id, shard=shard, lease_seconds=lease_seconds)
+
+    def complete(self, task_id, worker_id, result=None):
+        return self._call("complete", task_id=task_id, worker_id=worker_id, result=result)
+
+    def fail(self, task_id, worker_id, error, max_attempts=3):
+        # 例外はJSONにできないため、メッセージだけを送る
+        return self._call("fail", task_id=task_id, worker_id=worker_id, error=str(error), max_attempts=max_attempts)
+
+    def pending_count(self, shard=None):
+        return self._call("pending_count", shard=shard)
+
+    def results(self, after_id=0, limit=1000):
+        return self._call("results", after_id=after_id, limit=limit)
+
+    def stats(self):
+        return self._call("stats")
+
+    def close(self):
+        self.session.close()
+
+
+def enqueue_searches(queue, keywords, max_pages):
+    """検索キーワードごとに、1ページ目から max_pages ページ目までの検索ページのタスクを追加し、追加した数を返す"""
+    added = 0
+    for keyword in keywords:
+        for page in range(1, max_pages + 1):
+            added += queue.add("search", f"search:{keyword}:{page}", {"keyword": keyword, "page": page})
+    return added
+
+
+def open_queue(location, num_shards=None):
+    """URLならブローカーのクライアント、それ以外はSQLiteファイルの作業キューを開く"""
+    if location.startswith(("http://", "https://")):
+        return RemoteWorkQueue(location)
+    os.makedirs(os.path.dirname(location) or ".", exist_ok=True)
+    return WorkQueue(location, num_shards=num_shards)
+
+
+# ブローカーが受け付けるメソッド
+_BROKER_METHODS = ("add", "lease", "complete", "fail", "pending_count", "results", "stats")
+
+
+def serve(queue, host="127.0.0.1", port=8765):
+    """
+    WorkQueueをHTTPで公開するブローカーを起動する（標準ライブラリのみで動作し、Ctrl-Cで停止する）
+
+    ワーカーは POST /<メソッド名> にJSONで引数を送り、{"result": 戻り値} を受け取る。
+    引数が不正な場合は400、キューの処理中のエラーは500で、{"error": メッセージ} を返す。
+    認証がないため、既定ではこのマシンからの接続だけを受け付ける（別のマシンに公開する場合は host を指定する）。
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            method = self.path.strip("/")
+            try:
+                length = int(self.headers.get("Content-Length") or 0)
+                params = json.loads(self.rfile.read(length) or b"{}")
+                if method == "num_shards":
+                    result = queue.num_shards
+                elif method in _BROKER_METHODS:
+                    result = getattr(queue, method)(**params)
+                else:
+                    self.send_error(404)
+                    return
+                body = json.dumps({"result": result}, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+            except (TypeError, ValueError) as e:
+                body = json.dumps({"error": str(e)}, ensure_ascii=False).encode("utf-8")
+                self.send_response(400)
+            except Exception as e:
+                print(f"ブローカーの {method} の処理中にエラーが発生しました: {e}")
+                body = json.dumps({"error": f"{type(e).__name__}: {e}"}, ensure_ascii=False).encode("utf-8")
+                self.send_response(500)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    print(f"作業キューのブローカーを http://{host}:{server.server_port} で起動しました（{queue.path}）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
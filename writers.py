@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import csv
+import json
+import os
+
+from article_record import RECORD_FIELDS, ArticleRecord
+
+# CSVの列の順序（これ以外のフィールドは後ろに追加する）
+CSV_COLUMNS = list(RECORD_FIELDS)
+
+
+def _csv_value(value):
+    """pandasのto_csvと同じく、Noneは空文字、リストや辞書はPythonの表記で書き出す"""
+    if value is None:
+        return ""
+    return str(value)
+
+
+def _order_columns(keys):
+    """記録に含まれる列を、CSV_COLUMNSの順、それ以外は出現順に並べる"""
+    keys = list(dict.fromkeys(keys))
+    return [column for column in CSV_COLUMNS if column in keys] + [key for key in keys if key not in CSV_COLUMNS]
+
+
+def _fsync(f):
+    f.flush()
+    os.fsync(f.fileno())
+
+
+def iter_jsonl(path):
+    """JSONLファイルの記録を1件ずつ返す（書き込み途中で途切れた最後の行は無視する）"""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def write_json_array(records, path):
+    """記録をJSON配列として一時ファイルに書き出し、書き終えてから置き換える"""
+    tmp_path = path + ".part"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write("[")
+        for i, record in enumerate(records):
+            f.write(",\n  " if i else "\n  ")
+            f.write(json.dumps(record, ensure_ascii=False, indent=2).replace("\n", "\n  "))
+        f.write("\n]" if f.tell() > 1 else "]")
+        _fsync(f)
+    os.replace(tmp_path, path)
+
+
+def write_csv(records, path, columns=None):
+    """記録をCSV（UTF-8 BOM付き）として一時ファイルに書き出し、書き終えてから置き換える"""
+    if columns is None:
+        records = list(records)
+        columns = _order_columns(key for record in records for key in record)
+
+    tmp_path = path + ".part"
+    with open(tmp_path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(columns)
+        for record in records:
+            writer.writerow([_csv_value(record.get(column)) for column in columns])
+        _fsync(f)
+    os.replace(tmp_path, path)
+
+
+class StreamingResultWriter:
+    def __init__(self, output_dir, basename, batch_size=20, formats=("csv", "json")):
+        """
+        結果を1件ずつ追記し、クラッシュしても途中までの結果が残るように保存するライター
+
+        実行中はJSONLとCSVの一時ファイル（.part）に追記し、batch_size件ごとにflushとfsyncを行う。
+        finalize() を呼ぶと、JSONLを確定したうえで、JSONLから従来のJSON配列とCSVを作り直し、
+        いずれも書き終えてから最終的なファイル名に置き換える。
+
+        Args:
+            output_dir (str): 出力ディレクトリ
+            basename (str): 出力ファイル名（拡張子なし）
+            batch_size (int): fsyncを行う間隔（件数）
+            formats (tuple): JSONLに加えて作成する形式（"csv", "json"）
+        """
+        self.jsonl_path = os.path.join(output_dir, f"{basename}.jsonl")
+        self.csv_path = os.path.join(output_dir, f"{basename}.csv")
+        self.json_path = os.path.join(output_dir, f"{basename}.json")
+        self.batch_size = batch_size
+        self.formats = tuple(formats)
+        self.count = 0
+        self._unsynced = 0
+        self._columns = None
+
+        self._jsonl = open(self.jsonl_path + ".part", "w", encoding="utf-8")
+        self._csv_file = None
+        self._csv = None
+        if "csv" in self.formats:
+            self._csv_file = open(self.csv_path + ".part", "w", encoding="utf-8-sig", newline="")
+            self._csv = csv.writer(self._csv_file, lineterminator="\n")
+
+    def write(self, record):
+        """記録を1件追記する（検索結果ページから取得した一時的なフィールドは除く）"""
+        if isinstance(record, ArticleRecord):
+            record = record.to_dict()
+        else:
+            record = {key: value for key, value in record.items() if not key.endswith("_from_search")}
+
+        self._jsonl.write(json.dumps(record, ensure_ascii=False) + "\n")
+        if self._csv:
+            if self._columns is None:
+                self._columns = _order_columns(record)
+                self._csv.writerow(self._columns)
+            self._csv.writerow([_csv_value(record.get(column)) for column in self._columns])
+
+        self.count += 1
+        self._unsynced += 1
+        if self._unsynced >= self.batch_size:
+            self.sync()
+
+    def sync(self):
+        """書き込んだ内容をディスクに反映する"""
+        _fsync(self._jsonl)
+        if self._csv_file:
+            _fsync(self._csv_file)
+        self._unsynced = 0
+
+    def close(self):
+        """一時ファイルをディスクに反映して閉じる（途中で終了した場合も .part ファイルは残る）"""
+        if self._jsonl.closed:
+            return
+        self.sync()
+        self._jsonl.close()
+        if self._csv_file:
+            self._csv_file.close()
+
+    def finalize(self):
+        """JSONLを確定し、JSONLからJSON配列とCSVを作って、出力ファイルのパスを返す"""
+        self.close()
+        os.replace(self.jsonl_path + ".part", self.jsonl_path)
+        paths = {"jsonl": self.jsonl_path}
+
+        if "json" in self.formats:
+            write_json_array(iter_jsonl(self.jsonl_path), self.json_path)
+            paths["json"] = self.json_path
+
+        if "csv" in self.formats:
+            # 途中で列が増えていてもCSVに含まれるよう、先に全記録の列を集める
+            columns = _order_columns(key for record in iter_jsonl(self.jsonl_path) for key in record)
+            write_csv(iter_jsonl(self.jsonl_path), self.csv_path, columns)
+            paths["csv"] = self.csv_path
+
+        return paths
+
+    def discard(self):
+        """一時ファイルを閉じて削除する"""
+        self.close()
+        for path in (self.jsonl_path + ".part", self.csv_path + ".part"):
+            if os.path.exists(path):
+                os.remove(path)